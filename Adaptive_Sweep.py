@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+
+Adaptive_Sweep.py
+
+Sweeps over a grid of inputs, solved only where the technology mix changes.
+
+With ADAPTIVE_SWEEP = true (global section of the case input file), cases
+that are the same except for a few numbers (e.g. FIXED_COST_STORAGE x
+FIXED_COST_SOLAR) and that are a full grid of those numbers are not all
+solved. The grid of the cases is the resolution of the sweep: first the
+cases every ADAPTIVE_SWEEP_STEP grid steps (and the last ones) are solved,
+then each cell of this coarse grid is looked at:
+
+    if the corners of a cell have the same technology mix, the cases inside
+    it are not solved but get the solution of a corner;
+    else the cell is cut in half along each of its axes that is longer than
+    one grid step, and the halves are looked at the same way.
+
+The mix of two solutions is the same if the same technologies are built
+(capacity above SCREENING_MARGIN per kW of mean demand, see Screening.py)
+and no capacity differs by more than ADAPTIVE_SWEEP_TOLERANCE per kW of mean
+demand. So the solves are where the mix changes, down to the grid step.
+
+A case inside gets the corner solution that is cheapest at its own costs,
+with SYSTEM_COST at those costs (system_cost in Model_Results.py). In a grid
+of costs (FIXED_COST_*, VAR_COST_*, CO2_PRICE) that solution is feasible, so
+SYSTEM_COST is at most that much above the optimum. The optimal cost is
+concave in the costs, so it is at least the interpolation of the optimal
+costs at the corners: that is the SYSTEM_COST_BOUND of a filled case, and
+COST_GAP the bound on its relative cost error. The fill is exact (COST_GAP 0)
+only if the corners have the same solution: the costs for which a solution
+is optimal are a convex set. Corners whose capacities differ by less than
+the tolerance are not the same solution. For other inputs (e.g.
+efficiencies) a fill is an approximation with no bound. A case that is not
+solved itself has the duals (PRICE) of the corner's solve and PRICE_VALID
+False, and no build or solve time.
+
+With hourly dispatch, the capacities of the optimum shift a little with
+every change of the costs, so with the default tolerance nearly all cells
+are refined down to the grid step and nearly all cases are solved. A larger
+ADAPTIVE_SWEEP_TOLERANCE saves solves at the cost of fill errors. In a grid
+of costs, ADAPTIVE_SWEEP_COST_GAP > 0 fills a cell whose corners build the
+same technologies also if their capacities differ by more than the
+tolerance, as long as the COST_GAP of each case inside is within it. The
+cost error is then bounded, but the capacities of a filled case can differ
+from those of its optimum where the optimum is flat.
+
+core_model_loop then saves all cases as usual, so the results have the same
+format as a sweep in which every case is solved (Save_Basic_Results.py,
+Postprocess_Results.contour_plot). ADAPTIVE_SOLVED tells which cases were
+solved, ADAPTIVE_SOLVES how many solves the sweep took.
+
+Only cases that core_model_loop solves as one LP are swept this way (see
+one_lp_case in Parametric_Sweep.py), not those on a parametric path, and
+only grids with more than ADAPTIVE_SWEEP_STEP cases along one axis at least.
+
+"""
+
+import itertools
+import numpy as np
+
+from Model_Results import capacity_result_keys, system_cost
+from Numerics_Scaling import auto_scaling
+from Parametric_Sweep import cost_keys, one_lp_case
+
+#%%
+def grid_family_key(case_dic):
+    # Cases with the same key differ only in numbers, the axes of their grid
+    key = []
+    for name in sorted(case_dic):
+        value = case_dic[name]
+        if name == 'CASE_NAME' or isinstance(value, (float, np.floating)):
+            continue
+        if isinstance(value, (list, np.ndarray)):
+            value = np.asarray(value).tobytes()
+        key.append((name, value))
+    return tuple(key)
+
+def sweep_grid(case_dic_list, case_indices):
+    # [axes, values of each axis, grid index -> case index] if the cases are a full grid
+    # of the numbers that vary, else None
+    first = case_dic_list[case_indices[0]]
+    axes = [name for name in sorted(first) if isinstance(first[name], (float, np.floating))
+            and len(set(case_dic_list[index][name] for index in case_indices)) > 1]
+    if len(axes) == 0:
+        return None
+    values = [np.unique([case_dic_list[index][name] for index in case_indices]) for name in axes]
+    grid = {}
+    for index in case_indices:
+        point = tuple(int(np.searchsorted(axis_values, case_dic_list[index][name]))
+                      for name, axis_values in zip(axes, values))
+        if point in grid:
+            return None
+        grid[point] = index
+    if len(grid) != np.prod([len(axis_values) for axis_values in values]):
+        return None
+    return [axes, values, grid]
+
+#%%
+def mix_changes(case_dic, results, tolerance):
+    # True if the technology mix of <results> is not the same, or one of them failed
+    # (with <tolerance> None, only if other technologies are built)
+    if any(result['PROBLEM_STATUS'] != 'optimal' for result in results):
+        return True
+    mean_demand = np.mean(case_dic['DEMAND_SERIES'])
+    for key in capacity_result_keys:
+        capacities = np.array([result[key] for result in results])
+        built = capacities > case_dic['SCREENING_MARGIN'] * mean_demand
+        if np.any(built) != np.all(built):
+            return True
+        if tolerance is not None and np.ptp(capacities) > tolerance * mean_demand:
+            return True
+    return False
+
+def corner_weights(cell, point, values):
+    # weights of the corners of <cell> (in the order of itertools.product) whose sum, times
+    # the numbers at the corners, is the numbers at <point> (multilinear interpolation)
+    fractions = [(axis_values[index] - axis_values[lo]) / (axis_values[hi] - axis_values[lo])
+                 for (lo, hi), index, axis_values in zip(cell, point, values)]
+    return [np.prod([fraction if corner_index == hi else 1. - fraction
+                     for (lo, hi), corner_index, fraction in zip(cell, corner, fractions)])
+            for corner in itertools.product(*cell)]
+
+def cell_points(cell):
+    # grid indices of the points of <cell>, [lo, hi] of each axis
+    return itertools.product(*[range(lo, hi + 1) for lo, hi in cell])
+
+def refine_cell(cell, solve_point, fill, changes):
+    # Solve the corners of <cell> and either fill its points from them or refine it
+    corners = list(itertools.product(*cell))
+    results = [solve_point(corner) for corner in corners]
+    if not changes(cell, results):
+        fill(cell, results)
+        return
+    if all(hi - lo <= 1 for lo, hi in cell):
+        return  # all points are corners
+    halves = [[[lo, (lo + hi) // 2], [(lo + hi) // 2, hi]] if hi - lo > 1 else [[lo, hi]] for lo, hi in cell]
+    for sub_cell in itertools.product(*halves):
+        refine_cell(list(sub_cell), solve_point, fill, changes)
+
+#%%
+def grid_sweep(global_dic, case_dic_list, grid, solve):
+    # Results of the cases of one <grid> (case index -> result), solved where the mix changes
+    axes, values, points = grid
+    shape = [len(axis_values) for axis_values in values]
+    step = max(int(global_dic['ADAPTIVE_SWEEP_STEP']), 1)
+    tolerance = global_dic['ADAPTIVE_SWEEP_TOLERANCE']
+    base_case_dic = case_dic_list[points[(0,)*len(shape)]]
+    cost_grid = set(axes) <= set(cost_keys(base_case_dic) + ['CO2_PRICE'])
+
+    solved = {}     # grid index -> result
+    def solve_point(point):
+        if point not in solved:
+            case_dic = dict(case_dic_list[points[point]])
+            if case_dic['NUMERICS_AUTO_SCALING']:
+                case_dic['NUMERICS_COST_SCALING'], case_dic['NUMERICS_DEMAND_SCALING'], ranges = auto_scaling(case_dic)
+            solved[point] = solve(global_dic, case_dic)
+        return solved[point]
+
+    def fill_point(cell, point, results):
+        # the result of <point> from the <results> at the corners of <cell>
+        case_dic = case_dic_list[points[point]]
+        costs = [system_cost(case_dic, result) for result in results]
+        result = dict(results[int(np.argmin(costs))])
+        result['SYSTEM_COST'] = min(costs)
+        result['SYSTEM_COST_BOUND'] = -1
+        result['COST_GAP'] = -1
+        if cost_grid:
+            # the optimal cost is concave in the costs: at least the interpolation of the corners' optimal costs
+            bound = sum(weight * corner_result['SYSTEM_COST']
+                        for weight, corner_result in zip(corner_weights(cell, point, values), results))
+            result['SYSTEM_COST_BOUND'] = bound
+            result['COST_GAP'] = max(result['SYSTEM_COST'] - bound, 0.) / abs(result['SYSTEM_COST'])
+        result['PRICE_VALID'] = False
+        for key in ['MODEL_BUILD_TIME', 'MODEL_BUILD_TIME_SAVED', 'SOLVE_TIME', 'SOLVE_ITERATIONS']:
+            result[key] = 0
+        return result
+
+    filled = {}     # grid index -> result, of the points that are not solved
+    def fill(cell, results):
+        for point in cell_points(cell):
+            if point in solved or point in filled:
+                continue
+            filled[point] = fill_point(cell, point, results)
+
+    def changes(cell, results):
+        if not mix_changes(base_case_dic, results, tolerance):
+            return False
+        if not cost_grid or global_dic['ADAPTIVE_SWEEP_COST_GAP'] < 0 or mix_changes(base_case_dic, results, None):
+            return True
+        # the same technologies are built: filled if the cost error of each point is within the gap
+        return any(fill_point(cell, point, results)['COST_GAP'] > global_dic['ADAPTIVE_SWEEP_COST_GAP']
+                   for point in cell_points(cell) if point not in solved)
+
+    coarse = [sorted(set(list(range(0, size - 1, step)) + [size - 1])) for size in shape]
+    for cell in itertools.product(*[list(zip(axis[:-1], axis[1:])) for axis in coarse]):
+        refine_cell([list(lo_hi) for lo_hi in cell], solve_point, fill, changes)
+
+    results = {}
+    for point, case_index in points.items():
+        result = solved[point] if point in solved else filled[point]
+        result['ADAPTIVE_SOLVED'] = point in solved
+        result['ADAPTIVE_SOLVES'] = len(solved)
+        results[case_index] = result
+    return results
+
+def adaptive_sweep(global_dic, case_dic_list, solve, excluded = ()):
+    # Results of the cases on an adaptive grid (case index -> result), solved by <solve>
+    # (one LP by the case's engine); the cases <excluded> are left out
+    verbose = global_dic['VERBOSE']
+    families = {}
+    for case_index, case_dic in enumerate(case_dic_list):
+        if one_lp_case(case_dic) and case_index not in excluded:
+            families.setdefault(grid_family_key(case_dic), []).append(case_index)
+
+    adaptive_results = {}
+    for case_indices in families.values():
+        grid = sweep_grid(case_dic_list, case_indices)
+        if grid is None or max(len(axis_values) for axis_values in grid[1]) <= global_dic['ADAPTIVE_SWEEP_STEP']:
+            if verbose and len(case_indices) > 1:
+                print ('adaptive sweep: cases ',[case_dic_list[index]['CASE_NAME'] for index in case_indices],
+                       ' are not a grid finer than ADAPTIVE_SWEEP_STEP, they are solved one by one')
+            continue
+        results = grid_sweep(global_dic, case_dic_list, grid, solve)
+        adaptive_results.update(results)
+        if verbose:
+            print ('adaptive sweep over ',grid[0],': ',len(case_indices),' cases, ',
+                   results[case_indices[0]]['ADAPTIVE_SOLVES'],' LP solves')
+    return adaptive_results
+
+def no_adaptive_sweep():
+    # result entries of a case that is not on an adaptive grid
+    return {
+            'ADAPTIVE_SOLVED':              -1,
+            'ADAPTIVE_SOLVES':              -1
+            }
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+
+Benchmark_Core_Model.py
+
+Times how long it takes cvxpy to build and canonicalize the storage state of
+charge balances used in Core_Model.py, and how much memory that takes.
+
+Two formulations are compared for the four reservoirs in the model (STORAGE,
+STORAGE2, PGP_STORAGE and CSP storage):
+
+    'loop'   -- one scalar constraint per hour, as Core_Model.py used to do
+    'vector' -- one vector constraint per reservoir using <next_hour>
+
+Usage:
+
+    python Benchmark_Core_Model.py [--vector_only] [num_time_periods ...]
+
+The default is 8760 hours for both formulations and 87600 hours for the
+vector formulation only: the loop formulation at 87600 hours takes hours and
+tens of GB of memory. Hours given on the command line are run with both
+formulations unless --vector_only is given.
+
+Build time and peak memory are measured in separate passes because tracing
+memory allocations slows down the build considerably.
+
+"""
+
+import sys
+import time
+import tracemalloc
+import cvxpy as cvx
+
+from Core_Model import next_hour
+
+#%%
+def storage_constraints(num_time_periods, formulation):
+
+    constraints = []
+    fcn2min = 0
+    for reservoir in range(4):
+        capacity = cvx.Variable(1)
+        dispatch_to = cvx.Variable(num_time_periods)
+        dispatch_from = cvx.Variable(num_time_periods)
+        energy = cvx.Variable(num_time_periods)
+        charging_efficiency = 0.9
+        decay_rate = 1e-6
+        constraints += [
+                capacity >= 0,
+                dispatch_to >= 0,
+                dispatch_to <= capacity,
+                dispatch_from >= 0,
+                dispatch_from <= capacity,
+                energy >= 0,
+                energy <= capacity
+                ]
+        fcn2min += capacity + cvx.sum(dispatch_to + dispatch_from)/num_time_periods
+
+        if formulation == 'loop':
+            for i in range(num_time_periods):
+                constraints += [
+                        energy[(i+1) % num_time_periods] ==
+                            energy[i] + charging_efficiency * dispatch_to[i]
+                            - dispatch_from[i] - energy[i]*decay_rate
+                        ]
+        else:
+            constraints += [
+                    next_hour(energy) ==
+                        energy + charging_efficiency * dispatch_to
+                        - dispatch_from - energy*decay_rate
+                    ]
+
+    return fcn2min, constraints
+
+#%%
+def benchmark_build(num_time_periods, formulation, solver, trace_memory = False):
+
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.time()
+
+    fcn2min, constraints = storage_constraints(num_time_periods, formulation)
+    prob = cvx.Problem(cvx.Minimize(fcn2min), constraints)
+    prob.get_problem_data(solver) # this is the canonicalization step done in prob.solve
+
+    build_time = time.time() - start_time
+    peak_memory = 0
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return build_time, peak_memory, len(constraints)
+
+#%%
+if __name__ == '__main__':
+
+    args = sys.argv[1:]
+    formulation_list = ['loop','vector']
+    if '--vector_only' in args:
+        args.remove('--vector_only')
+        formulation_list = ['vector']
+
+    if len(args) > 0:
+        num_time_periods_list = [int(arg) for arg in args]
+        loop_max_hours = max(num_time_periods_list)
+    else:
+        num_time_periods_list = [8760, 87600]
+        loop_max_hours = 8760
+
+    # Canonicalize for the solver the model actually uses if it is available
+    if 'GUROBI' in cvx.installed_solvers():
+        solver = 'GUROBI'
+    else:
+        solver = cvx.installed_solvers()[0]
+
+    print ('solver used for canonicalization: ', solver)
+    print ('%10s %8s %12s %14s %16s' % ('hours','form','constraints','build time (s)','peak memory (MB)'))
+    for num_time_periods in num_time_periods_list:
+        for formulation in formulation_list:
+            if formulation == 'loop' and num_time_periods > loop_max_hours:
+                continue
+            build_time, dummy, num_constraints = benchmark_build(num_time_periods, formulation, solver)
+            dummy, peak_memory, dummy = benchmark_build(num_time_periods, formulation, solver, trace_memory = True)
+            print ('%10d %8s %12d %14.2f %16.1f' % (num_time_periods, formulation, num_constraints,
+                                                     build_time, peak_memory / 1e6))
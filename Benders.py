@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+
+Benders.py
+
+Benders decomposition of a case into capacities and the dispatch of time blocks,
+for cases whose LP is too large to be solved in one piece.
+
+With BENDERS_BLOCKS = B (a case keyword, default -1 = off) the hours of the
+case are split into B consecutive time blocks of about the same length.
+
+    The master problem has the calculated capacities of the case (the
+    CAPACITY_* keywords < 0), the state of charge of each storage at the start
+    of each block and, for each block, an estimate of the variable cost of its
+    dispatch. It minimizes the fixed costs plus the estimates, subject to the
+    cuts found so far.
+
+    The subproblem of a block is the dispatch of that block with the
+    capacities of the master problem, starting at the master's state of
+    charge at the start of the block and ending at (at least) the one of the
+    next block (the blocks are cyclic, as the hours of a case are). It is a
+    rolling horizon window of core_model (ROLLING_WINDOW, see Rolling_Horizon.py)
+    with BENDERS_SUBPROBLEM set: the capacities are variables fixed to those of
+    the master problem, and their duals, with the duals of the initial and
+    terminal state of charge, give the cut of the block.
+
+    So that every subproblem has a solution, demand that cannot be met is bought
+    as UNMET_DEMAND and a state of charge that cannot be reached at the end of a
+    block is bought as a shortfall, both at BENDERS_PENALTY per kWh, far more
+    than any kWh costs in the case. (A case with UNMET_DEMAND keeps its own cost
+    of unmet demand.) A case that still pays the penalty when the iterations stop
+    has no solution: PROBLEM_STATUS is 'infeasible'.
+
+Each iteration solves the B subproblems at the master solution (the first one
+without any capacity and with empty storage), in parallel in BENDERS_WORKERS
+processes (default 1), then the master problem with their cuts. The master
+gives a lower bound of the system cost, the subproblems (with the fixed costs)
+an upper bound. The
+iterations stop when the relative gap between them is at most BENDERS_TOLERANCE
+(default 1e-3) or after BENDERS_MAX_ITERATIONS (default 100).
+
+The result is that of the best iteration, joined over the blocks into one
+result for all hours in the usual format. SYSTEM_COST_BOUND is the lower bound
+and COST_GAP the final gap. BENDERS_ITERATIONS is the number of iterations
+and BENDERS_LOG has [iteration, lower bound, upper bound, gap, seconds] for
+each iteration, also printed with VERBOSE.
+
+With WEATHER_YEAR_BLOCKS (storage cyclic within each weather year, see
+following_hours in Model_Results.py) the blocks are the weather years of the
+case (YEAR_SERIES), whatever B > 1. The years only share the capacities, so
+each subproblem is the cyclic dispatch of one year and the master problem has
+no state of charge.
+
+Only the largest LP held at a time is that of a block, so memory needs go with
+the length of the blocks rather than the length of the case. Cases with
+SYSTEM_RELIABILITY (one constraint over all hours) cannot be split into
+blocks, they are solved as one LP. The subproblems are solved with the CVXPY
+engine.
+
+"""
+
+import concurrent.futures
+import time
+import cvxpy as cvx
+import numpy as np
+
+from Model_Results import capacity_result_keys, component_of_capacity, free_capacity_keys
+from Rolling_Horizon import slice_case, join_results, year_segments
+from Solver_Backend import solve_with_backend, profile_options
+from Technology_Registry import technology_registry
+from Time_Aggregation import stored_energy_names
+
+#%%
+def time_blocks(case_dic):
+    # [first hour, end hour] of each time block
+    if case_dic.get('WEATHER_YEAR_BLOCKS', False):
+        return year_segments(case_dic)
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    num_blocks = min(int(case_dic['BENDERS_BLOCKS']), num_time_periods)
+    ends = [(num_time_periods * (block + 1)) // num_blocks for block in range(num_blocks)]
+    return list(zip([0] + ends[:-1], ends))
+
+def linked_energy_names(case_dic):
+    # storage whose state of charge links the blocks (none between weather years)
+    if case_dic.get('WEATHER_YEAR_BLOCKS', False):
+        return []
+    return stored_energy_names(case_dic)
+
+def bounded_capacity_keys(case_dic):
+    # capacities <= max demand (see add_stacked_capacity in Core_Model.py)
+    return ['CAPACITY_' + technology['NAME'] for technology in technology_registry
+            if technology['BOUNDED'] and technology['KIND'] in ['GENERATOR','STORAGE']]
+
+def benders_penalty(case_dic):
+    # cost of a kWh that is not met or not stored: more than building one of everything
+    # for a single hour of the case would cost
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    cost = 0.
+    for technology in technology_registry:
+        if technology['NAME'] in case_dic['SYSTEM_COMPONENTS']:
+            cost += num_time_periods * sum(abs(case_dic[cost_key]) for capacity_key, cost_key in technology['FIXED_COSTS'])
+            cost += sum(abs(case_dic[cost_key]) for series_key, cost_key in technology['VAR_COSTS'])
+    return 10. * cost
+
+def block_case(case_dic, first, end, penalty):
+    # subproblem of the hours first ... end-1, without the values from the master problem
+    block_case_dic = dict(slice_case(case_dic, first, end), BENDERS_SUBPROBLEM = True,
+                          ROLLING_WINDOW = not case_dic.get('WEATHER_YEAR_BLOCKS', False),
+                          MAX_DEMAND = np.max(case_dic['DEMAND_SERIES']), BENDERS_PENALTY = penalty)
+    block_case_dic['SYSTEM_COMPONENTS'] = list(case_dic['SYSTEM_COMPONENTS'])
+    if 'UNMET_DEMAND' not in block_case_dic['SYSTEM_COMPONENTS']:
+        block_case_dic['SYSTEM_COMPONENTS'].append('UNMET_DEMAND')
+        block_case_dic['VAR_COST_UNMET_DEMAND'] = penalty
+    # fixed costs are in the master problem
+    for technology in technology_registry:
+        for capacity_key, cost_key in technology['FIXED_COSTS']:
+            block_case_dic[cost_key] = 0.
+    return block_case_dic
+
+def all_capacities(case_dic, capacity):
+    # capacity key -> the calculated capacity (from <capacity>, in the order of
+    # free_capacity_keys) or the fixed one
+    free_keys = free_capacity_keys(case_dic)
+    capacities = {key: capacity[i] for i, key in enumerate(free_keys)}
+    for key in capacity_result_keys:
+        if key not in capacities and component_of_capacity(key) in case_dic['SYSTEM_COMPONENTS']:
+            capacities[key] = case_dic[key]
+    return capacities
+
+def fixed_costs(case_dic, capacities):
+    # the fixed costs of the system with <capacities> (numbers or variables)
+    cost = 0
+    for technology in technology_registry:
+        if technology['NAME'] in case_dic['SYSTEM_COMPONENTS']:
+            for capacity_key, cost_key in technology['FIXED_COSTS']:
+                cost += capacities[capacity_key] * case_dic[cost_key]
+    return cost
+
+#%%
+def master_problem(case_dic, blocks, cuts):
+    # The master problem with the cuts so far, returns the problem and its variables
+    free_keys = free_capacity_keys(case_dic)
+    names = linked_energy_names(case_dic)
+    num_blocks = len(blocks)
+    capacity = cvx.Variable(len(free_keys), nonneg = True)
+    energy = cvx.Variable((len(names), num_blocks), nonneg = True)   # state of charge at the start of each block
+    cost_estimate = cvx.Variable(num_blocks, nonneg = True)
+    capacities = all_capacities(case_dic, capacity)
+
+    constraints = []
+    for key in bounded_capacity_keys(case_dic):
+        if key in free_keys:
+            constraints += [capacities[key] <= np.max(case_dic['DEMAND_SERIES'])]
+    for i, name in enumerate(names):
+        constraints += [energy[i,:] <= capacities['CAPACITY_' + name]]
+    if len(cuts['BLOCK']) > 0:
+        # cost_estimate[block] >= constant + gradient . (capacities, state of charge)
+        block_rows = np.zeros((len(cuts['BLOCK']), num_blocks))
+        block_rows[np.arange(len(cuts['BLOCK'])), cuts['BLOCK']] = 1.
+        cut_value = np.array(cuts['CONSTANT'])
+        if len(free_keys) > 0:
+            cut_value = cut_value + np.array(cuts['CAPACITY']) @ capacity
+        if len(names) > 0:
+            cut_value = cut_value + np.array(cuts['ENERGY']) @ cvx.vec(energy, order = 'F')
+        constraints += [block_rows @ cost_estimate >= cut_value]
+
+    prob = cvx.Problem(cvx.Minimize(fixed_costs(case_dic, capacities) + cvx.sum(cost_estimate)), constraints)
+    return prob, capacity, energy, cost_estimate
+
+def add_cuts(case_dic, blocks, cuts, master_capacity, master_energy, block_results):
+    # The cut of each block at the master solution: the cost of its dispatch, weighted by its
+    # share of the hours of the case, and its derivatives
+    free_keys = free_capacity_keys(case_dic)
+    names = linked_energy_names(case_dic)
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    num_blocks = len(blocks)
+    for block, ((first, end), result) in enumerate(zip(blocks, block_results)):
+        weight = (end - first) / num_time_periods
+        duals = result['BENDERS_DUALS']
+        capacity_gradient = weight * np.array([duals['MASTER_' + key] for key in free_keys])
+        energy_gradient = np.zeros((len(names), num_blocks))
+        for i, name in enumerate(names):
+            energy_gradient[i, block] += weight * duals['INITIAL_ENERGY_' + name]
+            energy_gradient[i, (block + 1) % num_blocks] += weight * duals['TERMINAL_ENERGY_' + name]
+        cuts['BLOCK'].append(block)
+        cuts['CAPACITY'].append(capacity_gradient)
+        cuts['ENERGY'].append(energy_gradient.flatten(order = 'F'))
+        cuts['CONSTANT'].append(weight * result['SYSTEM_COST'] - capacity_gradient @ master_capacity
+                                - np.sum(energy_gradient * master_energy))
+
+def subproblem_cases(case_dic, blocks, penalty, master_capacity, master_energy):
+    # the subproblems at the master solution
+    free_keys = free_capacity_keys(case_dic)
+    names = linked_energy_names(case_dic)
+    num_blocks = len(blocks)
+    block_case_dics = []
+    for block, (first, end) in enumerate(blocks):
+        block_case_dic = block_case(case_dic, first, end, penalty)
+        for i, key in enumerate(free_keys):
+            block_case_dic['MASTER_' + key] = master_capacity[i]
+        for i, name in enumerate(names):
+            block_case_dic['INITIAL_ENERGY_' + name] = master_energy[i, block]
+            block_case_dic['TERMINAL_ENERGY_' + name] = master_energy[i, (block + 1) % num_blocks]
+        block_case_dics.append(block_case_dic)
+    return block_case_dics
+
+#%%
+def benders(global_dic, case_dic, solve):
+    # Result of <case_dic> solved by Benders decomposition, with <solve> (core_model) for the subproblems
+    verbose = global_dic['VERBOSE']
+    block_global_dic = dict(global_dic, VERBOSE = False)   # the iterations are logged instead
+    blocks = time_blocks(case_dic)
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    penalty = benders_penalty(case_dic)
+    solver = case_dic['SOLVER']
+    num_workers = min(int(case_dic['BENDERS_WORKERS']), len(blocks))
+    pool = concurrent.futures.ProcessPoolExecutor(num_workers) if num_workers > 1 else None
+
+    start_time = time.time()
+    cuts = {'BLOCK':[], 'CONSTANT':[], 'CAPACITY':[], 'ENERGY':[]}
+    totals = {'MODEL_BUILD_TIME':0., 'MODEL_BUILD_TIME_SAVED':0., 'SOLVE_TIME':0., 'SOLVE_ITERATIONS':0}
+    best = {'UPPER_BOUND':np.inf, 'RESULTS':None}
+    lower_bound = -np.inf
+    master_status = 'optimal'
+    log = []
+    # the first subproblems are solved without any capacity and with empty storage
+    master_capacity = np.zeros(len(free_capacity_keys(case_dic)))
+    master_energy = np.zeros((len(linked_energy_names(case_dic)), len(blocks)))
+    try:
+        for iteration in range(1, int(case_dic['BENDERS_MAX_ITERATIONS']) + 1):
+            block_case_dics = subproblem_cases(case_dic, blocks, penalty, master_capacity, master_energy)
+            if pool is not None:
+                block_results = list(pool.map(solve, [block_global_dic]*len(blocks), block_case_dics))
+            else:
+                block_results = [solve(block_global_dic, block_case_dic) for block_case_dic in block_case_dics]
+            for key in totals:
+                totals[key] += sum(result[key] for result in block_results)
+            failed = [result['PROBLEM_STATUS'] for result in block_results if result['PROBLEM_STATUS'] != 'optimal']
+            if len(failed) > 0:
+                print ('Benders.py: a time block of ',case_dic['CASE_NAME'],' is ',failed[0])
+                best['RESULTS'] = block_results
+                break
+            upper_bound = fixed_costs(case_dic, all_capacities(case_dic, master_capacity)) + \
+                sum((end - first) / num_time_periods * result['SYSTEM_COST'] for (first, end), result in zip(blocks, block_results))
+            if upper_bound < best['UPPER_BOUND']:
+                best = {'UPPER_BOUND':upper_bound, 'RESULTS':block_results}
+            add_cuts(case_dic, blocks, cuts, master_capacity, master_energy, block_results)
+
+            prob, capacity, energy, cost_estimate = master_problem(case_dic, blocks, cuts)
+            master_start_time = time.time()
+            master_status = solve_with_backend(prob, solver, profile_options(case_dic['SOLVER_PROFILE']))
+            totals['SOLVE_TIME'] += time.time() - master_start_time
+            if master_status != 'optimal':
+                print ('Benders.py: master problem of ',case_dic['CASE_NAME'],' is ',master_status)
+                break
+            lower_bound = max(lower_bound, prob.value)
+            gap = (best['UPPER_BOUND'] - lower_bound) / abs(best['UPPER_BOUND']) if best['UPPER_BOUND'] != 0 else 0.
+            log.append([iteration, lower_bound, best['UPPER_BOUND'], gap, time.time() - start_time])
+            if verbose:
+                print ('Benders iteration %d: lower bound %.6g, upper bound %.6g, gap %.2e, %.1f s' % tuple(log[-1]))
+            if gap <= case_dic['BENDERS_TOLERANCE']:
+                break
+            if capacity.size > 0:
+                master_capacity = np.maximum(np.array(capacity.value).flatten(), 0.)
+            if energy.size > 0:
+                master_energy = np.maximum(np.array(energy.value), 0.)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for result in best['RESULTS']:
+        result.pop('BENDERS_DUALS', None)
+    result = join_results(case_dic, best['RESULTS'])
+    for key in totals:
+        result[key] = totals[key]
+    if result['PROBLEM_STATUS'] == 'optimal':
+        if master_status != 'optimal':
+            result['PROBLEM_STATUS'] = master_status
+        # bought at the penalty: no solution without unmet demand or with less storage
+        penalty_cost = best['UPPER_BOUND'] - result['SYSTEM_COST']
+        if penalty_cost > case_dic['BENDERS_TOLERANCE'] * abs(best['UPPER_BOUND']):
+            print ('Benders.py: ',case_dic['CASE_NAME'],' has no solution without the penalty, ',penalty_cost)
+            result['PROBLEM_STATUS'] = 'infeasible'
+        if len(log) > 0:
+            result['SYSTEM_COST_BOUND'] = lower_bound
+            result['COST_GAP'] = log[-1][3]
+    result['BENDERS_ITERATIONS'] = len(log)
+    result['BENDERS_LOG'] = log
+    return result
+
+def no_benders():
+    # result entries of a case that is not solved by Benders decomposition
+    return {
+            'BENDERS_ITERATIONS':           -1,
+            'BENDERS_LOG':                  []
+            }
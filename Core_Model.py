@@ -22,6 +22,10 @@ Technology:
 Optimization:
     Linear programming (LP)
     Energy balance constraints for the grid and the energy storage facility.
+    With CO2_CAP >= 0, a cap on the CO2 emissions per hour (FIXED_CO2_* per kW
+    of capacity plus the mean of VAR_CO2_* per kWh dispatched). Its dual is the
+    CO2 price that gives the same emissions (CO2_CAP_PRICE, $/kgCO2, on top of
+    any CO2_PRICE), so one solve replaces a search over CO2_PRICE.
 
 Time
     Dec 1, 4-8, 11, 19, 22
@@ -33,391 +37,932 @@ Time
 
 
 
+import concurrent.futures
 import cvxpy as cvx
+import os
 import time
 import datetime
 import numpy as np
+import scipy.sparse as sps
 
 from Storage_Analysis import storage_analysis, no_storage_analysis
 
-from Save_Basic_Results import save_vector_results_as_csv
+from Save_Basic_Results import save_vector_results_as_csv, save_year_results, save_parametric_path
 from Save_Basic_Results import pickle_raw_results
 
+from Direct_Model import core_model_direct
+from Model_Results import capacity_result_keys, vector_result_keys, component_of_capacity, following_hours, following_days
+from Model_Results import failed_result, add_curtailment, template_key, value_range, check_price
+from Model_Results import add_cost_bound, co2_rate, add_co2_emissions
+from Numerics_Scaling import auto_scaling
+from Time_Aggregation import coarsen_case, refine_result, aggregate_case, expand_result
+from Time_Aggregation import compare_to_full_resolution, no_time_aggregation
+from Rolling_Horizon import rolling_horizon, all_capacities_fixed, no_rolling_horizon
+from Benders import benders, no_benders
+from Screening import two_stage_screening, no_screening
+from Parametric_Sweep import parametric_sweep, no_parametric_sweep
+from Adaptive_Sweep import adaptive_sweep, no_adaptive_sweep
+from Sensitivity import sensitivity_case, system_cost_gradient, no_sensitivity
+from Scheduler import predicted_time, longest_first, record_solve_time, predicted_memory
+from Solver_Backend import solve_with_backend, normalize_status, solver_backend, case_solver_options
+from Solver_Backend import solve_with_fallbacks, limit_objectives
+from Technology_Registry import technology_registry, technology_families
+
 # Core function
 #   Linear programming
 #   Output postprocessing
 
 # -----------------------------------------------------------------------------
 
+# Parallel cases (WORKERS = N in the global section of the case input file, or
+# --workers N on the command line of Simple_Energy_Model.py)
+#
+# The cases are independent, so with WORKERS > 1 they are solved by a pool of
+# that many processes, each of which saves the results of its cases
+# (save_vector_results_as_csv, pickle_raw_results) as the serial loop does.
+# Each solve gets SOLVER_THREADS threads, by default the cores divided among
+# the workers, so the solvers do not compete for the cores. The sweeps of
+# PARAMETRIC_SWEEP and ADAPTIVE_SWEEP are solved before, by this process.
+#
+# The results do not depend on the number of workers: every solve has the same
+# seed, warm started cases (SWEEP_WARM_START) are solved by one worker in the
+# same chain as without workers, and SOLVE_ORDER is the order of the serial
+# loop. Only the number of threads can change a solution (solvers that race
+# several methods on several threads, e.g. Gurobi's concurrent LP); give
+# SOLVER_THREADS to have the same threads for any number of workers.
+#
+# The pool takes the longest cases first and, with MEMORY_BUDGET_GB, starts
+# a case only if the predicted memory of the cases being solved stays within
+# the budget (see Scheduler.py).
+
 def core_model_loop (global_dic, case_dic_list):
     verbose = global_dic['VERBOSE']
-    num_cases = len(case_dic_list)
-
-    for case_index in range(num_cases):
 
+    # cases of a sweep of one cost parameter, solved on its exact path (see Parametric_Sweep.py)
+    path_results = {}
+    if global_dic['PARAMETRIC_SWEEP']:
+        path_results, paths = parametric_sweep(global_dic, case_dic_list, one_lp)
+        for case_dic, parameter, path in paths:
+            save_parametric_path(global_dic, case_dic, parameter, path)
+    # cases of a grid sweep, solved only where the technology mix changes (see Adaptive_Sweep.py)
+    adaptive_results = {}
+    if global_dic['ADAPTIVE_SWEEP']:
+        adaptive_results = adaptive_sweep(global_dic, case_dic_list, one_lp, excluded = path_results)
+
+    chains = [[[solve_index, case_index, path_results.get(case_index, adaptive_results.get(case_index))]
+               for solve_index, case_index in chain] for chain in case_chains(global_dic, case_dic_list)]
+
+    num_workers = min(int(global_dic['WORKERS']), len(chains))
+    if num_workers > 1:
+        # the pool takes the chains in this order, so the long ones go first (see Scheduler.py)
+        chains = longest_first(global_dic, case_dic_list, chains)
+        # each worker's solver gets its share of the cores, unless SOLVER_THREADS is given
+        worker_global_dic = dict(global_dic)
+        if worker_global_dic['SOLVER_THREADS'] <= 0:
+            worker_global_dic['SOLVER_THREADS'] = max((os.cpu_count() or 1) // num_workers, 1)
         if verbose:
-            today = datetime.datetime.now()
-            print('---')
-            print ('solving ',case_dic_list[case_index]['CASE_NAME'],' time = ',today)
-
-        result_dic = core_model (global_dic, case_dic_list[case_index])
-
-        if result_dic['PROBLEM_STATUS'] != 'optimal':
-
-#            if verbose:
-#                today = datetime.datetime.now()
-#                print ('solved  ',case_dic_list[case_index]['CASE_NAME'],' time = ',today)
-
-            # put raw results in file for later analysis
-            # NOTE: THIS NEEDS TO BE FIXED UP FOR STORAGE2
-            # =============================================================================
-            #             if 'STORAGE' in case_dic_list[case_index]['SYSTEM_COMPONENTS']:
-            #                 sdic = storage_analysis(global_dic,case_dic_list[case_index],result_dic)
-            #             else:
-            #                 sdic = no_storage_analysis()
-            #                 for key in sdic.keys():
-            #                     result_dic[key] = sdic[key]
-            # 
-            # 
-            # =============================================================================
-        # else:
-
-            if verbose:
-                today = datetime.datetime.now()
-                print ('failed to solve  ',case_dic_list[case_index]['CASE_NAME'],' time = ',today)
-
-        save_vector_results_as_csv( global_dic, case_dic_list[case_index], result_dic )
-        pickle_raw_results( global_dic, case_dic_list[case_index], result_dic )
+            print ('core_model_loop: ',len(chains),' chains of cases in ',num_workers,' processes with ',
+                   int(worker_global_dic['SOLVER_THREADS']),' solver threads each')
+        # the memory of a chain is that of its largest case (see Scheduler.py)
+        memory_budget = global_dic['MEMORY_BUDGET_GB'] if global_dic['MEMORY_BUDGET_GB'] > 0 else np.inf
+        chain_memory = [max(predicted_memory(case_dic_list[case_index]) for solve_index, case_index, result_dic in chain)
+                        for chain in chains]
+        with concurrent.futures.ProcessPoolExecutor(num_workers) as pool:
+            waiting = list(range(len(chains)))
+            running = {}    # future -> chain
+            while len(waiting) > 0 or len(running) > 0:
+                for i in list(waiting):
+                    if len(running) == num_workers:
+                        break
+                    memory_in_use = sum(chain_memory[j] for j in running.values())
+                    if chain_memory[i] > memory_budget and len(running) > 0:
+                        break   # a chain over the budget waits until it can run by itself
+                    if memory_in_use + chain_memory[i] > memory_budget and len(running) > 0:
+                        continue    # a smaller chain may fit
+                    if verbose and memory_budget < np.inf:
+                        print ('core_model_loop: starting ',[case_dic_list[case_index]['CASE_NAME'] for solve_index, case_index, result_dic in chains[i]],
+                               ', predicted memory %.2f GB, %.2f GB in use' % (chain_memory[i], memory_in_use))
+                    running[pool.submit(pool_solve_chain, worker_global_dic,
+                                        [[solve_index, case_dic_list[case_index], result_dic]
+                                         for solve_index, case_index, result_dic in chains[i]])] = i
+                    waiting.remove(i)
+                done, not_done = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    chain = chains[running.pop(future)]
+                    # the workers' copies of the cases have the scaling factors that were used
+                    for [solve_index, case_index, result_dic], case_dic in zip(chain, future.result()):
+                        case_dic_list[case_index] = case_dic
+    else:
+        for chain in chains:
+            solve_chain(global_dic, [[solve_index, case_dic_list[case_index], result_dic]
+                                     for solve_index, case_index, result_dic in chain])
 
     if verbose:
         print('---')
     return
 
-# -----------------------------------------------------------------------------
-
-def core_model (global_dic, case_dic):
+def case_chains (global_dic, case_dic_list):
+    # [solve index, case index] of the cases solved together, in this order, by one process:
+    # with SWEEP_WARM_START the chain of each template, so that each case starts from the
+    # same solution whatever the number of WORKERS, else each case by itself
+    if global_dic['SWEEP_WARM_START']:
+        case_order = sweep_order(case_dic_list)
+        if global_dic['VERBOSE']:
+            print ('sweep mode: cases solved in the order ',case_order)
+    else:
+        case_order = range(len(case_dic_list))
+    chains = {}
+    for solve_index, case_index in enumerate(case_order):
+        case_dic = case_dic_list[case_index]
+        chain_key = (str.upper(case_dic['MODEL_ENGINE']), template_key(case_dic)) \
+            if global_dic['SWEEP_WARM_START'] else case_index
+        chains.setdefault(chain_key, []).append([solve_index, case_index])
+    return list(chains.values())
+
+def solve_chain (global_dic, chain):
+    # Solve and save the cases of <chain> ([solve index, case_dic, result if already solved
+    # by a sweep or None]) in order; returns their case_dics
+    # (engine, template key) -> [iterations, solve time] of the first (cold) solve, which the
+    # warm started cases of that template are compared with (not a cold solve of the same case)
+    cold_solve_stats = {}
+    for solve_index, case_dic, precomputed_result in chain:
+        solve_case(global_dic, case_dic, solve_index, precomputed_result, cold_solve_stats)
+    return [case_dic for solve_index, case_dic, precomputed_result in chain]
+
+def pool_solve_chain (global_dic, chain):
+    # solve_chain in a worker of core_model_loop's pool. With MEMORY_BUDGET_GB the worker
+    # keeps no model templates after a chain, so that it holds the memory of one chain only.
+    chain_case_dics = solve_chain(global_dic, chain)
+    if global_dic['MEMORY_BUDGET_GB'] > 0:
+        core_model_templates.clear()
+    return chain_case_dics
+
+def solve_case (global_dic, case_dic, solve_index, precomputed_result, cold_solve_stats):
+    # Solve <case_dic> (or take <precomputed_result>) and save its results
     verbose = global_dic['VERBOSE']
-    numerics_cost_scaling = case_dic['NUMERICS_COST_SCALING']
-    numerics_demand_scaling = case_dic['NUMERICS_DEMAND_SCALING']
 
-    #if verbose:
-    #    print ('Core_Model.py: processing case ',case_dic['CASE_NAME'])
-    demand_series = np.array(case_dic['DEMAND_SERIES'])*numerics_demand_scaling
-    solar_series = case_dic['SOLAR_SERIES'] # Assumed to be normalized per kW capacity
-    wind_series = case_dic['WIND_SERIES'] # Assumed to be normalized per kW capacity
-    solar2_series = case_dic['SOLAR2_SERIES'] # Assumed to be normalized per kW capacity
-    wind2_series = case_dic['WIND2_SERIES'] # Assumed to be normalized per kW capacity
-    csp_series = case_dic['CSP_SERIES'] # Assumed to be normalized per kW capacity
-
-
-    # Fixed costs are assumed to be per time period (1 hour)
-    fixed_cost_natgas = case_dic['FIXED_COST_NATGAS']*numerics_cost_scaling
-    fixed_cost_natgas_ccs = case_dic['FIXED_COST_NATGAS_CCS']*numerics_cost_scaling
-    fixed_cost_solar = case_dic['FIXED_COST_SOLAR']*numerics_cost_scaling
-    fixed_cost_wind = case_dic['FIXED_COST_WIND']*numerics_cost_scaling
-    fixed_cost_solar2 = case_dic['FIXED_COST_SOLAR2']*numerics_cost_scaling
-    fixed_cost_wind2 = case_dic['FIXED_COST_WIND2']*numerics_cost_scaling
-    fixed_cost_nuclear = case_dic['FIXED_COST_NUCLEAR']*numerics_cost_scaling
-    fixed_cost_storage = case_dic['FIXED_COST_STORAGE']*numerics_cost_scaling
-    fixed_cost_storage2 = case_dic['FIXED_COST_STORAGE2']*numerics_cost_scaling
-    fixed_cost_pgp_storage = case_dic['FIXED_COST_PGP_STORAGE']*numerics_cost_scaling
-    fixed_cost_to_pgp_storage = case_dic['FIXED_COST_TO_PGP_STORAGE']*numerics_cost_scaling
-    fixed_cost_from_pgp_storage = case_dic['FIXED_COST_FROM_PGP_STORAGE']*numerics_cost_scaling
-    fixed_cost_csp = case_dic['FIXED_COST_CSP']*numerics_cost_scaling
-    fixed_cost_csp_storage = case_dic['FIXED_COST_CSP_STORAGE']*numerics_cost_scaling
-
-    # Variable costs are assumed to be kWh
-    var_cost_natgas = case_dic['VAR_COST_NATGAS']*numerics_cost_scaling
-    var_cost_natgas_ccs = case_dic['VAR_COST_NATGAS_CCS']*numerics_cost_scaling
-    var_cost_solar = case_dic['VAR_COST_SOLAR']*numerics_cost_scaling
-    var_cost_wind = case_dic['VAR_COST_WIND']*numerics_cost_scaling
-    var_cost_solar2 = case_dic['VAR_COST_SOLAR2']*numerics_cost_scaling
-    var_cost_wind2 = case_dic['VAR_COST_WIND2']*numerics_cost_scaling
-    var_cost_nuclear = case_dic['VAR_COST_NUCLEAR']*numerics_cost_scaling
-    var_cost_unmet_demand = case_dic['VAR_COST_UNMET_DEMAND']*numerics_cost_scaling
-    var_cost_to_storage = case_dic['VAR_COST_TO_STORAGE']*numerics_cost_scaling
-    var_cost_from_storage = case_dic['VAR_COST_FROM_STORAGE']*numerics_cost_scaling
-    var_cost_to_storage2 = case_dic['VAR_COST_TO_STORAGE2']*numerics_cost_scaling
-    var_cost_from_storage2 = case_dic['VAR_COST_FROM_STORAGE2']*numerics_cost_scaling
-    var_cost_to_pgp_storage = case_dic['VAR_COST_TO_PGP_STORAGE']*numerics_cost_scaling #to pgp storage
-    var_cost_from_pgp_storage = case_dic['VAR_COST_FROM_PGP_STORAGE']*numerics_cost_scaling  # from pgp storage
-    var_cost_csp = case_dic['VAR_COST_CSP']*numerics_cost_scaling
-    var_cost_csp_storage = case_dic['VAR_COST_CSP_STORAGE']*numerics_cost_scaling
-
-    charging_efficiency_storage = case_dic['CHARGING_EFFICIENCY_STORAGE']
-    charging_time_storage       = case_dic['CHARGING_TIME_STORAGE']
-    decay_rate_storage          = case_dic['DECAY_RATE_STORAGE'] # fraction of stored electricity lost each hour
-    
-    charging_efficiency_storage2 = case_dic['CHARGING_EFFICIENCY_STORAGE2']
-    charging_time_storage2       = case_dic['CHARGING_TIME_STORAGE2']
-    decay_rate_storage2          = case_dic['DECAY_RATE_STORAGE2'] # fraction of stored electricity lost each hour
-    
-    charging_efficiency_pgp_storage = case_dic['CHARGING_EFFICIENCY_PGP_STORAGE']
-    decay_rate_pgp_storage = case_dic['DECAY_RATE_PGP_STORAGE']
-    
-    charging_efficiency_csp_storage = case_dic['CHARGING_EFFICIENCY_CSP_STORAGE']
-    decay_rate_csp_storage = case_dic['DECAY_RATE_CSP_STORAGE']
+    if verbose:
+        today = datetime.datetime.now()
+        print('---')
+        print ('solving ',case_dic['CASE_NAME'],' time = ',today)
 
-    system_components = case_dic['SYSTEM_COMPONENTS']
+    if case_dic['NUMERICS_AUTO_SCALING']:
+        # the chosen factors replace NUMERICS_COST_SCALING and NUMERICS_DEMAND_SCALING of the case
+        cost_scaling, demand_scaling, ranges = auto_scaling(case_dic)
+        case_dic['NUMERICS_COST_SCALING'] = cost_scaling
+        case_dic['NUMERICS_DEMAND_SCALING'] = demand_scaling
+        if verbose:
+            print ('numerics scaling: cost %.0e, demand %.0e; ranges: objective [%.1e, %.1e], '
+                   'rhs [%.1e, %.1e], matrix [%.1e, %.1e]' %
+                   ((cost_scaling, demand_scaling) + tuple(ranges['OBJECTIVE']) +
+                    tuple(ranges['RHS']) + tuple(ranges['MATRIX'])))
+
+    engine = str.upper(case_dic['MODEL_ENGINE'])
+    representative_days = case_dic['REPRESENTATIVE_DAYS'] > 0
+    coarse_time_steps = case_dic['TIME_STEP_HOURS'] > 1
+    rolling_windows = case_dic['ROLLING_HORIZON_HOURS'] > 0
+    if rolling_windows and not all_capacities_fixed(case_dic):
+        print ('ROLLING_HORIZON_HOURS: case ',case_dic['CASE_NAME'],
+               ' has capacities to optimize, it is solved as one LP')
+        rolling_windows = False
+    if rolling_windows and case_dic['CO2_CAP'] >= 0:
+        print ('ROLLING_HORIZON_HOURS: CO2_CAP of case ',case_dic['CASE_NAME'],
+               ' is over all hours, it is solved as one LP')
+        rolling_windows = False
+    sensitivity = case_dic['SENSITIVITY_REPORT']
+    if sensitivity and engine == 'DIRECT':
+        print ('SENSITIVITY_REPORT: case ',case_dic['CASE_NAME'],' is solved with CVXPY')
+        engine = 'CVXPY'
+    benders_blocks = case_dic['BENDERS_BLOCKS'] > 1
+    if benders_blocks and case_dic['SYSTEM_RELIABILITY'] >= 0:
+        print ('BENDERS_BLOCKS: SYSTEM_RELIABILITY of case ',case_dic['CASE_NAME'],
+               ' is over all hours, it is solved as one LP')
+        benders_blocks = False
+    if benders_blocks and case_dic['CO2_CAP'] >= 0:
+        print ('BENDERS_BLOCKS: CO2_CAP of case ',case_dic['CASE_NAME'],
+               ' is over all hours, it is solved as one LP')
+        benders_blocks = False
+    # two stage screening of the technologies, for cases solved as one LP at full resolution
+    screening = (case_dic['SCREENING_DAYS'] > 0 or case_dic['SCREENING_TIME_STEP_HOURS'] > 1) \
+        and not (rolling_windows or benders_blocks or representative_days or coarse_time_steps)
+    if rolling_windows:
+        # dispatch of a fixed fleet in windows (see Rolling_Horizon.py)
+        solve_case_dic = case_dic
+        if engine == 'DIRECT':
+            print ('ROLLING_HORIZON_HOURS: the windows of case ',case_dic['CASE_NAME'],
+                   ' are solved with CVXPY')
+            engine = 'CVXPY'
+        result_dic = rolling_horizon(global_dic, solve_case_dic, core_model)
+        result_dic.update(no_time_aggregation())
+        if verbose:
+            print ('rolling horizon: ',result_dic['ROLLING_WINDOWS'],' windows, LP size ',result_dic['MODEL_SIZE'])
+    elif benders_blocks:
+        # capacities in a master problem, dispatch in time blocks (see Benders.py)
+        solve_case_dic = case_dic
+        if engine == 'DIRECT':
+            print ('BENDERS_BLOCKS: the time blocks of case ',case_dic['CASE_NAME'],
+                   ' are solved with CVXPY')
+            engine = 'CVXPY'
+        result_dic = benders(global_dic, solve_case_dic, core_model)
+        result_dic.update(no_time_aggregation())
+        if verbose:
+            print ('Benders decomposition: ',result_dic['BENDERS_ITERATIONS'],' iterations, gap ',
+                   result_dic['COST_GAP'],', LP size of a block ',result_dic['MODEL_SIZE'])
+    elif representative_days or coarse_time_steps:
+        # solved with coarser time steps and/or over representative days (see Time_Aggregation.py),
+        # the results are mapped back to the hours of the full series
+        coarse_case_dic = case_dic
+        if coarse_time_steps:
+            coarse_case_dic = coarsen_case(coarse_case_dic)
+        solve_case_dic = coarse_case_dic
+        if representative_days:
+            solve_case_dic = aggregate_case(coarse_case_dic)
+            if engine == 'DIRECT':
+                print ('REPRESENTATIVE_DAYS: the DIRECT engine has no representative days, case ',
+                       case_dic['CASE_NAME'],' is solved with CVXPY')
+                engine = 'CVXPY'
+        solve = core_model_direct if engine == 'DIRECT' else core_model
+        result_dic = solve (global_dic, solve_case_dic)
+        if representative_days:
+            expand_result(coarse_case_dic, solve_case_dic, result_dic)
+        if coarse_time_steps:
+            refine_result(case_dic, coarse_case_dic, result_dic)
+        for key, value in no_time_aggregation().items():
+            result_dic.setdefault(key, value)
+        if case_dic['TIME_AGGREGATION_CHECK']:
+            full_result_dic = solve (global_dic, case_dic)
+            compare_to_full_resolution(case_dic, result_dic, full_result_dic)
+        if verbose:
+            print ('time step: ',result_dic['TIME_STEP_HOURS'],' h, representative days: ',
+                   result_dic['REPRESENTATIVE_DAYS'],', series error ',
+                   result_dic['AGGREGATION_SERIES_ERROR'],', LP size ',result_dic['MODEL_SIZE'])
+            if case_dic['TIME_AGGREGATION_CHECK']:
+                print ('full resolution: LP size ',result_dic['FULL_RESOLUTION_MODEL_SIZE'],
+                       ', cost error ',result_dic['AGGREGATION_COST_ERROR'],
+                       ', capacity error ',result_dic['AGGREGATION_CAPACITY_ERROR'])
+    else:
+        solve_case_dic = case_dic
+        solve = core_model_direct if engine == 'DIRECT' else core_model
+        if precomputed_result is not None:
+            result_dic = precomputed_result
+        elif screening:
+            # see Screening.py, stage one may have representative days and is solved with CVXPY
+            result_dic = two_stage_screening(global_dic, solve_case_dic, solve, core_model)
+        else:
+            result_dic = solve (global_dic, solve_case_dic)
+        result_dic.update(no_time_aggregation())
+    if not rolling_windows:
+        result_dic.update(no_rolling_horizon())
+    if rolling_windows or not benders_blocks:
+        result_dic.update(no_benders())
+    if not screening:
+        result_dic.update(no_screening())
+    for key, value in no_parametric_sweep().items():
+        result_dic.setdefault(key, value)
+    for key, value in no_adaptive_sweep().items():
+        result_dic.setdefault(key, value)
+    for key, value in no_sensitivity().items():
+        result_dic.setdefault(key, value)
+    add_co2_emissions(case_dic, result_dic)
+    if verbose and case_dic['CO2_CAP'] >= 0:
+        print ('CO2 emissions ',result_dic['CO2_EMISSIONS'],' cap ',case_dic['CO2_CAP'],
+               ' implied CO2 price ',result_dic['CO2_CAP_PRICE'])
+
+    result_dic['SOLVE_ORDER'] = solve_index
+    result_dic['ITERATIONS_VS_FIRST_SOLVE'] = 0
+    result_dic['SOLVE_TIME_VS_FIRST_SOLVE'] = 0.
+    chain_key = (engine, template_key(solve_case_dic))
+    if result_dic['WARM_START'] and chain_key in cold_solve_stats:
+        result_dic['ITERATIONS_VS_FIRST_SOLVE'] = cold_solve_stats[chain_key][0] - result_dic['SOLVE_ITERATIONS']
+        result_dic['SOLVE_TIME_VS_FIRST_SOLVE'] = cold_solve_stats[chain_key][1] - result_dic['SOLVE_TIME']
+    elif result_dic['PROBLEM_STATUS'] == 'optimal':
+        cold_solve_stats[chain_key] = [result_dic['SOLVE_ITERATIONS'], result_dic['SOLVE_TIME']]
+
+    if verbose and result_dic['WARM_START']:
+        print ('warm start: ',result_dic['SOLVE_ITERATIONS'],' iterations, ',
+               result_dic['ITERATIONS_VS_FIRST_SOLVE'],' iterations and ',
+               result_dic['SOLVE_TIME_VS_FIRST_SOLVE'],' seconds fewer than the first cold solve of the chain')
+
+    # the time the case took vs. its prediction, for the predictions of later runs (see Scheduler.py)
+    result_dic['PREDICTED_TIME'] = predicted_time(global_dic, case_dic)
+    result_dic['PREDICTED_MEMORY'] = predicted_memory(case_dic)
+    if precomputed_result is None:
+        record_solve_time(global_dic, case_dic, result_dic)
+    if verbose:
+        print ('predicted time %.3g s, took %.3g s' %
+               (result_dic['PREDICTED_TIME'], result_dic['MODEL_BUILD_TIME'] + result_dic['SOLVE_TIME']))
 
-    num_time_periods = len(demand_series)
+    if result_dic['PROBLEM_STATUS'] != 'optimal':
 
-    #    discount_rate = 1.07**(1/(365.24*24))
-    #    discount_vector = discount_rate**-np.arange(num_time_periods)
+#            if verbose:
+#                today = datetime.datetime.now()
+#                print ('solved  ',case_dic['CASE_NAME'],' time = ',today)
+
+        # put raw results in file for later analysis
+        # NOTE: THIS NEEDS TO BE FIXED UP FOR STORAGE2
+        # =============================================================================
+        #             if 'STORAGE' in case_dic['SYSTEM_COMPONENTS']:
+        #                 sdic = storage_analysis(global_dic,case_dic,result_dic)
+        #             else:
+        #                 sdic = no_storage_analysis()
+        #                 for key in sdic.keys():
+        #                     result_dic[key] = sdic[key]
+        # 
+        # 
+        # =============================================================================
+    # else:
 
-    # -------------------------------------------------------------------------
+        if verbose:
+            today = datetime.datetime.now()
+            print ('failed to solve  ',case_dic['CASE_NAME'],' time = ',today)
 
-    #%% Construct the Problem
+    save_vector_results_as_csv( global_dic, case_dic, result_dic )
+    if case_dic['WEATHER_YEAR_BLOCKS']:
+        save_year_results( global_dic, case_dic, result_dic )
+    pickle_raw_results( global_dic, case_dic, result_dic )
 
-    # -----------------------------------------------------------------------------
-    ## Define Variables
+def one_lp (global_dic, case_dic):
+    # <case_dic> solved as one LP by its MODEL_ENGINE
+    if str.upper(case_dic['MODEL_ENGINE']) == 'DIRECT':
+        return core_model_direct(global_dic, case_dic)
+    return core_model(global_dic, case_dic)
 
-    # Number of generation technologies = fixed_cost_Power.size
-    # Number of time steps/units in a given time duration = num_time_periods
-    #       num_time_periods returns an integer value
+# -----------------------------------------------------------------------------
 
-    # Capacity_Power = Installed power capacities for all generation technologies = [kW]
-    # dispatch_Power = Power generation at each time step for each generator = [kWh]
+# Sweep mode (SWEEP_WARM_START = true in the global section of the case input file)
+#
+# In a sweep, neighbouring cases have nearly the same optimum, so a solve that
+# starts from the previous case's solution needs far fewer iterations than a
+# cold start. Cases are solved grouped by model template (only LPs with the
+# same structure can share a starting point) and, within a template, as a
+# chain in which each case is followed by the nearest remaining case in
+# parameter space. The warm start itself is done by the DIRECT engine, which
+# passes the previous simplex basis to HiGHS; cvxpy has no way to pass an LP
+# basis, so CVXPY cases are only reordered (which keeps them on one cached
+# template) and solved cold.
+
+def sweep_parameters (case_dic):
+    # the numbers that distinguish cases with the same template
+    keys = sorted([key for key in case_dic
+                   if key.startswith(('FIXED_COST_','VAR_COST_','CAPACITY_','CHARGING_','DECAY_RATE_'))
+                   or key == 'SYSTEM_RELIABILITY'])
+    parameters = [float(case_dic[key]) for key in keys]
+    for key in ['DEMAND_SERIES'] + [technology['SERIES'] for technology in technology_registry
+                                    if technology['SERIES'] is not None]:
+        if len(case_dic[key]) > 0:
+            parameters.append(np.mean(case_dic[key]))
+        else:
+            parameters.append(0.)
+    return np.array(parameters)
+
+def sweep_order (case_dic_list):
+    templates = {}  # (engine, template key) -> list of case indices, in order of first appearance
+    for case_index, case_dic in enumerate(case_dic_list):
+        chain_key = (str.upper(case_dic['MODEL_ENGINE']), template_key(case_dic))
+        templates.setdefault(chain_key, []).append(case_index)
+
+    case_order = []
+    for case_indices in templates.values():
+        parameters = np.array([sweep_parameters(case_dic_list[case_index]) for case_index in case_indices])
+        # normalize each parameter to the range it spans in the sweep
+        parameter_range = np.ptp(parameters, axis = 0)
+        parameter_range[parameter_range == 0] = 1.
+        parameters = (parameters - np.min(parameters, axis = 0)) / parameter_range
+
+        # start at the case farthest from the center of the sweep, then always go to the nearest remaining case
+        current = np.argmax(np.sum((parameters - np.mean(parameters, axis = 0))**2, axis = 1))
+        remaining = list(range(len(case_indices)))
+        while True:
+            remaining.remove(current)
+            case_order.append(case_indices[current])
+            if len(remaining) == 0:
+                break
+            distance = np.sum((parameters[remaining] - parameters[current])**2, axis = 1)
+            current = remaining[np.argmin(distance)]
+
+    return case_order
 
-    # dispatch_Curtailment = Curtailed renewable energy generation at each time step = [kWh]
-    #   This is more like a dummy variable
+# -----------------------------------------------------------------------------
 
-    # Capacity_Storage = Deployed size of energy storage = [kWh]
-    # energy_storage = State of charge for the energy storage = [kWh]
-    # DISPATCH_FROM_STORAGE_Charge = Charging energy flow for energy storage (grid -> storage) = [kW]
-    # DISPATCH_FROM_STORAGE_dispatch = Discharging energy flow for energy storage (grid <- storage) = [kW]
+# The state of charge in the next hour, i.e. x rotated by one step so that the
+# last hour wraps around to the first one. This lets each storage balance be
+# written as a single vector constraint instead of one constraint per hour,
+# which is much cheaper for cvxpy to canonicalize.
+
+def next_hour (x):
+    if len(x.shape) == 2:   # (classes x hours)
+        return cvx.hstack([x[:,1:], x[:,:1]])
+    return cvx.hstack([x[1:], x[:1]])
+
+def storage_balance (model, names, energy, end_of_hour):
+    # The state of charge at the start of the next hour is <end_of_hour>, cyclic over the
+    # time periods. In a rolling horizon window (ROLLING_WINDOW, see Rolling_Horizon.py) it
+    # starts at INITIAL_ENERGY_<name> instead and ends at TERMINAL_ENERGY_<name> or more.
+    # In a time block of a Benders decomposition (see Benders.py) what is missing at the
+    # end is a SHORTFALL that is paid for in the objective.
+    if not model['ROLLING_WINDOW']:
+        if model['FOLLOWING_HOURS'] is None:
+            return [next_hour(energy) == end_of_hour]
+        if len(energy.shape) == 2:  # cyclic within each weather year (WEATHER_YEAR_BLOCKS)
+            return [energy[:, model['FOLLOWING_HOURS']] == end_of_hour]
+        return [energy[model['FOLLOWING_HOURS']] == end_of_hour]
+    if len(energy.shape) == 2:   # (classes x hours)
+        initial_energy = stacked_parameter(model, ['INITIAL_ENERGY_' + name for name in names])
+        terminal_energy = stacked_parameter(model, ['TERMINAL_ENERGY_' + name for name in names])
+        first_hour, last_hour = energy[:,:1], end_of_hour[:,-1:]
+        constraints = [energy[:,1:] == end_of_hour[:,:-1]]
+    else:
+        initial_energy = parameter(model, 'INITIAL_ENERGY_' + names[0])
+        terminal_energy = parameter(model, 'TERMINAL_ENERGY_' + names[0])
+        first_hour, last_hour = energy[0], end_of_hour[-1]
+        constraints = [energy[1:] == end_of_hour[:-1]]
+    if model['BENDERS_SUBPROBLEM']:
+        shortfall = cvx.Variable(last_hour.shape, nonneg = True)
+        model['SHORTFALL'].append(shortfall)
+        last_hour = last_hour + shortfall
+    # the duals of these are the value of stored energy at the start and at the end
+    model['CONSTRAINTS'][initial_energy.name()] = first_hour == initial_energy
+    model['CONSTRAINTS'][terminal_energy.name()] = last_hour >= terminal_energy
+    return constraints + [model['CONSTRAINTS'][initial_energy.name()], model['CONSTRAINTS'][terminal_energy.name()]]
 
-    # UnmetDemand = unmet demand/load = [kWh]
+# -----------------------------------------------------------------------------
 
-    start_time = time.time()    # timer starts
+# Compiled problem templates
+#
+# Building a cvx.Problem and canonicalizing it for the solver is a large part
+# of the run time for short cases and for sweeps with many cases. Cases that
+# have the same system components, the same number of time periods, the same
+# pattern of fixed vs. free capacities and the same kind of reliability
+# constraint lead to LPs with exactly the same structure and differ only in
+# numbers (costs, efficiencies, capacity factors, demand, fixed capacities).
+#
+# So the problem is built once per such template with all of those numbers as
+# cvx.Parameter's (the problem is DPP), kept in <core_model_templates>, and
+# later cases with the same template key only set parameter values before
+# solving. cvxpy then skips canonicalization and only re-applies the
+# parameters. Set MODEL_TEMPLATE_CACHE to false in the global section of the
+# case input file to build every case from scratch.
 
-    max_demand = np.max(demand_series)
-    fcn2min = 0
-    constraints = []
+core_model_templates = {}   # template key (see Model_Results.py) -> model dictionary from build_core_model
 
-#%%-------------------- natural gas ------------------------------------------
-    if 'NATGAS' in system_components:
-        if(case_dic['CAPACITY_NATGAS']<0):
-            capacity_natgas = cvx.Variable(1) # calculate natgas capacity
-            constraints += [
-                capacity_natgas >= 0,
-                capacity_natgas <= max_demand]
-        else:
-            capacity_natgas = case_dic['CAPACITY_NATGAS'] * numerics_demand_scaling
+# -----------------------------------------------------------------------------
 
-        dispatch_natgas = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_natgas >= 0,
-                dispatch_natgas <= capacity_natgas
-                ]
-        fcn2min += capacity_natgas * fixed_cost_natgas + cvx.sum(dispatch_natgas * var_cost_natgas)/num_time_periods
-    else:
-        capacity_natgas = 0
-        dispatch_natgas = np.zeros(num_time_periods)
+def parameter_value (case_dic, name):
+    # Value of the cvx.Parameter called <name> for this case, with numerics scaling applied
+    numerics_cost_scaling = case_dic['NUMERICS_COST_SCALING']
+    numerics_demand_scaling = case_dic['NUMERICS_DEMAND_SCALING']
 
-#%%-------------------- natural gas with CCS -----------------------------------
-    if 'NATGAS_CCS' in system_components:
-        if(case_dic['CAPACITY_NATGAS_CCS']<0):
-            capacity_natgas_ccs = cvx.Variable(1) # calculate natgas capacity
-            constraints += [
-                capacity_natgas_ccs >= 0,
-                capacity_natgas_ccs <= max_demand]
+    if name.startswith('['):    # one row per technology class, see stacked_parameter
+        values = [parameter_value(case_dic, item) for item in name[1:-1].split(',')]
+        if 'SERIES' in name:
+            return np.array([np.broadcast_to(value, (len(case_dic['DEMAND_SERIES']),)) for value in values])
+        return np.reshape(values, (len(values), 1))
+    if name == 'ONE':   # capacity factor of a technology without capacity factor series
+        return 1.
+    if '*' in name: # product of a fixed capacity and another parameter, see capacity_times
+        capacity_key, factor_name = name.split('*')
+        return parameter_value(case_dic, capacity_key) * parameter_value(case_dic, factor_name)
+    if name == 'DEMAND_SERIES':
+        return np.array(case_dic['DEMAND_SERIES'])*numerics_demand_scaling
+    if name == 'MAX_DEMAND':
+        if 'MAX_DEMAND' in case_dic:    # of the whole case, for a time block of it (see Benders.py)
+            return case_dic['MAX_DEMAND']*numerics_demand_scaling
+        return np.max(parameter_value(case_dic, 'DEMAND_SERIES'))
+    if name == 'RELIABILITY_UNMET_DEMAND': # total unmet demand allowed by SYSTEM_RELIABILITY
+        demand = parameter_value(case_dic, 'DEMAND_SERIES')
+        if 'HOUR_WEIGHTS' in case_dic:   # representative days, see Time_Aggregation.py
+            demand = demand * case_dic['HOUR_WEIGHTS']
+        return (1.-case_dic['SYSTEM_RELIABILITY']) * np.sum(demand)
+    if name == 'CO2_CAP':    # kgCO2/h, the emissions are per kW (per kWh) of scaled capacity (dispatch)
+        return case_dic['CO2_CAP']*numerics_demand_scaling
+    if name.startswith(('FIXED_CO2_','VAR_CO2_')):
+        return co2_rate(case_dic, name)
+    if name.startswith('DAILY_RETENTION_'):  # fraction of stored energy left after a day
+        return (1. - case_dic['DECAY_RATE_' + name[len('DAILY_RETENTION_'):]])**case_dic['HOURS_PER_DAY']
+    if name.startswith('INV_CHARGING_TIME_'):
+        return 1./case_dic[name[len('INV_'):]]
+    if name.startswith('FIXED_COST_') or name.startswith('VAR_COST_') or name == 'BENDERS_PENALTY':
+        # Fixed costs are assumed to be per time period (1 hour), variable costs per kWh
+        return case_dic[name]*numerics_cost_scaling
+    if name.startswith(('CAPACITY_','MASTER_CAPACITY_','INITIAL_ENERGY_','TERMINAL_ENERGY_')):
+        return case_dic[name]*numerics_demand_scaling
+    # capacity factor series (normalized per kW capacity), efficiencies and decay rates
+    return np.array(case_dic[name])
+
+def parameter (model, name):
+    # The cvx.Parameter called <name>, created the first time it is used
+    if name not in model['PARAMETERS']:
+        if name.startswith('['):
+            num_classes = len(name[1:-1].split(','))
+            shape = (num_classes, model['NUM_TIME_PERIODS'] if 'SERIES' in name else 1)
+        elif 'SERIES' in name:
+            shape = (model['NUM_TIME_PERIODS'],)
         else:
-            capacity_natgas_ccs = case_dic['CAPACITY_NATGAS_CCS'] * numerics_demand_scaling
+            shape = ()
+        model['PARAMETERS'][name] = cvx.Parameter(shape, name = name)
+    return model['PARAMETERS'][name]
 
-        dispatch_natgas_ccs = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_natgas_ccs >= 0,
-                dispatch_natgas_ccs <= capacity_natgas_ccs
-                ]
-        fcn2min += capacity_natgas_ccs * fixed_cost_natgas_ccs + cvx.sum(dispatch_natgas_ccs * var_cost_natgas_ccs)/num_time_periods
-    else:
-        capacity_natgas_ccs = 0
-        dispatch_natgas_ccs = np.zeros(num_time_periods)
+def stacked_parameter (model, names):
+    # Parameter with one row per technology class, e.g. [FIXED_COST_WIND,FIXED_COST_WIND2]
+    # (classes x 1) or [WIND_SERIES,WIND2_SERIES] (classes x hours)
+    return parameter(model, '[' + ','.join(names) + ']')
 
-#%%-------------------- solar ------------------------------------------
-    if 'SOLAR' in system_components:
-        if(case_dic['CAPACITY_SOLAR']<0):
-            capacity_solar = cvx.Variable(1) # calculate SOLAR capacity
-            constraints += [
-                capacity_solar >= 0]
-        else:
-            capacity_solar = case_dic['CAPACITY_SOLAR'] * numerics_demand_scaling
+def set_core_model_parameters (model, case_dic):
+    for name in model['PARAMETERS']:
+        model['PARAMETERS'][name].value = parameter_value(case_dic, name)
 
-        dispatch_solar = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_solar >= 0,
-                dispatch_solar <= capacity_solar * solar_series
-                ]
-        fcn2min += capacity_solar * fixed_cost_solar + cvx.sum(dispatch_solar * var_cost_solar)/num_time_periods
-    else:
-        capacity_solar = 0
-        dispatch_solar = np.zeros(num_time_periods)
+# -----------------------------------------------------------------------------
 
-#%%-------------------- wind ------------------------------------------
-    if 'WIND' in system_components:
-        if(case_dic['CAPACITY_WIND']<0):
-            capacity_wind = cvx.Variable(1) # calculate wind capacity
-            constraints += [
-                capacity_wind >= 0]
+def add_variable (model, name, size, bounds = None):
+    # Variables that are reported in <result> are stored under their result key
+    model['VARIABLES'][name] = cvx.Variable(size, name = name, bounds = bounds)
+    return model['VARIABLES'][name]
+
+def add_nonneg_variable (model, case_dic, name, size, upper_bound = None):
+    # Variable with 0 <= variable <= upper_bound (None: no upper bound).
+    # Returns the variable and the constraints on it. In the lean formulation these are
+    # variable bounds when <upper_bound> is a parameter (e.g. a fixed capacity) rather
+    # than an expression in another variable. The bound is then a constant, since a
+    # variable with a parameter as bound cannot be multiplied by a parameter (its cost)
+    # in a DPP problem.
+    if not model['LEAN']:
+        variable = add_variable(model, name, size)
+        constraints = [variable >= 0]
+        if upper_bound is not None:
+            constraints += [variable <= upper_bound]
+        return variable, constraints
+    if isinstance(upper_bound, cvx.Parameter):
+        bound_name = upper_bound.name()
+        model['CONSTANTS'][bound_name] = parameter_value(case_dic, bound_name)
+        return add_variable(model, name, size, bounds = [0, model['CONSTANTS'][bound_name]]), []
+    variable = add_variable(model, name, size, bounds = [0, None])
+    if upper_bound is None:
+        return variable, []
+    return variable, [variable <= upper_bound]
+
+def add_nonneg_stacked_variable (model, case_dic, name, shape, upper_bounds):
+    # Variable with one row per technology class and 0 <= variable[rows] <= bound for each
+    # [rows, bound] in <upper_bounds>. As in <add_nonneg_variable>, parameter bounds are
+    # constant variable bounds in the lean formulation.
+    num_rows = shape[0]
+    constant_bound = None
+    if model['LEAN']:
+        for rows, bound in upper_bounds:
+            if isinstance(bound, cvx.Parameter):
+                if constant_bound is None:
+                    constant_bound = np.full(shape, np.inf)
+                model['CONSTANTS'][bound.name()] = parameter_value(case_dic, bound.name())
+                constant_bound[rows] = model['CONSTANTS'][bound.name()]
+        variable = add_variable(model, name, shape, bounds = [0, constant_bound])
+        constraints = []
+    else:
+        variable = add_variable(model, name, shape)
+        constraints = [variable >= 0]
+    for rows, bound in upper_bounds:
+        if model['LEAN'] and isinstance(bound, cvx.Parameter):
+            continue
+        if len(rows) == num_rows:
+            constraints += [variable <= bound]
+        else:
+            constraints += [variable[rows,:] <= bound]
+    return variable, constraints
+
+def constants_match (model, case_dic):
+    # A template whose bounds are constants (lean formulation) can only be reused for
+    # cases with the same values of those constants
+    return all(np.array_equal(value, parameter_value(case_dic, name))
+               for name, value in model['CONSTANTS'].items())
+
+def add_capacity (model, case_dic, capacity_key, bounded = False):
+    # A capacity is calculated if it is negative in the case input, otherwise it is fixed.
+    # Returns the constraints on a calculated capacity.
+    if case_dic[capacity_key] >= 0:
+        return []
+    upper_bound = parameter(model, 'MAX_DEMAND') if bounded else None
+    return add_nonneg_variable(model, case_dic, capacity_key, 1, upper_bound)[1]
+
+def add_stacked_capacity (model, case_dic, classes):
+    # Capacities of the technology classes of one family: the calculated ones (negative
+    # in the case input) are one (classes x 1) variable, e.g. CAPACITY_[WIND,WIND2].
+    # Returns the rows of the calculated and the fixed capacities, the capacity variable
+    # (None if all are fixed) and the constraints on it. The calculated capacities are also
+    # registered under their own result keys.
+    free_rows = [i for i, technology in enumerate(classes) if case_dic['CAPACITY_' + technology['NAME']] < 0]
+    fixed_rows = [i for i in range(len(classes)) if i not in free_rows]
+    if len(free_rows) == 0:
+        return free_rows, fixed_rows, None, []
+    free_classes = [classes[i] for i in free_rows]
+    bounded_rows = [j for j, technology in enumerate(free_classes) if technology['BOUNDED']]
+    upper_bounds = [[bounded_rows, parameter(model, 'MAX_DEMAND')]] if len(bounded_rows) > 0 else []
+    capacity, constraints = add_nonneg_stacked_variable(model, case_dic,
+        'CAPACITY_[' + ','.join(technology['NAME'] for technology in free_classes) + ']',
+        (len(free_rows), 1), upper_bounds)
+    for j, technology in enumerate(free_classes):
+        model['VARIABLES']['CAPACITY_' + technology['NAME']] = capacity[j]
+    return free_rows, fixed_rows, capacity, constraints
+
+def stacked_capacity_times (model, classes, free_rows, fixed_rows, capacity, factor_names):
+    # capacity * factor for each class (see capacity_times), as [rows, expression] pieces
+    # for the calculated and the fixed capacities. factor_names[i] is the name of the
+    # parameter of class i, or None.
+    pieces = []
+    if len(free_rows) > 0:
+        if all(factor_names[i] is None for i in free_rows):
+            pieces.append([free_rows, capacity])
         else:
-            capacity_wind = case_dic['CAPACITY_WIND'] * numerics_demand_scaling
+            factor = stacked_parameter(model, ['ONE' if factor_names[i] is None else factor_names[i] for i in free_rows])
+            pieces.append([free_rows, cvx.multiply(factor, capacity)])
+    if len(fixed_rows) > 0:
+        names = ['CAPACITY_' + classes[i]['NAME'] +
+                 ('' if factor_names[i] is None else '*' + factor_names[i]) for i in fixed_rows]
+        pieces.append([fixed_rows, stacked_parameter(model, names)])
+    return pieces
+
+def capacity_times (model, capacity_key, factor_name = None):
+    # capacity * factor, where <factor_name> is the name of a parameter (e.g. 'SOLAR_SERIES').
+    # For a fixed capacity this product is itself a parameter, since the product of two
+    # parameters is not DPP.
+    if capacity_key in model['VARIABLES']:
+        capacity = model['VARIABLES'][capacity_key]
+        if factor_name is None:
+            return capacity
+        return capacity * parameter(model, factor_name)
+    if factor_name is None:
+        return parameter(model, capacity_key)
+    return parameter(model, capacity_key + '*' + factor_name)
 
-        dispatch_wind = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_wind >= 0,
-                dispatch_wind <= capacity_wind * wind_series
-                ]
-        fcn2min += capacity_wind * fixed_cost_wind + cvx.sum(dispatch_wind * var_cost_wind)/num_time_periods
-    else:
-        capacity_wind = 0
-        dispatch_wind = np.zeros(num_time_periods)
+# -----------------------------------------------------------------------------
+# Representative days (REPRESENTATIVE_DAYS, see Time_Aggregation.py)
+#
+# The hours of the model are then those of N representative days, and each of them
+# stands for as many hours of the full series as its day has members (HOUR_WEIGHTS).
+# Sums and averages over time are weighted with these. Storage is chained through
+# all days of the full series with <add_day_linked_storage>.
+
+def time_sum (model, x):
+    # sum over the hours (the last axis) of x
+    if model['HOUR_WEIGHTS'] is None:
+        return cvx.sum(x)
+    return cvx.sum(x @ model['HOUR_WEIGHTS'])   # (cvx.multiply would not canonicalize with the CPP backend)
+
+def time_average (model, x):
+    # average over the hours of the full series
+    return time_sum(model, x)/model['NUM_FULL_TIME_PERIODS']
+
+def add_day_linked_storage (model, name, energy, net_charge, decay_rate, retention, capacity_pieces):
+    # <energy> (classes x hours) is the state of charge relative to the start of each
+    # representative day and <net_charge> (classes x hours) what is stored in each hour
+    # before losses. The state of charge at the start of each day of the full series is
+    # the variable INTERDAY_<name> (classes x days), which changes from one day to the next
+    # by what its representative day adds; the last day is followed by the first (with
+    # WEATHER_YEAR_BLOCKS, the last day of each weather year by the first of that year).
+    # Within a day, the state of charge has to stay in [0, capacity] with the highest and
+    # lowest relative state of charge of the representative day (losses over the day are
+    # counted in the direction that tightens the bounds).
+    # <retention> is the DAILY_RETENTION_ parameter, <capacity_pieces> are [rows, capacity]
+    # as from stacked_capacity_times.
+    # Returns the INTERDAY variable and the constraints.
+    hours_per_day = model['HOURS_PER_DAY']
+    num_classes, num_hours = energy.shape
+    num_representative_days = num_hours // hours_per_day
+    hours = np.arange(num_hours)
+    first_hours = hours[hours % hours_per_day == 0]
+    last_hours = first_hours + hours_per_day - 1
+    other_hours = hours[hours % hours_per_day != hours_per_day - 1]
+    # representative day -> its hours (N x hours), and -> the days it stands for (N x days)
+    hours_of_day = sps.kron(sps.identity(num_representative_days), np.ones((1, hours_per_day))).tocsr()
+    days_of_representative_day = sps.csr_matrix((np.ones(len(model['DAY_MAP'])),
+        (model['DAY_MAP'], np.arange(len(model['DAY_MAP'])))), shape = (num_representative_days, len(model['DAY_MAP'])))
+
+    interday = add_variable(model, 'INTERDAY_' + name, (num_classes, len(model['DAY_MAP'])))
+    next_day = next_hour(interday) if model['FOLLOWING_DAYS'] is None else interday[:, model['FOLLOWING_DAYS']]
+    highest = cvx.Variable((num_classes, num_representative_days))
+    lowest = cvx.Variable((num_classes, num_representative_days))
+    end_of_hour = energy - cvx.multiply(energy, decay_rate) + net_charge
+    constraints = [
+            energy[:, first_hours] == 0,
+            energy[:, other_hours + 1] == end_of_hour[:, other_hours],
+            next_day == cvx.multiply(interday, retention) + end_of_hour[:, last_hours] @ days_of_representative_day,
+            energy <= highest @ hours_of_day,
+            energy >= lowest @ hours_of_day,
+            cvx.multiply(interday, retention) + lowest @ days_of_representative_day >= 0   # also makes interday >= 0
+            ]
+    for rows, capacity in capacity_pieces:
+        constraints += [(interday + highest @ days_of_representative_day)[rows, :] <= capacity]
+    return interday, constraints
 
+def next_hour_in_day (x, hours_per_day):
+    # as <next_hour>, with the last hour of each representative day wrapping around to
+    # its first hour (storage that is cyclic within each day)
+    hours = np.arange(x.shape[-1])
+    following = np.where(hours % hours_per_day == hours_per_day - 1, hours - hours_per_day + 1, hours + 1)
+    return x[following]
 
-#%%-------------------- solar2 ------------------------------------------
-    if 'SOLAR2' in system_components:
-        if(case_dic['CAPACITY_SOLAR2']<0):
-            capacity_solar2 = cvx.Variable(1) # calculate SOLAR2 capacity
-            constraints += [
-                capacity_solar2 >= 0]
-        else:
-            capacity_solar2 = case_dic['CAPACITY_SOLAR2'] * numerics_demand_scaling
+# -----------------------------------------------------------------------------
+# Model size
+#
+# With LEAN_FORMULATION, simple bounds (dispatch >= 0, dispatch <= fixed capacity,
+# capacity <= max demand) are variable bounds instead of constraint rows, and the
+# rows that are redundant (dispatch from storage <= energy in storage) are left out.
+# Fixed capacities (and max demand) in those bounds are constants, so a cached lean
+# template is only reused by cases with the same fixed capacities. The size of the
+# LP given to the solver is reported together with that of the full formulation.
+
+full_model_sizes = {}   # (template key, solver) -> size of the full formulation
+
+def constraint_matrices (prob, solver):
+    # The constraint matrices cvxpy gives to <solver>. The problem has been solved
+    # already, so this does not canonicalize it again.
+    data = prob.get_problem_data(solver_backend(solver)['CVXPY_SOLVER'])[0]
+    return [data[key] for key in ['A','F','G'] if data.get(key) is not None]
+
+def model_size (prob, solver):
+    # [rows, columns, nonzeros] of the constraint matrix
+    matrices = constraint_matrices(prob, solver)
+    return [sum(matrix.shape[0] for matrix in matrices),
+            matrices[0].shape[1],
+            sum(matrix.nnz for matrix in matrices)]
+
+def matrix_range (prob, solver):
+    # [smallest, largest] absolute nonzero coefficient of the constraint matrix
+    return value_range(np.concatenate([matrix.data for matrix in constraint_matrices(prob, solver)]))
+
+def complementarity (prob):
+    # sum of |dual * slack| over the inequality constraints, see check_price in Model_Results.py
+    # (bounds of the variables of a lean model are not constraints here and are left out)
+    total = 0.
+    for constraint in prob.constraints:
+        if isinstance(constraint, cvx.constraints.Inequality) and constraint.dual_value is not None:
+            total += np.sum(np.abs(constraint.dual_value * constraint.expr.value))
+    return total
+
+def constraint_duals (model, prefixes):
+    # d(objective)/d(parameter) for the parameters on the right hand side of the constraints in
+    # model['CONSTRAINTS'] that are named after them, e.g. INITIAL_ENERGY_[STORAGE,STORAGE2]
+    # (one per row). An inequality is >= its parameter, its dual is >= 0.
+    duals = {}
+    for name, constraint in model['CONSTRAINTS'].items():
+        names = name[1:-1].split(',') if name.startswith('[') else [name]
+        if not names[0].startswith(prefixes):
+            continue
+        dual = np.array(constraint.dual_value).flatten()
+        if not isinstance(constraint, cvx.constraints.Inequality):
+            dual = -1.0 * dual
+        duals.update(zip(names, dual))
+    return duals
+
+def full_model_size (case_dic, solver):
+    key = (template_key(case_dic), str.upper(solver))
+    if key not in full_model_sizes:
+        model = build_core_model(dict(case_dic, LEAN_FORMULATION = False))
+        set_core_model_parameters(model, case_dic)
+        full_model_sizes[key] = model_size(model['PROBLEM'], solver)
+    return full_model_sizes[key]
 
-        dispatch_solar2 = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_solar2 >= 0,
-                dispatch_solar2 <= capacity_solar2 * solar2_series
-                ]
-        fcn2min += capacity_solar2 * fixed_cost_solar2 + cvx.sum(dispatch_solar2 * var_cost_solar2)/num_time_periods
-    else:
-        capacity_solar2 = 0
-        dispatch_solar2 = np.zeros(num_time_periods)
+# -----------------------------------------------------------------------------
 
-#%%-------------------- wind2 ------------------------------------------
-    if 'WIND2' in system_components:
-        if(case_dic['CAPACITY_WIND2']<0):
-            capacity_wind2 = cvx.Variable(1) # calculate SOLAR capacity
-            constraints += [
-                capacity_wind2 >= 0]
-        else:
-            capacity_wind2 = case_dic['CAPACITY_WIND2'] * numerics_demand_scaling
+def build_core_model (case_dic):
 
-        dispatch_wind2 = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_wind2 >= 0,
-                dispatch_wind2 <= capacity_wind2 * wind2_series
-                ]
-        fcn2min += capacity_wind2 * fixed_cost_wind2 + cvx.sum(dispatch_wind2 * var_cost_wind2)/num_time_periods
-    else:
-        capacity_wind2 = 0
-        dispatch_wind2 = np.zeros(num_time_periods)
+    system_components = case_dic['SYSTEM_COMPONENTS']
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
 
-#%%-------------------- nuclear ------------------------------------------
-    if 'NUCLEAR' in system_components:
-        if(case_dic['CAPACITY_NUCLEAR']<0):
-            capacity_nuclear = cvx.Variable(1) # calculate SOLAR capacity
-            constraints += [
-                capacity_nuclear >= 0,
-                capacity_nuclear <= max_demand]
-        else:
-            capacity_nuclear = case_dic['CAPACITY_NUCLEAR'] * numerics_demand_scaling
+    #    discount_rate = 1.07**(1/(365.24*24))
+    #    discount_vector = discount_rate**-np.arange(num_time_periods)
 
-        dispatch_nuclear = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_nuclear >= 0,
-                dispatch_nuclear <= capacity_nuclear
-                ]
-        fcn2min += capacity_nuclear * fixed_cost_nuclear + cvx.sum(dispatch_nuclear * var_cost_nuclear)/num_time_periods
-    else:
-        capacity_nuclear = 0
-        dispatch_nuclear = np.zeros(num_time_periods)
+    model = {
+            'NUM_TIME_PERIODS':num_time_periods,
+            'LEAN':case_dic['LEAN_FORMULATION'],
+            # representative days (see Time_Aggregation.py), None for the full series
+            'HOUR_WEIGHTS':case_dic.get('HOUR_WEIGHTS'),
+            'DAY_MAP':case_dic.get('DAY_MAP'),
+            'HOURS_PER_DAY':case_dic.get('HOURS_PER_DAY'),
+            'NUM_FULL_TIME_PERIODS':len(case_dic['DAY_MAP'])*case_dic['HOURS_PER_DAY'] if 'DAY_MAP' in case_dic else num_time_periods,
+            # a window of a rolling horizon run, with given initial state of charge (see Rolling_Horizon.py)
+            'ROLLING_WINDOW':case_dic.get('ROLLING_WINDOW', False),
+            # a time block of a Benders decomposition, a window with the capacities of the master problem (see Benders.py)
+            'BENDERS_SUBPROBLEM':case_dic.get('BENDERS_SUBPROBLEM', False),
+            'SHORTFALL':[],     # state of charge missing at the end of a Benders time block
+            # storage cyclic within each weather year (WEATHER_YEAR_BLOCKS), None if cyclic over all hours (days)
+            'FOLLOWING_HOURS':following_hours(case_dic) if case_dic.get('WEATHER_YEAR_BLOCKS', False) and 'DAY_MAP' not in case_dic else None,
+            'FOLLOWING_DAYS':following_days(case_dic) if case_dic.get('WEATHER_YEAR_BLOCKS', False) and 'DAY_MAP' in case_dic else None,
+            'CONSTANTS':{},     # parameter name -> value, for parameters used as constant bounds (lean formulation)
+            'PARAMETERS':{},    # parameter name -> cvx.Parameter
+            'VARIABLES':{},     # result key -> cvx.Variable
+            'CONSTRAINTS':{}    # name -> constraint whose dual is needed
+            }
+    if model['HOUR_WEIGHTS'] is not None:
+        # constants in the objective, so a cached template must have the same weights
+        model['CONSTANTS']['HOUR_WEIGHTS'] = model['HOUR_WEIGHTS']
 
-#%%-------------------- storage ------------------------------------------
-    if 'STORAGE' in system_components:
-        if(case_dic['CAPACITY_STORAGE']<0):
-            capacity_storage = cvx.Variable(1) # calculate SOLAR capacity
-            constraints += [
-                capacity_storage >= 0]
-        else:
-            capacity_storage = case_dic['CAPACITY_STORAGE'] * numerics_demand_scaling
+    # -------------------------------------------------------------------------
 
-        dispatch_to_storage = cvx.Variable(num_time_periods)
-        dispatch_from_storage = cvx.Variable(num_time_periods)
-        energy_storage = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_to_storage >= 0,
-                dispatch_to_storage <= capacity_storage / charging_time_storage,
-                dispatch_from_storage >= 0, # dispatch_to_storage is negative value
-                dispatch_from_storage <= capacity_storage / charging_time_storage,
-                dispatch_from_storage <= energy_storage * (1 - decay_rate_storage), # you can't dispatch more from storage in a time step than is in the battery
-                                                                                    # This constraint is redundant
-                energy_storage >= 0,
-                energy_storage <= capacity_storage
-                ]
+    #%% Construct the Problem
 
-        fcn2min += capacity_storage * fixed_cost_storage +  \
-            cvx.sum(dispatch_to_storage * var_cost_to_storage)/num_time_periods + \
-            cvx.sum(dispatch_from_storage * var_cost_from_storage)/num_time_periods
+    # -----------------------------------------------------------------------------
+    ## Define Variables
 
-        for i in range(num_time_periods):
+    # Number of time steps/units in a given time duration = num_time_periods
+    #       num_time_periods returns an integer value
 
-            constraints += [
-                    energy_storage[(i+1) % num_time_periods] ==
-                        energy_storage[i] + charging_efficiency_storage * dispatch_to_storage[i]
-                        - dispatch_from_storage[i] - energy_storage[i]*decay_rate_storage
-                    ]
-        #print ('done with STORAGE')
-        #print (constraints)
-        #print (fcn2min)
-    else:
-        capacity_storage = 0
-        dispatch_to_storage = np.zeros(num_time_periods)
-        dispatch_from_storage = np.zeros(num_time_periods)
-        energy_storage = np.zeros(num_time_periods)
+    # Capacity_Power = Installed power capacities for all generation technologies = [kW]
+    # dispatch_Power = Power generation at each time step for each generator = [kWh]
 
-#%%-------------------- storage ------------------------------------------
-    if 'STORAGE2' in system_components:
-        if(case_dic['CAPACITY_STORAGE2']<0):
-            capacity_storage2 = cvx.Variable(1) # calculate SOLAR capacity
-            constraints += [
-                capacity_storage2 >= 0]
-        else:
-            capacity_storage2 = case_dic['CAPACITY_STORAGE2'] * numerics_demand_scaling
+    # Capacity_Storage = Deployed size of energy storage = [kWh]
+    # energy_storage = State of charge for the energy storage = [kWh]
+    # dispatch_to_storage = Charging energy flow for energy storage (grid -> storage) = [kW]
+    # dispatch_from_storage = Discharging energy flow for energy storage (grid <- storage) = [kW]
 
-        dispatch_to_storage2 = cvx.Variable(num_time_periods)
-        dispatch_from_storage2 = cvx.Variable(num_time_periods)
-        energy_storage2 = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_to_storage2 >= 0,
-                dispatch_to_storage2 <= capacity_storage2 / charging_time_storage2,
-                dispatch_from_storage2 >= 0, # dispatch_to_storage2 is negative value
-                dispatch_from_storage2 <= capacity_storage2 / charging_time_storage2,
-                dispatch_from_storage2 <= energy_storage2 * (1 - decay_rate_storage2), # you can't dispatch more from storage2 in a time step than is in the battery
-                                                                                    # This constraint is redundant
-                energy_storage2 >= 0,
-                energy_storage2 <= capacity_storage2
-                ]
+    # UnmetDemand = unmet demand/load = [kWh]
 
-        fcn2min += capacity_storage2 * fixed_cost_storage2 +  \
-            cvx.sum(dispatch_to_storage2 * var_cost_to_storage2)/num_time_periods + \
-            cvx.sum(dispatch_from_storage2 * var_cost_from_storage2)/num_time_periods
+    fcn2min = 0
+    constraints = []
 
-        #print ('done with STORAGE2')
-        #print (constraints)
-        #print (fcn2min)
-        for i in range(num_time_periods):
+#%%-------------------- generators -------------------------------------------
+    # Each family of generators (see Technology_Registry.py), e.g. WIND and WIND2, has one
+    # (classes x hours) dispatch variable, DISPATCH_[WIND,WIND2]. The dispatch of a class
+    # is a row of it, registered under the class' result key (e.g. DISPATCH_WIND2).
+
+    supply = 0  # supply to the grid in each time period
+    emissions = 0   # CO2 emissions per hour (FIXED_CO2_*, VAR_CO2_*), for CO2_CAP
+    for family, classes in technology_families('GENERATOR', system_components):
+        names = [technology['NAME'] for technology in classes]
+        num_classes = len(classes)
+        free_rows, fixed_rows, capacity, capacity_constraints = add_stacked_capacity(model, case_dic, classes)
+        constraints += capacity_constraints
+        dispatch, dispatch_constraints = add_nonneg_stacked_variable(model, case_dic,
+            'DISPATCH_[' + ','.join(names) + ']', (num_classes, num_time_periods),
+            stacked_capacity_times(model, classes, free_rows, fixed_rows, capacity,
+                                   [technology['SERIES'] for technology in classes]))
+        constraints += dispatch_constraints
+        for fixed_cost in stacked_capacity_times(model, classes, free_rows, fixed_rows, capacity,
+                                                 ['FIXED_COST_' + name for name in names]):
+            fcn2min += cvx.sum(fixed_cost[1])
+        fcn2min += time_average(model, cvx.multiply(dispatch, stacked_parameter(model, ['VAR_COST_' + name for name in names])))
+        if case_dic['CO2_CAP'] >= 0:
+            for fixed_co2 in stacked_capacity_times(model, classes, free_rows, fixed_rows, capacity,
+                                                    ['FIXED_CO2_' + name for name in names]):
+                emissions += cvx.sum(fixed_co2[1])
+            emissions += time_average(model, cvx.multiply(dispatch, stacked_parameter(model, ['VAR_CO2_' + name for name in names])))
+        supply += cvx.sum(dispatch, axis = 0)
+        for i, name in enumerate(names):
+            model['VARIABLES']['DISPATCH_' + name] = dispatch[i]
 
+#%%-------------------- storage ------------------------------------------
+    # One (classes x hours) variable for each of charging, discharging and state of
+    # charge per storage family (STORAGE and STORAGE2)
+    demand_from_storage = 0    # charging of storage in each time period
+    for family, classes in technology_families('STORAGE', system_components):
+        names = [technology['NAME'] for technology in classes]
+        shape = (len(classes), num_time_periods)
+        free_rows, fixed_rows, capacity, capacity_constraints = add_stacked_capacity(model, case_dic, classes)
+        constraints += capacity_constraints
+
+        power_limit = stacked_capacity_times(model, classes, free_rows, fixed_rows, capacity,
+                                             ['INV_CHARGING_TIME_' + name for name in names])
+        dispatch_to_storage, to_constraints = add_nonneg_stacked_variable(model, case_dic,
+            'DISPATCH_TO_[' + ','.join(names) + ']', shape, power_limit)
+        dispatch_from_storage, from_constraints = add_nonneg_stacked_variable(model, case_dic,
+            'DISPATCH_FROM_[' + ','.join(names) + ']', shape, power_limit)
+        energy_capacity = stacked_capacity_times(model, classes, free_rows, fixed_rows, capacity, [None]*len(classes))
+        if model['DAY_MAP'] is None:
+            energy_storage, energy_constraints = add_nonneg_stacked_variable(model, case_dic,
+                'ENERGY_[' + ','.join(names) + ']', shape, energy_capacity)
+        else:   # relative to the start of the representative day, bounded in add_day_linked_storage
+            energy_storage, energy_constraints = add_variable(model, 'ENERGY_[' + ','.join(names) + ']', shape), []
+        decay_rate_storage = stacked_parameter(model, ['DECAY_RATE_' + name for name in names]) # fraction of stored electricity lost each hour
+        constraints += to_constraints + from_constraints
+        if not model['LEAN'] and model['DAY_MAP'] is None:
             constraints += [
-                    energy_storage2[(i+1) % num_time_periods] ==
-                        energy_storage2[i] + charging_efficiency_storage2 * dispatch_to_storage2[i]
-                        - dispatch_from_storage2[i] - energy_storage2[i]*decay_rate_storage2
-                    ]
-
-    else:
-        capacity_storage2 = 0
-        dispatch_to_storage2 = np.zeros(num_time_periods)
-        dispatch_from_storage2 = np.zeros(num_time_periods)
-        energy_storage2 = np.zeros(num_time_periods)
+                dispatch_from_storage <= cvx.multiply(energy_storage, 1 - decay_rate_storage), # you can't dispatch more from storage in a time step than is in the battery
+                                                                                               # This constraint is redundant
+                ]
+        constraints += energy_constraints
+
+        for fixed_cost in stacked_capacity_times(model, classes, free_rows, fixed_rows, capacity,
+                                                 ['FIXED_COST_' + name for name in names]):
+            fcn2min += cvx.sum(fixed_cost[1])
+        fcn2min += \
+            time_average(model, cvx.multiply(dispatch_to_storage, stacked_parameter(model, ['VAR_COST_TO_' + name for name in names]))) + \
+            time_average(model, cvx.multiply(dispatch_from_storage, stacked_parameter(model, ['VAR_COST_FROM_' + name for name in names])))
+
+        net_charge = cvx.multiply(stacked_parameter(model, ['CHARGING_EFFICIENCY_' + name for name in names]), dispatch_to_storage) \
+            - dispatch_from_storage
+        if model['DAY_MAP'] is None:
+            constraints += storage_balance(model, names, energy_storage,
+                energy_storage + net_charge - cvx.multiply(energy_storage, decay_rate_storage))
+        else:
+            interday, day_constraints = add_day_linked_storage(model, 'ENERGY_[' + ','.join(names) + ']',
+                energy_storage, net_charge, decay_rate_storage,
+                stacked_parameter(model, ['DAILY_RETENTION_' + name for name in names]), energy_capacity)
+            constraints += day_constraints
+            for i, name in enumerate(names):
+                model['VARIABLES']['INTERDAY_ENERGY_' + name] = interday[i]
+        supply += cvx.sum(dispatch_from_storage, axis = 0)
+        demand_from_storage += cvx.sum(dispatch_to_storage, axis = 0)
+        for i, name in enumerate(names):
+            model['VARIABLES']['DISPATCH_TO_' + name] = dispatch_to_storage[i]
+            model['VARIABLES']['DISPATCH_FROM_' + name] = dispatch_from_storage[i]
+            model['VARIABLES']['ENERGY_' + name] = energy_storage[i]
 
 #%%-------------------- PGP storage (power to gas to power) -------------------
 # For PGP storage, there are three capacity decisions:
@@ -430,442 +975,311 @@ def core_model (global_dic, case_dic):
 #   2. dispatch from storage (power)
 #
     if 'PGP_STORAGE' in system_components:
-        if(case_dic['CAPACITY_PGP_STORAGE']<0):
-            capacity_pgp_storage = cvx.Variable(1) # calculate pgp storage capacity
-            constraints += [
-                capacity_pgp_storage >= 0]
-        else:
-            capacity_pgp_storage = case_dic['CAPACITY_PGP_STORAGE'] * numerics_demand_scaling
-
-        if(case_dic['CAPACITY_TO_PGP_STORAGE']<0):
-            capacity_to_pgp_storage = cvx.Variable(1) # calculate pgp storage capacity
-            constraints += [
-                capacity_to_pgp_storage >= 0]
-        else:
-            capacity_to_pgp_storage = case_dic['CAPACITY_TO_PGP_STORAGE'] * numerics_demand_scaling
-
-        if(case_dic['CAPACITY_FROM_PGP_STORAGE']<0):
-            capacity_from_pgp_storage = cvx.Variable(1) # calculate pgp storage capacity
+        for capacity_key in ['CAPACITY_PGP_STORAGE','CAPACITY_TO_PGP_STORAGE','CAPACITY_FROM_PGP_STORAGE']:
+            constraints += add_capacity(model, case_dic, capacity_key)
+
+        dispatch_to_pgp_storage, to_constraints = add_nonneg_variable(model, case_dic, 'DISPATCH_TO_PGP_STORAGE', num_time_periods,
+            capacity_times(model, 'CAPACITY_TO_PGP_STORAGE'))
+        dispatch_from_pgp_storage, from_constraints = add_nonneg_variable(model, case_dic, 'DISPATCH_FROM_PGP_STORAGE', num_time_periods,
+            capacity_times(model, 'CAPACITY_FROM_PGP_STORAGE'))  # this is dispatch FROM storage
+        if model['DAY_MAP'] is None:
+            energy_pgp_storage, energy_constraints = add_nonneg_variable(model, case_dic, 'ENERGY_PGP_STORAGE', num_time_periods,
+                capacity_times(model, 'CAPACITY_PGP_STORAGE')) # amount of energy currently stored in tank
+        else:   # relative to the start of the representative day, bounded in add_day_linked_storage
+            energy_pgp_storage, energy_constraints = add_variable(model, 'ENERGY_PGP_STORAGE', num_time_periods), []
+        decay_rate_pgp_storage = parameter(model, 'DECAY_RATE_PGP_STORAGE')
+        constraints += to_constraints + from_constraints
+        if not model['LEAN'] and model['DAY_MAP'] is None:
             constraints += [
-                capacity_from_pgp_storage >= 0]
-        else:
-            capacity_from_pgp_storage = case_dic['CAPACITY_FROM_PGP_STORAGE'] * numerics_demand_scaling
-
-        dispatch_to_pgp_storage = cvx.Variable(num_time_periods)
-        dispatch_from_pgp_storage = cvx.Variable(num_time_periods)  # this is dispatch FROM storage
-        energy_pgp_storage = cvx.Variable(num_time_periods) # amount of energy currently stored in tank
-        constraints += [
-                dispatch_to_pgp_storage >= 0,
-                dispatch_to_pgp_storage <= capacity_to_pgp_storage,
-                dispatch_from_pgp_storage >= 0, # dispatch_to_storage is negative value
-                dispatch_from_pgp_storage <= capacity_from_pgp_storage,
                 dispatch_from_pgp_storage <= energy_pgp_storage * (1 - decay_rate_pgp_storage), # you can't dispatch more from storage in a time step than is in the battery
                                                                                     # This constraint is redundant
-                energy_pgp_storage >= 0,
-                energy_pgp_storage <= capacity_pgp_storage
                 ]
-
-        fcn2min += capacity_pgp_storage * fixed_cost_pgp_storage + \
-            capacity_to_pgp_storage * fixed_cost_to_pgp_storage + capacity_from_pgp_storage * fixed_cost_from_pgp_storage + \
-            cvx.sum(dispatch_to_pgp_storage * var_cost_to_pgp_storage)/num_time_periods + \
-            cvx.sum(dispatch_from_pgp_storage * var_cost_from_pgp_storage)/num_time_periods
-
-        for i in range(num_time_periods):
-
-            constraints += [
-                    energy_pgp_storage[(i+1) % num_time_periods] == energy_pgp_storage[i]
-                    + charging_efficiency_pgp_storage * dispatch_to_pgp_storage[i]
-                    - dispatch_from_pgp_storage[i]- energy_pgp_storage[i]*decay_rate_pgp_storage
-                    ]
-
-    else:
-        capacity_pgp_storage = 0  # energy storage capacity in kWh (i.e., tank size)
-        capacity_to_pgp_storage = 0 # maximum power input / output (in kW) fuel cell / electrolyzer size
-        capacity_from_pgp_storage = 0 # maximum power input / output (in kW) fuel cell / electrolyzer size
-        dispatch_to_pgp_storage = np.zeros(num_time_periods)
-        dispatch_from_pgp_storage = np.zeros(num_time_periods)
-        energy_pgp_storage = np.zeros(num_time_periods) # amount of energy currently stored in tank
-
-#%%S------------------- Concentrated solar power (CSP) -------------------  
+        constraints += energy_constraints
+
+        fcn2min += capacity_times(model, 'CAPACITY_PGP_STORAGE', 'FIXED_COST_PGP_STORAGE') + \
+            capacity_times(model, 'CAPACITY_TO_PGP_STORAGE', 'FIXED_COST_TO_PGP_STORAGE') + \
+            capacity_times(model, 'CAPACITY_FROM_PGP_STORAGE', 'FIXED_COST_FROM_PGP_STORAGE') + \
+            time_average(model, dispatch_to_pgp_storage * parameter(model, 'VAR_COST_TO_PGP_STORAGE')) + \
+            time_average(model, dispatch_from_pgp_storage * parameter(model, 'VAR_COST_FROM_PGP_STORAGE'))
+
+        net_charge = parameter(model, 'CHARGING_EFFICIENCY_PGP_STORAGE') * dispatch_to_pgp_storage - dispatch_from_pgp_storage
+        if model['DAY_MAP'] is None:
+            constraints += storage_balance(model, ['PGP_STORAGE'], energy_pgp_storage,
+                energy_pgp_storage + net_charge - energy_pgp_storage*decay_rate_pgp_storage)
+        else:   # seasonal storage is what the chain through the days is for
+            interday, day_constraints = add_day_linked_storage(model, 'ENERGY_PGP_STORAGE',
+                cvx.reshape(energy_pgp_storage, (1, num_time_periods), order = 'C'),
+                cvx.reshape(net_charge, (1, num_time_periods), order = 'C'),
+                decay_rate_pgp_storage, parameter(model, 'DAILY_RETENTION_PGP_STORAGE'),
+                [[[0], capacity_times(model, 'CAPACITY_PGP_STORAGE')]])
+            constraints += day_constraints
+        supply += dispatch_from_pgp_storage
+        demand_from_storage += dispatch_to_pgp_storage
+
+#%%S------------------- Concentrated solar power (CSP) -------------------
 # For CSP, the capacity components are:
 #     1. CSP generator (capacity_csp)
 #     2. Storage (capacity_csp_storage)
 #
 # For CSP, the dispatch components are:
-#     1. CSP generator to grid (dispatch_csp)
-#     2. CSP generator to storage (when dispatch demand met) (dispatch_csp_to_storage)
-#     3. Storage to dispatch (when no/low generation) (DISPATCH_FROM_CSP)
+#     1. CSP generator to storage (dispatch_to_csp_storage)
+#     2. Storage to dispatch (DISPATCH_FROM_CSP)
 
     if 'CSP' in system_components:
-        if(case_dic['CAPACITY_CSP']<0):
-            capacity_csp = cvx.Variable(1) # calculate CSP capacity
-            constraints += [
-                capacity_csp >= 0]
-        else:
-            capacity_csp = case_dic['CAPACITY_CSP'] * numerics_demand_scaling
-            
-        if(case_dic['CAPACITY_CSP_STORAGE']<0):
-            capacity_csp_storage = cvx.Variable(1) # calculate CSP storage capacity
-            constraints += [
-                capacity_csp_storage >= 0]
-        else:
-            capacity_csp_storage = case_dic['CAPACITY_CSP_STORAGE'] * numerics_demand_scaling
-        
-        dispatch_to_csp_storage = cvx.Variable(num_time_periods)
-        dispatch_from_csp = cvx.Variable(num_time_periods)
-        energy_csp_storage = cvx.Variable(num_time_periods) # amount of energy currently stored in CSP storage
-        constraints += [
-                dispatch_to_csp_storage >= 0, 
-                dispatch_to_csp_storage <= capacity_csp * csp_series,  ######### might need to be changed to direct solar radiation??
-
-                dispatch_from_csp >= 0,
+        constraints += add_capacity(model, case_dic, 'CAPACITY_CSP')
+        constraints += add_capacity(model, case_dic, 'CAPACITY_CSP_STORAGE')
+
+        dispatch_to_csp_storage, to_constraints = add_nonneg_variable(model, case_dic, 'DISPATCH_TO_CSP_STORAGE', num_time_periods,
+            capacity_times(model, 'CAPACITY_CSP', 'CSP_SERIES'))  ######### might need to be changed to direct solar radiation??
+        dispatch_from_csp, from_constraints = add_nonneg_variable(model, case_dic, 'DISPATCH_FROM_CSP', num_time_periods)
+        energy_csp_storage, energy_constraints = add_nonneg_variable(model, case_dic, 'ENERGY_CSP_STORAGE', num_time_periods,
+            capacity_times(model, 'CAPACITY_CSP_STORAGE')) # amount of energy currently stored in CSP storage
+        decay_rate_csp_storage = parameter(model, 'DECAY_RATE_CSP_STORAGE')
+        constraints += to_constraints + from_constraints + [
                 dispatch_from_csp <= energy_csp_storage * (1 - decay_rate_csp_storage) + \
-                     charging_efficiency_storage * dispatch_to_csp_storage, 
+                     parameter(model, 'CHARGING_EFFICIENCY_STORAGE') * dispatch_to_csp_storage,
                      # you can't dispatch more from storage in a time step than is
                      # in storage plus what you are adding now
-                                                     
-                energy_csp_storage >= 0,
-                energy_csp_storage <= capacity_csp_storage
-                ]
-        
-        fcn2min += capacity_csp * fixed_cost_csp + \
-            capacity_csp_storage * fixed_cost_csp_storage +  \
-            cvx.sum(dispatch_from_csp * var_cost_csp)/num_time_periods + \
-            cvx.sum(energy_csp_storage * var_cost_csp_storage)/num_time_periods
-
-        for i in range(num_time_periods):
-
+                ] + energy_constraints
+
+        fcn2min += capacity_times(model, 'CAPACITY_CSP', 'FIXED_COST_CSP') + \
+            capacity_times(model, 'CAPACITY_CSP_STORAGE', 'FIXED_COST_CSP_STORAGE') +  \
+            time_average(model, dispatch_from_csp * parameter(model, 'VAR_COST_CSP')) + \
+            time_average(model, energy_csp_storage * parameter(model, 'VAR_COST_CSP_STORAGE'))
+
+        end_of_hour_csp_energy = energy_csp_storage  \
+                    + parameter(model, 'CHARGING_EFFICIENCY_CSP_STORAGE') * dispatch_to_csp_storage  \
+                    - dispatch_from_csp \
+                    - energy_csp_storage*decay_rate_csp_storage
+        if model['DAY_MAP'] is None:
+            constraints += storage_balance(model, ['CSP_STORAGE'], energy_csp_storage, end_of_hour_csp_energy)
+        else:   # CSP storage holds hours of energy, with representative days it is cyclic within each day
             constraints += [
-                    energy_csp_storage[(i+1) % num_time_periods] == 
-                        energy_csp_storage[i]  \
-                        + charging_efficiency_csp_storage * dispatch_to_csp_storage[i]  \
-                        - dispatch_from_csp[i] \
-                        - energy_csp_storage[i]*decay_rate_csp_storage
+                    next_hour_in_day(energy_csp_storage, model['HOURS_PER_DAY']) == end_of_hour_csp_energy
                     ]
-    else:
-        capacity_csp = 0
-        capacity_csp_storage = 0
-        dispatch_csp = np.zeros(num_time_periods)
-        dispatch_to_csp_storage = np.zeros(num_time_periods)
-        dispatch_from_csp = np.zeros(num_time_periods)
-        energy_csp_storage = np.zeros(num_time_periods)
-        
+        supply += dispatch_from_csp
+
 #%%------------------ unmet demand ------------------------------------------
+    dispatch_unmet_demand = np.zeros(num_time_periods)
     if 'UNMET_DEMAND' in system_components:
-        dispatch_unmet_demand = cvx.Variable(num_time_periods)
-        constraints += [
-                dispatch_unmet_demand >= 0
-                ]
-        fcn2min += cvx.sum(dispatch_unmet_demand * var_cost_unmet_demand)/num_time_periods
-    else:
-        dispatch_unmet_demand = np.zeros(num_time_periods)
-        
-#%%------------------ unmet demand ------------------------------------------
+        dispatch_unmet_demand, unmet_demand_constraints = add_nonneg_variable(model, case_dic, 'DISPATCH_UNMET_DEMAND', num_time_periods)
+        constraints += unmet_demand_constraints
+        fcn2min += time_average(model, dispatch_unmet_demand * parameter(model, 'VAR_COST_UNMET_DEMAND'))
+        supply += dispatch_unmet_demand
+
+#%%------------------ system reliability ------------------------------------
     if case_dic['SYSTEM_RELIABILITY'] >= 0:
-        sys_rel = case_dic['SYSTEM_RELIABILITY']
         constraints += [
-                cvx.sum(dispatch_unmet_demand) ==  (1.-sys_rel)  * cvx.sum(demand_series)
+                time_sum(model, dispatch_unmet_demand) == parameter(model, 'RELIABILITY_UNMET_DEMAND')
                 ]
 
+#%%------------------ CO2 emissions cap ------------------------------------
+    # the dual of this constraint is the carbon price that would give the same
+    # emissions (CO2_CAP_PRICE)
+    if case_dic['CO2_CAP'] >= 0:
+        model['CONSTRAINTS']['CO2_CAP'] = emissions <= parameter(model, 'CO2_CAP')
+        constraints += [model['CONSTRAINTS']['CO2_CAP']]
+
+#%%------------------ Benders time block ------------------------------------
+    if model['BENDERS_SUBPROBLEM']:
+        # the calculated capacities are those of the master problem, the duals of these
+        # constraints are the cuts on them; a shortfall of stored energy costs BENDERS_PENALTY
+        for key in capacity_result_keys:
+            if key in model['VARIABLES']:
+                model['CONSTRAINTS']['MASTER_' + key] = model['VARIABLES'][key] == parameter(model, 'MASTER_' + key)
+                constraints += [model['CONSTRAINTS']['MASTER_' + key]]
+        for shortfall in model['SHORTFALL']:
+            fcn2min += time_average(model, parameter(model, 'BENDERS_PENALTY') * cvx.sum(shortfall))
 
 #%%------------------- dispatch energy balance constraint ------------------------------------------
-    constraints += [
-            dispatch_natgas
-            + dispatch_natgas_ccs
-            + dispatch_solar
-            + dispatch_wind
-            + dispatch_solar2
-            + dispatch_wind2
-            + dispatch_nuclear
-            + dispatch_from_storage
-            + dispatch_from_storage2
-            + dispatch_from_pgp_storage
-            + dispatch_from_csp
-            + dispatch_unmet_demand
-            == demand_series + dispatch_to_storage + dispatch_to_storage2 + dispatch_to_pgp_storage
-            ]
-    idx_energy_bal_constraint = len(constraints)-1
-    
+    model['CONSTRAINTS']['ENERGY_BALANCE'] = \
+        supply == parameter(model, 'DEMAND_SERIES') + demand_from_storage
+    constraints += [model['CONSTRAINTS']['ENERGY_BALANCE']]
+
     # -----------------------------------------------------------------------------
-    obj = cvx.Minimize(fcn2min)
+    model['PROBLEM'] = cvx.Problem(cvx.Minimize(fcn2min), constraints)
+
+    return model
+
+# -----------------------------------------------------------------------------
+
+def core_model (global_dic, case_dic):
+    verbose = global_dic['VERBOSE']
+    numerics_cost_scaling = case_dic['NUMERICS_COST_SCALING']
+    numerics_demand_scaling = case_dic['NUMERICS_DEMAND_SCALING']
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+
+    start_time = time.time()    # timer starts
+
+    key = template_key(case_dic)
+    cache_hit = global_dic['MODEL_TEMPLATE_CACHE'] and key in core_model_templates \
+        and constants_match(core_model_templates[key], case_dic)
+    if cache_hit:
+        model = core_model_templates[key]
+    else:
+        model = build_core_model(case_dic)
+        if global_dic['MODEL_TEMPLATE_CACHE']:
+            core_model_templates[key] = model
+    set_core_model_parameters(model, case_dic)
+    build_time = time.time() - start_time
 
     # -----------------------------------------------------------------------------
     # Problem solving
 
-    # print cvx.installed_solvers()
-    # print >>orig_stdout, cvx.installed_solvers()
-    #print (constraints)
-    #print (fcn2min)
-    #print (system_components)
-    #print (obj)
-    # Form and Solve the Problem
-    prob = cvx.Problem(obj, constraints)
-#    prob.solve(solver = 'GUROBI')
-    #prob.solve(solver = 'GUROBI',BarConvTol = 1e-11, feasibilityTol = 1e-6, NumericFocus = 3)
-
+    solver = case_dic['SOLVER']
+    solver_options = case_solver_options(global_dic, case_dic)
+    solver_options['SEED'] = 42 # Add a seed to get consistent results
+    # the model and case solved last: the RESCALE step of the fallback ladder (see
+    # Solver_Backend.py) builds a new model with other scaling factors
+    solved = {'MODEL':model, 'CASE_DIC':case_dic, 'BUILD_TIME':build_time}
+
+    def solve(options, numeric_focus, rescale):
+        if rescale:
+            cost_scaling, demand_scaling, ranges = auto_scaling(case_dic)
+            if [cost_scaling, demand_scaling] == [numerics_cost_scaling, numerics_demand_scaling]:
+                print('scaling factors would not change')
+                return None
+            rescale_start_time = time.time()
+            solved['CASE_DIC'] = dict(case_dic, NUMERICS_COST_SCALING = cost_scaling,
+                                      NUMERICS_DEMAND_SCALING = demand_scaling)
+            solved['MODEL'] = build_core_model(solved['CASE_DIC'])
+            set_core_model_parameters(solved['MODEL'], solved['CASE_DIC'])
+            solved['BUILD_TIME'] += time.time() - rescale_start_time
+        prob = solved['MODEL']['PROBLEM']
+        # warm_start = False so that a case solved on a cached template does not depend
+        # on which case was solved on it before
+        status = solve_with_backend(prob, solver, options, numeric_focus)
+        # canonicalization for a new template, or just applying parameters for a cached one
+        solved['BUILD_TIME'] += prob.compilation_time
+        return status
+
+    attempts = []
     try:
 
-#       solver_parameter = {
-#            'OutputFlag': 0,
-#            }
-
       # Ask solvers to automatically output log files. The log file for Gurobi is "gurobi.log".
       #  prob.solve(solver = 'GUROBI', verbose = True)
-#        prob.solve(solver = 'GUROBI')
 #    prob.solve(solver = 'GUROBI',BarConvTol = 1e-11, feasibilityTol = 1e-9)
 #    prob.solve(solver = 'GUROBI',BarConvTol = 1e-10, feasibilityTol = 1e-8)
 #    prob.solve(solver = 'GUROBI',BarConvTol = 1e-8, FeasibilityTol = 1e-6)
-        prob.solve(solver = 'GUROBI', seed = 42) # Add a seed to get consistent results
-        
-        print(prob.status)
-        if prob.status != 'optimal':
-            print('Trying to solve again with numeric focus')
-            prob.solve(solver = 'GUROBI', seed = 42, NumericFocus=3)
-            print(prob.status)
-            if prob.status != 'solved' and prob.status != 'optimal':
-                raise cvx.error.SolverError
-
+        problem_status, attempts = solve_with_fallbacks(solve, solver, solver_options,
+                                                        case_dic['TIME_LIMIT'], case_dic['MAX_RETRIES'])
         end_time = time.time()  # timer ends
+        if problem_status not in ['optimal', 'user_limit']:
+            raise cvx.error.SolverError
 
     except cvx.error.SolverError as err:
 
         print('Solver error encounterd!', err)
 
-        result = {
-            'SYSTEM_COST': -1,
-            'PROBLEM_STATUS':prob.status
-            }
-
-        result['CAPACITY_NATGAS'] = -1
-        result['CAPACITY_NATGAS_CCS'] = -1
-        result['CAPACITY_SOLAR'] = -1
-        result['CAPACITY_WIND'] = -1
-        result['CAPACITY_SOLAR2'] = -1
-        result['CAPACITY_WIND2'] = -1
-        result['CAPACITY_NUCLEAR'] = -1
-        result['CAPACITY_STORAGE'] = -1
-        result['CAPACITY_STORAGE2'] = -1
-        result['CAPACITY_PGP_STORAGE'] = -1
-        result['CAPACITY_TO_PGP_STORAGE'] = -1
-        result['CAPACITY_FROM_PGP_STORAGE'] = -1
-        result['CAPACITY_CSP'] = -1
-        result['CAPACITY_CSP_STORAGE'] = -1
-        
-        result['PRICE'] = -1 * np.ones(demand_series.size)
-        
-        result['DISPATCH_NATGAS'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_NATGAS_CCS'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_SOLAR'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_WIND'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_SOLAR2'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_WIND2'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_NUCLEAR'] = -1 * np.ones(demand_series.size)
-
-        result['CURTAILMENT_SOLAR'] = -1 * np.ones(demand_series.size)
-        result['CURTAILMENT_WIND'] = -1 * np.ones(demand_series.size)
-        result['CURTAILMENT_SOLAR2'] = -1 * np.ones(demand_series.size)
-        result['CURTAILMENT_WIND2'] = -1 * np.ones(demand_series.size)
-        result['CURTAILMENT_CSP'] = -1 * np.ones(demand_series.size)
-        result['CURTAILMENT_NUCLEAR'] = -1 * np.ones(demand_series.size)
- 
-        result['DISPATCH_TO_STORAGE'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_FROM_STORAGE'] = -1 * np.ones(demand_series.size)
-        result['ENERGY_STORAGE'] = -1 * np.ones(demand_series.size)
-        
-        result['DISPATCH_TO_STORAGE2'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_FROM_STORAGE2'] = -1 * np.ones(demand_series.size)
-        result['ENERGY_STORAGE2'] = -1 * np.ones(demand_series.size)
-        
-        result['DISPATCH_TO_PGP_STORAGE'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_FROM_PGP_STORAGE'] = -1 * np.ones(demand_series.size)
-        result['ENERGY_PGP_STORAGE'] = -1 * np.ones(demand_series.size)
-        
-        result['DISPATCH_CSP'] = -1 * np.ones(demand_series.size) 
-        result['DISPATCH_TO_CSP_STORAGE'] = -1 * np.ones(demand_series.size)
-        result['DISPATCH_FROM_CSP'] = -1 * np.ones(demand_series.size)
-        result['ENERGY_CSP_STORAGE'] = -1 * np.ones(demand_series.size)
-        
-        result['DISPATCH_UNMET_DEMAND'] = -1 * np.ones(demand_series.size)
-
-    else:
-
-        if verbose:
-            print ('system cost ',prob.value/(numerics_cost_scaling * numerics_demand_scaling),
-                ' runtime: ', (end_time - start_time), 'seconds')
-
-        # -----------------------------------------------------------------------------
-
-
-        result={
-                'SYSTEM_COST':prob.value/(numerics_cost_scaling * numerics_demand_scaling),
-                'PROBLEM_STATUS':prob.status
-                }
-
-        try:
-            result['PRICE'] = np.array(-1.0 * num_time_periods * constraints[idx_energy_bal_constraint].dual_value/ numerics_cost_scaling).flatten()
-            # note that hourly pricing can be determined from the dual of the constraint on energy balance
-            # The num_time_periods is in the above because the influence on the cost of an hour is much bigger then
-            # the impact of average cost over the period. The divide by the cost scaling corrects for the cost scaling.
-        except:
-            result['PRICE']=np.zeros(num_time_periods)
-
-        if 'NATGAS' in system_components:
-            if case_dic['CAPACITY_NATGAS'] < 0:
-                result['CAPACITY_NATGAS'] = np.asscalar(capacity_natgas.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_NATGAS'] = case_dic['CAPACITY_NATGAS']
-            result['DISPATCH_NATGAS'] = np.array(dispatch_natgas.value).flatten()/numerics_demand_scaling
-        else:
-            result['CAPACITY_NATGAS'] = capacity_natgas/numerics_demand_scaling
-            result['DISPATCH_NATGAS'] = dispatch_natgas/numerics_demand_scaling
-
-        if 'NATGAS_CCS' in system_components:
-            if case_dic['CAPACITY_NATGAS_CCS'] < 0:
-                result['CAPACITY_NATGAS_CCS'] = np.asscalar(capacity_natgas_ccs.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_NATGAS_CCS'] = case_dic['CAPACITY_NATGAS_CCS']
-            result['DISPATCH_NATGAS_CCS'] = np.array(dispatch_natgas_ccs.value).flatten()/numerics_demand_scaling
-        else:
-            result['CAPACITY_NATGAS_CCS'] = capacity_natgas_ccs/numerics_demand_scaling
-            result['DISPATCH_NATGAS_CCS'] = dispatch_natgas_ccs/numerics_demand_scaling
-
-        if 'SOLAR' in system_components:
-            if case_dic['CAPACITY_SOLAR'] < 0:
-                result['CAPACITY_SOLAR'] = np.asscalar(capacity_solar.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_SOLAR'] = case_dic['CAPACITY_SOLAR']
-            result['DISPATCH_SOLAR'] = np.array(dispatch_solar.value).flatten()/numerics_demand_scaling
-            result['CURTAILMENT_SOLAR'] = result['CAPACITY_SOLAR'] * solar_series - result['DISPATCH_SOLAR']
-        else:
-            result['CAPACITY_SOLAR'] = capacity_solar/numerics_demand_scaling
-            result['DISPATCH_SOLAR'] = dispatch_solar/numerics_demand_scaling
-            result['CURTAILMENT_SOLAR'] = (capacity_solar-dispatch_solar)/numerics_demand_scaling
-
-        if 'WIND' in system_components:
-            if case_dic['CAPACITY_WIND'] < 0:
-                result['CAPACITY_WIND'] = np.asscalar(capacity_wind.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_WIND'] = case_dic['CAPACITY_WIND']
-            result['DISPATCH_WIND'] = np.array(dispatch_wind.value).flatten()/numerics_demand_scaling
-            result['CURTAILMENT_WIND'] = result['CAPACITY_WIND'] * wind_series - result['DISPATCH_WIND']
-        else:
-            result['CAPACITY_WIND'] = capacity_wind/numerics_demand_scaling
-            result['DISPATCH_WIND'] = dispatch_wind/numerics_demand_scaling
-            result['CURTAILMENT_WIND'] = (capacity_wind-dispatch_wind)/numerics_demand_scaling
-
-        if 'SOLAR2' in system_components:
-            if case_dic['CAPACITY_SOLAR2'] < 0:
-                result['CAPACITY_SOLAR2'] = np.asscalar(capacity_solar2.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_SOLAR2'] = case_dic['CAPACITY_SOLAR2']
-            result['DISPATCH_SOLAR2'] = np.array(dispatch_solar2.value).flatten()/numerics_demand_scaling
-            result['CURTAILMENT_SOLAR2'] = result['CAPACITY_SOLAR2'] * solar2_series - result['DISPATCH_SOLAR2']
-        else:
-            result['CAPACITY_SOLAR2'] = capacity_solar2/numerics_demand_scaling
-            result['DISPATCH_SOLAR2'] = dispatch_solar2/numerics_demand_scaling
-            result['CURTAILMENT_SOLAR2'] = (capacity_solar2-dispatch_solar2)/numerics_demand_scaling
-
-        if 'WIND2' in system_components:
-            if case_dic['CAPACITY_WIND2'] < 0:
-                result['CAPACITY_WIND2'] = np.asscalar(capacity_wind2.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_WIND2'] = case_dic['CAPACITY_WIND2']
-            result['DISPATCH_WIND2'] = np.array(dispatch_wind2.value).flatten()/numerics_demand_scaling
-            result['CURTAILMENT_WIND2'] = result['CAPACITY_WIND2'] * wind2_series - result['DISPATCH_WIND2']
-        else:
-            result['CAPACITY_WIND2'] = capacity_wind2/numerics_demand_scaling
-            result['DISPATCH_WIND2'] = dispatch_wind2/numerics_demand_scaling
-            result['CURTAILMENT_WIND2'] = (capacity_wind2-dispatch_wind2)/numerics_demand_scaling
-
-        if 'NUCLEAR' in system_components:
-            if case_dic['CAPACITY_NUCLEAR'] < 0:
-                result['CAPACITY_NUCLEAR'] = np.asscalar(capacity_nuclear.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_NUCLEAR'] = case_dic['CAPACITY_NUCLEAR']
-            result['DISPATCH_NUCLEAR'] = np.array(dispatch_nuclear.value).flatten()/numerics_demand_scaling
-            result['CURTAILMENT_NUCLEAR'] = result['CAPACITY_NUCLEAR'] * np.ones(num_time_periods) - result['DISPATCH_NUCLEAR']
+        end_time = time.time()
+        result = failed_result(normalize_status(solved['MODEL']['PROBLEM'].status), num_time_periods)
+        result['MODEL_SIZE'] = [-1, -1, -1]
+        result['FULL_MODEL_SIZE'] = [-1, -1, -1]
+
+    build_time = solved['BUILD_TIME']
+    solved_model = solved['MODEL']
+    prob = solved_model['PROBLEM']
+    numerics_cost_scaling = solved['CASE_DIC']['NUMERICS_COST_SCALING']
+    numerics_demand_scaling = solved['CASE_DIC']['NUMERICS_DEMAND_SCALING']
+    cost_scaling = numerics_cost_scaling * numerics_demand_scaling
+
+    if len(attempts) > 0 and problem_status in ['optimal', 'user_limit']:
+
+        objective_and_bound = [prob.value, prob.value]
+        if problem_status == 'user_limit':
+            print('Time limit reached')
+            objective_and_bound = limit_objectives(solver, prob.solver_stats.extra_stats, prob.value)
+
+        if objective_and_bound[0] is None:
+            # no solution to report, only the bound (if any)
+            result = failed_result(problem_status, num_time_periods)
+            result['MODEL_SIZE'] = model_size(prob, solver)
+            result['FULL_MODEL_SIZE'] = result['MODEL_SIZE']
         else:
-            result['CAPACITY_NUCLEAR'] = capacity_nuclear/numerics_demand_scaling
-            result['DISPATCH_NUCLEAR'] = dispatch_nuclear/numerics_demand_scaling
-            result['CURTAILMENT_NUCLEAR'] = (capacity_nuclear-dispatch_nuclear)/numerics_demand_scaling
-
-        if 'STORAGE' in system_components:
-            if case_dic['CAPACITY_STORAGE'] < 0:
-                result['CAPACITY_STORAGE'] = np.asscalar(capacity_storage.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_STORAGE'] = case_dic['CAPACITY_STORAGE']
-            result['DISPATCH_TO_STORAGE'] = np.array(dispatch_to_storage.value).flatten()/numerics_demand_scaling
-            result['DISPATCH_FROM_STORAGE'] = np.array(dispatch_from_storage.value).flatten()/numerics_demand_scaling
-            result['ENERGY_STORAGE'] = np.array(energy_storage.value).flatten()/numerics_demand_scaling
-        else:
-            result['CAPACITY_STORAGE'] = capacity_storage/numerics_demand_scaling
-            result['DISPATCH_TO_STORAGE'] = dispatch_to_storage/numerics_demand_scaling
-            result['DISPATCH_FROM_STORAGE'] = dispatch_from_storage/numerics_demand_scaling
-            result['ENERGY_STORAGE'] = energy_storage/numerics_demand_scaling
-
-        if 'STORAGE2' in system_components:
-            if case_dic['CAPACITY_STORAGE2'] < 0:
-                result['CAPACITY_STORAGE2'] = np.asscalar(capacity_storage2.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_STORAGE2'] = case_dic['CAPACITY_STORAGE2']
-            result['DISPATCH_TO_STORAGE2'] = np.array(dispatch_to_storage2.value).flatten()/numerics_demand_scaling
-            result['DISPATCH_FROM_STORAGE2'] = np.array(dispatch_from_storage2.value).flatten()/numerics_demand_scaling
-            result['ENERGY_STORAGE2'] = np.array(energy_storage2.value).flatten()/numerics_demand_scaling
-        else:
-            result['CAPACITY_STORAGE2'] = capacity_storage2/numerics_demand_scaling
-            result['DISPATCH_TO_STORAGE2'] = dispatch_to_storage2/numerics_demand_scaling
-            result['DISPATCH_FROM_STORAGE2'] = dispatch_from_storage2/numerics_demand_scaling
-            result['ENERGY_STORAGE2'] = energy_storage2/numerics_demand_scaling
-
-        if 'PGP_STORAGE' in system_components:
-            if case_dic['CAPACITY_PGP_STORAGE'] < 0:
-                result['CAPACITY_PGP_STORAGE'] = np.asscalar(capacity_pgp_storage.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_PGP_STORAGE'] = case_dic['CAPACITY_PGP_STORAGE']
-            if case_dic['CAPACITY_TO_PGP_STORAGE'] < 0:
-                result['CAPACITY_TO_PGP_STORAGE'] = np.asscalar(capacity_to_pgp_storage.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_TO_PGP_STORAGE'] = case_dic['CAPACITY_TO_PGP_STORAGE']
-            if case_dic['CAPACITY_FROM_PGP_STORAGE'] < 0:
-                result['CAPACITY_FROM_PGP_STORAGE'] = np.asscalar(capacity_from_pgp_storage.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_FROM_PGP_STORAGE'] = case_dic['CAPACITY_FROM_PGP_STORAGE']
-            result['DISPATCH_TO_PGP_STORAGE'] = np.array(dispatch_to_pgp_storage.value).flatten()/numerics_demand_scaling
-            result['DISPATCH_FROM_PGP_STORAGE'] = np.array(dispatch_from_pgp_storage.value).flatten()/numerics_demand_scaling
-            result['ENERGY_PGP_STORAGE'] = np.array(energy_pgp_storage.value).flatten()/numerics_demand_scaling
-        else:
-            result['CAPACITY_PGP_STORAGE'] = capacity_pgp_storage/numerics_demand_scaling
-            result['CAPACITY_TO_PGP_STORAGE'] = capacity_to_pgp_storage/numerics_demand_scaling
-            result['CAPACITY_FROM_PGP_STORAGE'] = capacity_from_pgp_storage/numerics_demand_scaling
-            result['DISPATCH_TO_PGP_STORAGE'] = dispatch_to_pgp_storage/numerics_demand_scaling
-            result['DISPATCH_FROM_PGP_STORAGE'] = dispatch_from_pgp_storage/numerics_demand_scaling
-            result['ENERGY_PGP_STORAGE'] = energy_pgp_storage/numerics_demand_scaling
-
-        if 'CSP' in system_components:
-            if case_dic['CAPACITY_CSP'] < 0:
-                result['CAPACITY_CSP'] = np.asscalar(capacity_csp.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_CSP'] = case_dic['CAPACITY_CSP']
-            if case_dic['CAPACITY_CSP_STORAGE'] < 0:
-                result['CAPACITY_CSP_STORAGE'] = np.asscalar(capacity_csp_storage.value)/numerics_demand_scaling
-            else:
-                result['CAPACITY_CSP_STORAGE'] = case_dic['CAPACITY_CSP_STORAGE']
-            result['DISPATCH_TO_CSP_STORAGE'] = np.array(dispatch_to_csp_storage.value).flatten()/numerics_demand_scaling
-            result['DISPATCH_FROM_CSP'] = np.array(dispatch_from_csp.value).flatten()/numerics_demand_scaling
-            result['ENERGY_CSP_STORAGE'] = np.array(energy_csp_storage.value).flatten()/numerics_demand_scaling
-            result['CURTAILMENT_CSP'] = result['CAPACITY_CSP'] * csp_series - result['DISPATCH_TO_CSP_STORAGE']
-        else:
-            result['CAPACITY_CSP'] = capacity_csp/numerics_demand_scaling
-            result['CAPACITY_CSP_STORAGE'] = capacity_csp_storage/numerics_demand_scaling
-            result['DISPATCH_TO_CSP_STORAGE'] = dispatch_to_csp_storage/numerics_demand_scaling
-            result['DISPATCH_FROM_CSP'] = dispatch_from_csp/numerics_demand_scaling
-            result['ENERGY_CSP_STORAGE'] = energy_csp_storage/numerics_demand_scaling
-            result['CURTAILMENT_CSP'] = (capacity_csp-dispatch_from_csp)/numerics_demand_scaling
-
-        if 'UNMET_DEMAND' in system_components:
-            result['DISPATCH_UNMET_DEMAND'] = np.array(dispatch_unmet_demand.value).flatten()/numerics_demand_scaling
-        else:
-            result['DISPATCH_UNMET_DEMAND'] = dispatch_unmet_demand/numerics_demand_scaling
 
+            if verbose:
+                print ('system cost ',prob.value/cost_scaling,
+                    ' runtime: ', (end_time - start_time), 'seconds')
+
+            # -----------------------------------------------------------------------------
+
+            result={
+                    'SYSTEM_COST':prob.value/cost_scaling,
+                    'PROBLEM_STATUS':problem_status
+                    }
+
+            # with representative days, an hour of the model stands for HOUR_WEIGHTS hours of the full series
+            price_hours = num_time_periods
+            if solved_model['HOUR_WEIGHTS'] is not None:
+                price_hours = solved_model['NUM_FULL_TIME_PERIODS'] / solved_model['HOUR_WEIGHTS']
+            try:
+                result['PRICE'] = np.array(-1.0 * price_hours * solved_model['CONSTRAINTS']['ENERGY_BALANCE'].dual_value/ numerics_cost_scaling).flatten()
+                # note that hourly pricing can be determined from the dual of the constraint on energy balance
+                # The num_time_periods is in the above because the influence on the cost of an hour is much bigger then
+                # the impact of average cost over the period. The divide by the cost scaling corrects for the cost scaling.
+            except:
+                result['PRICE']=np.zeros(num_time_periods)
+            check_price(result, complementarity(prob), prob.value)
+            if problem_status != 'optimal':
+                result['PRICE_VALID'] = False   # duals of an unfinished solve
+
+            system_components = case_dic['SYSTEM_COMPONENTS']
+            for key in capacity_result_keys:
+                if key in solved_model['VARIABLES']:
+                    result[key] = solved_model['VARIABLES'][key].value.item()/numerics_demand_scaling
+                elif component_of_capacity(key) in system_components:
+                    result[key] = case_dic[key]
+                else:
+                    result[key] = 0.
+            for key in vector_result_keys:
+                if key in solved_model['VARIABLES']:
+                    result[key] = np.array(solved_model['VARIABLES'][key].value).flatten()/numerics_demand_scaling
+                else:
+                    result[key] = np.zeros(num_time_periods)
+            for key in solved_model['VARIABLES']:
+                if key.startswith('INTERDAY_') and '[' not in key:   # representative days, see add_day_linked_storage
+                    result[key] = np.array(solved_model['VARIABLES'][key].value).flatten()/numerics_demand_scaling
+            add_curtailment(case_dic, result)
+            if solved_model['BENDERS_SUBPROBLEM']:
+                # derivatives of SYSTEM_COST for the cuts of the master problem
+                result['BENDERS_DUALS'] = {name: dual / numerics_cost_scaling for name, dual in
+                    constraint_duals(solved_model, ('MASTER_CAPACITY_','INITIAL_ENERGY_','TERMINAL_ENERGY_')).items()}
+            if 'CO2_CAP' in solved_model['CONSTRAINTS']:
+                # $/kgCO2: the dual of CO2_CAP is -d(cost)/d(cap), cost and emissions in scaled units
+                result['CO2_CAP_PRICE'] = float(solved_model['CONSTRAINTS']['CO2_CAP'].dual_value) / numerics_cost_scaling
+            if sensitivity_case(case_dic) and problem_status == 'optimal':
+                # d(SYSTEM_COST)/d(input) from the duals (see Sensitivity.py)
+                result['SENSITIVITY'] = system_cost_gradient(solved_model, solved['CASE_DIC'], parameter_value)
+
+            result['MODEL_SIZE'] = model_size(prob, solver)
+            result['MATRIX_RANGE'] = matrix_range(prob, solver)
+            result['FULL_MODEL_SIZE'] = result['MODEL_SIZE']
+            if solved_model['LEAN']:
+                result['FULL_MODEL_SIZE'] = full_model_size(case_dic, solver)
+                print ('model size (rows, columns, nonzeros): full ', result['FULL_MODEL_SIZE'],
+                       ' lean ', result['MODEL_SIZE'])
+
+        add_cost_bound(result, objective_and_bound, cost_scaling)
+
+    # build time of a cached template is the time to set its parameters; the
+    # time saved is relative to when the template was first built
+    if not cache_hit:
+        model['BUILD_TIME'] = build_time
+    result['SOLVER'] = str.upper(solver)
+    result['SOLVER_PROFILE'] = str.upper(case_dic['SOLVER_PROFILE'])
+    result['SOLVE_ATTEMPTS'] = '+'.join(attempts)
+    result['NUMERIC_FOCUS_RETRY'] = len(attempts) > 1
+    result['NUMERICS_COST_SCALING'] = numerics_cost_scaling
+    result['NUMERICS_DEMAND_SCALING'] = numerics_demand_scaling
+    result['MODEL_CACHE_HIT'] = cache_hit
+    result['MODEL_BUILD_TIME'] = build_time
+    result['MODEL_BUILD_TIME_SAVED'] = max(model['BUILD_TIME'] - build_time, 0.) if cache_hit else 0.
+    result['SOLVE_TIME'] = end_time - start_time - build_time
+    # cvxpy cannot hand an LP basis to the solver, so cases are always solved cold here
+    # (see SWEEP_WARM_START and Direct_Model.py)
+    result['WARM_START'] = False
+    result['SOLVE_ITERATIONS'] = -1
+    if prob.solver_stats is not None and prob.solver_stats.num_iters is not None:
+        result['SOLVE_ITERATIONS'] = prob.solver_stats.num_iters
 
     return result
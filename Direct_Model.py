@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""
+
+Direct_Model.py
+
+Alternative model-assembly engine for the Simple Energy Model.
+
+<core_model_direct> builds the same linear program as <core_model> in
+Core_Model.py, but instead of going through cvxpy it assembles the sparse
+matrices directly:
+
+    minimize    c x
+    subject to  A_ub x <= b_ub
+                A_eq x == b_eq
+                lb <= x <= ub
+
+This avoids the cost of building and canonicalizing a cvx.Problem, which
+dominates for large sweeps. The same NUMERICS_COST_SCALING and
+NUMERICS_DEMAND_SCALING are applied as in <core_model>, and the <result>
+dictionary has the same format, with PRICE taken from the duals of the
+energy balance rows.
+
+Simple bounds (dispatch >= 0, dispatch <= fixed capacity, etc) are expressed
+as variable bounds rather than as constraint rows. This does not change the
+feasible set or the optimum. With LEAN_FORMULATION the redundant rows
+(dispatch from storage <= energy in storage) are left out as well.
+
+The LP is solved with HiGHS through its python interface, highspy
+(pip install highspy), whatever the SOLVER keyword says, with the options of
+the case's SOLVER_PROFILE (see Solver_Backend.py). In sweep mode (SWEEP_WARM_START) each solve starts
+from the simplex basis of the previous case with the same template.
+
+The DIRECT engine thus needs highspy, not scipy.optimize.linprog as it did
+before. highspy is imported when an LP is solved with this engine, so runs
+that only use the CVXPY engine (e.g. with Gurobi) do not need it.
+
+The engine is selected with the case keyword MODEL_ENGINE = DIRECT
+(the default is CVXPY), so that the two can be cross-checked by running
+the same case with both engines.
+
+"""
+
+import time
+import numpy as np
+import scipy.sparse as sps
+
+from Model_Results import capacity_result_keys, vector_result_keys, component_of_capacity
+from Model_Results import failed_result, add_curtailment, template_key, value_range, check_price
+from Model_Results import add_cost_bound, following_hours, co2_rate
+from Solver_Backend import solver_options, case_solver_options, solve_with_fallbacks, limit_objectives
+from Technology_Registry import technologies
+
+#%% Functions to assemble the LP
+
+def new_lp(num_time_periods):
+    return {
+            'NUM_TIME_PERIODS':num_time_periods,
+            'COLUMNS':{},       # variable name -> array of column indices
+            'LB':np.zeros(0), 'UB':np.zeros(0), 'C':np.zeros(0),
+            'ROWS_UB':[], 'B_UB':[],
+            'ROWS_EQ':[], 'B_EQ':[],
+            'NUM_ROWS_UB':0, 'NUM_ROWS_EQ':0,
+            'ROW_BLOCKS':{},    # constraint name -> (kind, array of row indices)
+            'DROPPED_ROWS':0, 'DROPPED_NONZEROS':0, # redundant rows left out (LEAN_FORMULATION)
+            'COST_OFFSET':0.    # constant terms in the objective (e.g. fixed capacities)
+            }
+
+def add_columns(lp, name, size, lb, ub, cost):
+    # add <size> variables called <name> with bounds <lb>, <ub> and cost <cost>.
+    # <lb>, <ub> and <cost> may be scalars or arrays of length <size>.
+    start = len(lp['C'])
+    lp['COLUMNS'][name] = np.arange(start, start + size)
+    lp['LB'] = np.concatenate([lp['LB'], np.broadcast_to(np.array(lb, dtype=float), (size,))])
+    lp['UB'] = np.concatenate([lp['UB'], np.broadcast_to(np.array(ub, dtype=float), (size,))])
+    lp['C'] = np.concatenate([lp['C'], np.broadcast_to(np.array(cost, dtype=float), (size,))])
+    return lp['COLUMNS'][name]
+
+def term(columns, coefficients, size):
+    # A term of a block of <size> rows: row i has coefficient coefficients[i]
+    # on column columns[i]. Scalar columns (e.g. a capacity) are repeated on every row.
+    return (np.arange(size),
+            np.broadcast_to(np.array(columns), (size,)),
+            np.broadcast_to(np.array(coefficients, dtype=float), (size,)))
+
+def sum_term(columns, coefficients):
+    # A term of a single row containing the sum of coefficients[i] * columns[i]
+    size = len(columns)
+    return (np.zeros(size, dtype=int),
+            np.array(columns),
+            np.broadcast_to(np.array(coefficients, dtype=float), (size,)))
+
+def add_rows(lp, name, kind, terms, rhs, size):
+    # Add a block of <size> rows, sum(terms) <= rhs (kind = 'UB') or == rhs (kind = 'EQ')
+    row_start = lp['NUM_ROWS_' + kind]
+    for row_offsets, columns, coefficients in terms:
+        lp['ROWS_' + kind].append((row_start + row_offsets, columns, coefficients))
+    lp['B_' + kind].append(np.broadcast_to(np.array(rhs, dtype=float), (size,)))
+    lp['NUM_ROWS_' + kind] += size
+    lp['ROW_BLOCKS'][name] = (kind, np.arange(row_start, row_start + size))
+    return lp['ROW_BLOCKS'][name][1]
+
+def add_redundant_rows(lp, case_dic, name, kind, terms, rhs, size):
+    # Rows that do not change the optimum. They are left out of the lean formulation,
+    # but counted so that the size of the full formulation can be reported.
+    if case_dic['LEAN_FORMULATION']:
+        lp['DROPPED_ROWS'] += size
+        lp['DROPPED_NONZEROS'] += sum(len(item[0]) for item in terms)
+    else:
+        add_rows(lp, name, kind, terms, rhs, size)
+
+def build_matrix(lp, kind):
+    n_rows = lp['NUM_ROWS_' + kind]
+    if n_rows == 0:
+        return None, None
+    rows = np.concatenate([item[0] for item in lp['ROWS_' + kind]])
+    cols = np.concatenate([item[1] for item in lp['ROWS_' + kind]])
+    vals = np.concatenate([item[2] for item in lp['ROWS_' + kind]])
+    A = sps.csr_matrix((vals, (rows, cols)), shape = (n_rows, len(lp['C'])))
+    b = np.concatenate(lp['B_' + kind])
+    return A, b
+
+#%% Capacity handling
+
+def add_capacity(lp, case_dic, key, fixed_cost, upper_bound, numerics_demand_scaling):
+    # If the capacity is to be calculated (case_dic value < 0), add a column for it and
+    # return its column index. Otherwise return the fixed (scaled) capacity as a number.
+    if case_dic[key] < 0:
+        return add_columns(lp, key, 1, 0., upper_bound, fixed_cost)[0], True
+    else:
+        capacity = case_dic[key] * numerics_demand_scaling
+        lp['COST_OFFSET'] += capacity * fixed_cost
+        return capacity, False
+
+def add_dispatch_limit(lp, name, dispatch_cols, capacity, capacity_is_var, series, size):
+    # dispatch <= capacity * series
+    if capacity_is_var:
+        add_rows(lp, name, 'UB',
+                 [term(dispatch_cols, 1., size), term(capacity, -np.array(series), size)],
+                 0., size)
+    else:
+        lp['UB'][dispatch_cols] = np.minimum(lp['UB'][dispatch_cols], capacity * np.array(series))
+
+#%% Assemble the full LP
+
+def assemble_direct_lp(case_dic):
+
+    numerics_cost_scaling = case_dic['NUMERICS_COST_SCALING']
+    numerics_demand_scaling = case_dic['NUMERICS_DEMAND_SCALING']
+    demand_series = np.array(case_dic['DEMAND_SERIES'])*numerics_demand_scaling
+    system_components = case_dic['SYSTEM_COMPONENTS']
+    num_time_periods = len(demand_series)
+    T = num_time_periods
+    max_demand = np.max(demand_series)
+    following = following_hours(case_dic)    # the hour after each hour, for the storage balances
+
+    lp = new_lp(num_time_periods)
+
+    supply_terms = []   # terms entering the energy balance as supply
+    co2_terms = []      # terms of the CO2 emissions per hour, for CO2_CAP
+    co2_cap = case_dic['CO2_CAP']*numerics_demand_scaling
+    # --------- dispatchable and variable generators (see Technology_Registry.py) ---
+    for technology in technologies('GENERATOR', system_components):
+        component = technology['NAME']
+        capacity, is_var = add_capacity(lp, case_dic, 'CAPACITY_' + component,
+                                        case_dic['FIXED_COST_' + component]*numerics_cost_scaling,
+                                        max_demand if technology['BOUNDED'] else np.inf,
+                                        numerics_demand_scaling)
+        dispatch = add_columns(lp, 'DISPATCH_' + component, T, 0., np.inf,
+                               case_dic['VAR_COST_' + component]*numerics_cost_scaling/T)
+        series = np.ones(T) if technology['SERIES'] is None else case_dic[technology['SERIES']]
+        add_dispatch_limit(lp, 'LIMIT_' + component, dispatch, capacity, is_var, series, T)
+        supply_terms.append(term(dispatch, 1., T))
+        if is_var:
+            co2_terms.append(sum_term([capacity], co2_rate(case_dic, 'FIXED_CO2_' + component)))
+        else:
+            co2_cap -= capacity * co2_rate(case_dic, 'FIXED_CO2_' + component)
+        co2_terms.append(sum_term(dispatch, co2_rate(case_dic, 'VAR_CO2_' + component)/T))
+
+    # --------- storage (STORAGE, STORAGE2, PGP_STORAGE) -----------------------
+    demand_terms = []   # terms entering the energy balance as extra demand (charging)
+
+    for technology in technologies('STORAGE', system_components):
+        component = technology['NAME']
+        charging_time = case_dic['CHARGING_TIME_' + component]
+        decay_rate = case_dic['DECAY_RATE_' + component]
+        capacity, is_var = add_capacity(lp, case_dic, 'CAPACITY_' + component,
+                                        case_dic['FIXED_COST_' + component]*numerics_cost_scaling,
+                                        np.inf, numerics_demand_scaling)
+        dispatch_to = add_columns(lp, 'DISPATCH_TO_' + component, T, 0., np.inf,
+                                  case_dic['VAR_COST_TO_' + component]*numerics_cost_scaling/T)
+        dispatch_from = add_columns(lp, 'DISPATCH_FROM_' + component, T, 0., np.inf,
+                                    case_dic['VAR_COST_FROM_' + component]*numerics_cost_scaling/T)
+        energy = add_columns(lp, 'ENERGY_' + component, T, 0., np.inf, 0.)
+        power_limit = np.ones(T) / charging_time
+        add_dispatch_limit(lp, 'LIMIT_TO_' + component, dispatch_to, capacity, is_var, power_limit, T)
+        add_dispatch_limit(lp, 'LIMIT_FROM_' + component, dispatch_from, capacity, is_var, power_limit, T)
+        add_redundant_rows(lp, case_dic, 'AVAILABLE_' + component, 'UB',
+                           [term(dispatch_from, 1., T), term(energy, -(1. - decay_rate), T)], 0., T)
+        add_dispatch_limit(lp, 'LIMIT_ENERGY_' + component, energy, capacity, is_var, np.ones(T), T)
+        add_rows(lp, 'BALANCE_' + component, 'EQ',
+                 [term(energy[following], 1., T), term(energy, -(1. - decay_rate), T),
+                  term(dispatch_to, -case_dic['CHARGING_EFFICIENCY_' + component], T),
+                  term(dispatch_from, 1., T)], 0., T)
+        supply_terms.append(term(dispatch_from, 1., T))
+        demand_terms.append(term(dispatch_to, -1., T))
+
+    if 'PGP_STORAGE' in system_components:
+        decay_rate = case_dic['DECAY_RATE_PGP_STORAGE']
+        capacity, is_var = add_capacity(lp, case_dic, 'CAPACITY_PGP_STORAGE',
+                                        case_dic['FIXED_COST_PGP_STORAGE']*numerics_cost_scaling,
+                                        np.inf, numerics_demand_scaling)
+        capacity_to, is_var_to = add_capacity(lp, case_dic, 'CAPACITY_TO_PGP_STORAGE',
+                                              case_dic['FIXED_COST_TO_PGP_STORAGE']*numerics_cost_scaling,
+                                              np.inf, numerics_demand_scaling)
+        capacity_from, is_var_from = add_capacity(lp, case_dic, 'CAPACITY_FROM_PGP_STORAGE',
+                                                  case_dic['FIXED_COST_FROM_PGP_STORAGE']*numerics_cost_scaling,
+                                                  np.inf, numerics_demand_scaling)
+        dispatch_to = add_columns(lp, 'DISPATCH_TO_PGP_STORAGE', T, 0., np.inf,
+                                  case_dic['VAR_COST_TO_PGP_STORAGE']*numerics_cost_scaling/T)
+        dispatch_from = add_columns(lp, 'DISPATCH_FROM_PGP_STORAGE', T, 0., np.inf,
+                                    case_dic['VAR_COST_FROM_PGP_STORAGE']*numerics_cost_scaling/T)
+        energy = add_columns(lp, 'ENERGY_PGP_STORAGE', T, 0., np.inf, 0.)
+        add_dispatch_limit(lp, 'LIMIT_TO_PGP_STORAGE', dispatch_to, capacity_to, is_var_to, np.ones(T), T)
+        add_dispatch_limit(lp, 'LIMIT_FROM_PGP_STORAGE', dispatch_from, capacity_from, is_var_from, np.ones(T), T)
+        add_redundant_rows(lp, case_dic, 'AVAILABLE_PGP_STORAGE', 'UB',
+                           [term(dispatch_from, 1., T), term(energy, -(1. - decay_rate), T)], 0., T)
+        add_dispatch_limit(lp, 'LIMIT_ENERGY_PGP_STORAGE', energy, capacity, is_var, np.ones(T), T)
+        add_rows(lp, 'BALANCE_PGP_STORAGE', 'EQ',
+                 [term(energy[following], 1., T), term(energy, -(1. - decay_rate), T),
+                  term(dispatch_to, -case_dic['CHARGING_EFFICIENCY_PGP_STORAGE'], T),
+                  term(dispatch_from, 1., T)], 0., T)
+        supply_terms.append(term(dispatch_from, 1., T))
+        demand_terms.append(term(dispatch_to, -1., T))
+
+    # --------- concentrated solar power -----------------------------------
+    if 'CSP' in system_components:
+        decay_rate = case_dic['DECAY_RATE_CSP_STORAGE']
+        capacity, is_var = add_capacity(lp, case_dic, 'CAPACITY_CSP',
+                                        case_dic['FIXED_COST_CSP']*numerics_cost_scaling,
+                                        np.inf, numerics_demand_scaling)
+        capacity_storage, is_var_storage = add_capacity(lp, case_dic, 'CAPACITY_CSP_STORAGE',
+                                                        case_dic['FIXED_COST_CSP_STORAGE']*numerics_cost_scaling,
+                                                        np.inf, numerics_demand_scaling)
+        dispatch_to = add_columns(lp, 'DISPATCH_TO_CSP_STORAGE', T, 0., np.inf, 0.)
+        dispatch_from = add_columns(lp, 'DISPATCH_FROM_CSP', T, 0., np.inf,
+                                    case_dic['VAR_COST_CSP']*numerics_cost_scaling/T)
+        energy = add_columns(lp, 'ENERGY_CSP_STORAGE', T, 0., np.inf,
+                             case_dic['VAR_COST_CSP_STORAGE']*numerics_cost_scaling/T)
+        add_dispatch_limit(lp, 'LIMIT_TO_CSP_STORAGE', dispatch_to, capacity, is_var, case_dic['CSP_SERIES'], T)
+        # same as core_model, which uses the STORAGE charging efficiency here
+        add_rows(lp, 'AVAILABLE_CSP_STORAGE', 'UB',
+                 [term(dispatch_from, 1., T), term(energy, -(1. - decay_rate), T),
+                  term(dispatch_to, -case_dic['CHARGING_EFFICIENCY_STORAGE'], T)], 0., T)
+        add_dispatch_limit(lp, 'LIMIT_ENERGY_CSP_STORAGE', energy, capacity_storage, is_var_storage, np.ones(T), T)
+        add_rows(lp, 'BALANCE_CSP_STORAGE', 'EQ',
+                 [term(energy[following], 1., T), term(energy, -(1. - decay_rate), T),
+                  term(dispatch_to, -case_dic['CHARGING_EFFICIENCY_CSP_STORAGE'], T),
+                  term(dispatch_from, 1., T)], 0., T)
+        supply_terms.append(term(dispatch_from, 1., T))
+
+    # --------- unmet demand -----------------------------------------------
+    if 'UNMET_DEMAND' in system_components:
+        dispatch_unmet_demand = add_columns(lp, 'DISPATCH_UNMET_DEMAND', T, 0., np.inf,
+                                            case_dic['VAR_COST_UNMET_DEMAND']*numerics_cost_scaling/T)
+        supply_terms.append(term(dispatch_unmet_demand, 1., T))
+
+        if case_dic['SYSTEM_RELIABILITY'] >= 0:
+            sys_rel = case_dic['SYSTEM_RELIABILITY']
+            add_rows(lp, 'SYSTEM_RELIABILITY', 'EQ',
+                     [sum_term(dispatch_unmet_demand, 1.)],
+                     (1.-sys_rel) * np.sum(demand_series), 1)
+
+    # --------- CO2 emissions cap -------------------------------------------
+    if case_dic['CO2_CAP'] >= 0:
+        add_rows(lp, 'CO2_CAP', 'UB', co2_terms, co2_cap, 1)
+
+    # --------- energy balance ---------------------------------------------
+    add_rows(lp, 'ENERGY_BALANCE', 'EQ', supply_terms + demand_terms, demand_series, T)
+
+    return lp
+
+#%% Solve and extract results
+
+# HiGHS model status -> status string, using the same names as cvxpy
+highs_status = {
+        'kOptimal':'optimal',
+        'kInfeasible':'infeasible',
+        'kUnbounded':'unbounded',
+        'kUnboundedOrInfeasible':'infeasible_or_unbounded',
+        'kIterationLimit':'user_limit',
+        'kTimeLimit':'user_limit'
+        }
+
+# In sweep mode (SWEEP_WARM_START), the simplex basis of the last optimal solve of
+# each template is kept here and used as the starting basis of the next case with
+# the same template. Neighbouring cases in a sweep usually need only a few simplex
+# iterations from there.
+direct_model_bases = {}     # template key (see Model_Results.py) -> highspy.HighsBasis
+
+def solve_direct_lp(lp, basis = None, options = {}, numeric_focus = False):
+    # Returns the highspy.Highs object after solving. The equality rows come first,
+    # followed by the inequality rows. <options> are generic solver options (see Solver_Backend.py).
+    A_eq, b_eq = build_matrix(lp, 'EQ')
+    A_ub, b_ub = build_matrix(lp, 'UB')
+    if A_ub is None:
+        A = A_eq
+        row_lower, row_upper = b_eq, b_eq
+    else:
+        A = sps.vstack([A_eq, A_ub]).tocsr()
+        row_lower = np.concatenate([b_eq, np.full(len(b_ub), -np.inf)])
+        row_upper = np.concatenate([b_eq, b_ub])
+
+    num_columns = len(lp['C'])
+    lp['SIZE'] = [A.shape[0], num_columns, A.nnz]   # rows, columns, nonzeros
+    lp['MATRIX_RANGE'] = value_range(A.data)
+    lp['ROW_LOWER'], lp['ROW_UPPER'] = row_lower, row_upper
+    import highspy      # only the DIRECT engine needs it
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    for name, value in solver_options('HIGHS', options, numeric_focus)['highs_options'].items():
+        highs.setOptionValue(name, value)
+    highs.addVars(num_columns, lp['LB'], lp['UB'])
+    highs.changeColsCost(num_columns, np.arange(num_columns, dtype = np.int32), lp['C'])
+    highs.addRows(A.shape[0], row_lower, row_upper, A.nnz,
+                  A.indptr[:-1].astype(np.int32), A.indices.astype(np.int32), A.data)
+    if basis is not None:
+        highs.setBasis(basis)
+    highs.run()
+    return highs
+
+def bound_complementarity(value, dual, lower, upper):
+    # sum of |dual * distance to the bound the dual belongs to|; duals on the side of an
+    # infinite bound are a dual infeasibility, which is left to the solver's tolerance
+    slack = np.where(dual > 0, value - lower, upper - value)
+    slack = np.where(np.isfinite(slack), slack, 0.)
+    return np.sum(np.abs(dual * slack))
+
+def complementarity(lp, solution):
+    # see check_price in Model_Results.py
+    return (bound_complementarity(np.array(solution.row_value), np.array(solution.row_dual),
+                                  lp['ROW_LOWER'], lp['ROW_UPPER']) +
+            bound_complementarity(np.array(solution.col_value), np.array(solution.col_dual),
+                                  lp['LB'], lp['UB']))
+
+def core_model_direct (global_dic, case_dic):
+    verbose = global_dic['VERBOSE']
+    numerics_cost_scaling = case_dic['NUMERICS_COST_SCALING']
+    numerics_demand_scaling = case_dic['NUMERICS_DEMAND_SCALING']
+    system_components = case_dic['SYSTEM_COMPONENTS']
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+
+    start_time = time.time()    # timer starts
+
+    lp = assemble_direct_lp(case_dic)
+    build_time = time.time() - start_time
+
+    template = template_key(case_dic)
+    basis = None
+    if global_dic['SWEEP_WARM_START']:
+        basis = direct_model_bases.get(template)
+    # retries go down the fallback ladder of Solver_Backend.py, except for its RESCALE
+    # step: Numerics_Scaling.py is built on this engine's assembly
+    solved = {'HIGHS':None}
+    def solve(options, numeric_focus, rescale):
+        solved['HIGHS'] = solve_direct_lp(lp, basis if solved['HIGHS'] is None else None,
+                                          options, numeric_focus)
+        return highs_status.get(solved['HIGHS'].getModelStatus().name, 'solver_error')
+    status, attempts = solve_with_fallbacks(solve, 'HIGHS', case_solver_options(global_dic, case_dic),
+                                            case_dic['TIME_LIMIT'], case_dic['MAX_RETRIES'], rescale = False)
+    highs = solved['HIGHS']
+
+    end_time = time.time()  # timer ends
+
+    if status not in ['optimal', 'user_limit']:
+        print('Solver error encounterd!', highs.modelStatusToString(highs.getModelStatus()))
+        result = failed_result(status, num_time_periods)
+    else:
+        if global_dic['SWEEP_WARM_START'] and status == 'optimal':
+            direct_model_bases[template] = highs.getBasis()
+
+        info = highs.getInfo()
+        objective = info.objective_function_value + lp['COST_OFFSET']
+        objective_and_bound = [objective, objective]
+        if status == 'user_limit':
+            print('Time limit reached')
+            objective_and_bound = limit_objectives('HIGHS', info, objective)
+
+        if objective_and_bound[0] is None:
+            # no solution to report, only the bound (if any)
+            result = failed_result(status, num_time_periods)
+        else:
+            solution = highs.getSolution()
+            x = np.array(solution.col_value)
+            system_cost = objective/(numerics_cost_scaling * numerics_demand_scaling)
+            if verbose:
+                print ('system cost ',system_cost, ' runtime: ', (end_time - start_time), 'seconds')
+
+            result = {'SYSTEM_COST':system_cost, 'PROBLEM_STATUS':status}
+
+            # The duals of the energy balance rows are d(cost)/d(demand), see the note on PRICE in Core_Model.py
+            balance_rows = lp['ROW_BLOCKS']['ENERGY_BALANCE'][1]
+            result['PRICE'] = num_time_periods * np.array(solution.row_dual)[balance_rows] / numerics_cost_scaling
+            check_price(result, complementarity(lp, solution), objective)
+            if status != 'optimal':
+                result['PRICE_VALID'] = False   # duals of an unfinished solve
+            if 'CO2_CAP' in lp['ROW_BLOCKS']:
+                # the inequality rows follow the equality rows, see solve_direct_lp
+                co2_row = lp['NUM_ROWS_EQ'] + lp['ROW_BLOCKS']['CO2_CAP'][1][0]
+                result['CO2_CAP_PRICE'] = -np.array(solution.row_dual)[co2_row] / numerics_cost_scaling
+
+            for key in capacity_result_keys:
+                if key in lp['COLUMNS']:
+                    result[key] = x[lp['COLUMNS'][key][0]]/numerics_demand_scaling
+                elif case_dic[key] >= 0 and component_of_capacity(key) in system_components:
+                    result[key] = case_dic[key]
+                else:
+                    result[key] = 0.
+
+            for key in vector_result_keys:
+                if key in lp['COLUMNS']:
+                    result[key] = x[lp['COLUMNS'][key]]/numerics_demand_scaling
+                else:
+                    result[key] = np.zeros(num_time_periods)
+
+            add_curtailment(case_dic, result)
+            result['MATRIX_RANGE'] = lp['MATRIX_RANGE']
+
+        add_cost_bound(result, objective_and_bound, numerics_cost_scaling * numerics_demand_scaling)
+
+    result['SOLVER'] = 'HIGHS'
+    result['SOLVER_PROFILE'] = str.upper(case_dic['SOLVER_PROFILE'])
+    result['SOLVE_ATTEMPTS'] = '+'.join(attempts)
+    result['NUMERIC_FOCUS_RETRY'] = len(attempts) > 1
+    result['NUMERICS_COST_SCALING'] = numerics_cost_scaling
+    result['NUMERICS_DEMAND_SCALING'] = numerics_demand_scaling
+    result['MODEL_SIZE'] = lp['SIZE']
+    result['FULL_MODEL_SIZE'] = [lp['SIZE'][0] + lp['DROPPED_ROWS'], lp['SIZE'][1],
+                                 lp['SIZE'][2] + lp['DROPPED_NONZEROS']]
+    if case_dic['LEAN_FORMULATION']:
+        print ('model size (rows, columns, nonzeros): full ', result['FULL_MODEL_SIZE'],
+               ' lean ', result['MODEL_SIZE'])
+    # the direct engine has no template cache, see core_model
+    info = highs.getInfo()
+    result['MODEL_CACHE_HIT'] = False
+    result['MODEL_BUILD_TIME'] = build_time
+    result['MODEL_BUILD_TIME_SAVED'] = 0.
+    result['SOLVE_TIME'] = end_time - start_time - build_time
+    result['WARM_START'] = basis is not None
+    result['SOLVE_ITERATIONS'] = info.simplex_iteration_count + info.ipm_iteration_count + info.crossover_iteration_count
+
+    return result
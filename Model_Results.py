@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+
+Model_Results.py
+
+Pieces of the <result> dictionary that are common to the model engines
+(Core_Model.py and Direct_Model.py), so that all of them return results
+in exactly the same format.
+
+"""
+
+import numpy as np
+
+from Technology_Registry import technology_registry, registry_keys
+
+#%% Result keys, in registry order (see Technology_Registry.py)
+
+capacity_result_keys = registry_keys('CAPACITY_KEYS')
+
+vector_result_keys = registry_keys('VECTOR_KEYS')
+
+curtailment_result_keys = ['CURTAILMENT_' + technology['NAME'] for technology in technology_registry
+                           if technology['CURTAILMENT']]
+
+#%%
+def component_of_capacity(capacity_key):
+    # e.g., CAPACITY_TO_PGP_STORAGE --> PGP_STORAGE, CAPACITY_CSP_STORAGE --> CSP
+    for technology in technology_registry:
+        if capacity_key in technology['CAPACITY_KEYS']:
+            return technology['NAME']
+    raise ValueError('Model_Results.py: no technology has capacity ' + capacity_key)
+
+def free_capacity_keys(case_dic):
+    # capacities that are optimized (CAPACITY_* < 0), e.g. by the master problem of Benders.py
+    return [key for key in capacity_result_keys
+            if component_of_capacity(key) in case_dic['SYSTEM_COMPONENTS'] and case_dic[key] < 0]
+
+#%%
+def template_key(case_dic):
+    # Cases with the same template key lead to LPs with the same structure, and differ
+    # only in the numbers (costs, efficiencies, capacity factors, demand, fixed capacities)
+    # (the lean formulation, LEAN_FORMULATION, has a different structure)
+    system_components = case_dic['SYSTEM_COMPONENTS']
+    fixed_capacities = tuple(key for key in capacity_result_keys
+                             if component_of_capacity(key) in system_components and case_dic[key] >= 0)
+    return (tuple(sorted(system_components)),
+            len(case_dic['DEMAND_SERIES']),
+            fixed_capacities,
+            case_dic['SYSTEM_RELIABILITY'] >= 0,
+            case_dic['CO2_CAP'] >= 0,
+            bool(case_dic['LEAN_FORMULATION']),
+            # representative days: which day of the full series each day stands for (see Time_Aggregation.py)
+            tuple(case_dic['DAY_MAP']) if 'DAY_MAP' in case_dic else None,
+            # rolling horizon windows are not cyclic (see Rolling_Horizon.py)
+            case_dic.get('ROLLING_WINDOW', False),
+            # Benders time blocks link their capacities to the master problem (see Benders.py)
+            case_dic.get('BENDERS_SUBPROBLEM', False),
+            # storage is cyclic within each weather year (see following_hours)
+            tuple(np.unique(case_dic['YEAR_SERIES'], return_counts = True)[1])
+                if case_dic.get('WEATHER_YEAR_BLOCKS', False) else None)
+
+#%%
+def following_hours(case_dic):
+    # Index of the hour after each hour of the case, for the storage balances: the last
+    # hour is followed by the first one. With WEATHER_YEAR_BLOCKS each weather year
+    # (YEAR_SERIES) is a block of its own, whose last hour is followed by its first hour,
+    # so that all years share the capacities but storage does not carry energy from one
+    # year to the next.
+    if case_dic.get('WEATHER_YEAR_BLOCKS', False):
+        return following_in_years(case_dic['YEAR_SERIES'])
+    return np.roll(np.arange(len(case_dic['DEMAND_SERIES'])), -1)
+
+def following_days(case_dic):
+    # Index of the day after each day of the full series of a case with representative
+    # days (DAY_MAP), for the storage chain through the days: as <following_hours>
+    years = np.asarray(case_dic['YEAR_SERIES'])[::case_dic['HOURS_PER_DAY']]
+    if case_dic.get('WEATHER_YEAR_BLOCKS', False):
+        return following_in_years(years)
+    return np.roll(np.arange(len(years)), -1)
+
+def following_in_years(years):
+    # the period after each period of <years> (the year of each period), the last period
+    # of each year followed by its first period
+    years = np.asarray(years)
+    following = np.arange(1, len(years) + 1)
+    last_periods = np.flatnonzero(np.append(years[1:] != years[:-1], True))
+    following[last_periods] = np.append(0, last_periods[:-1] + 1)
+    return following
+
+#%%
+def failed_result(problem_status, num_time_periods):
+    # result returned when a case could not be solved: everything is set to -1
+    result = {
+        'SYSTEM_COST': -1,
+        'PROBLEM_STATUS':problem_status
+        }
+    for key in capacity_result_keys:
+        result[key] = -1
+    for key in ['PRICE','DISPATCH_CSP'] + vector_result_keys + curtailment_result_keys:
+        result[key] = -1 * np.ones(num_time_periods)
+    result['MATRIX_RANGE'] = [-1, -1]
+    result['PRICE_GAP'] = -1
+    result['PRICE_VALID'] = False
+    result['SYSTEM_COST_BOUND'] = -1
+    result['COST_GAP'] = -1
+    return result
+
+#%%
+def value_range(values):
+    # [smallest, largest] absolute value of the finite nonzero <values>, [0, 0] if there are none,
+    # e.g. the range of the coefficients of the constraint matrix (MATRIX_RANGE)
+    values = np.abs(np.asarray(values, dtype = float))
+    values = values[np.isfinite(values) & (values > 0)]
+    if len(values) == 0:
+        return [0., 0.]
+    return [np.min(values), np.max(values)]
+
+#%%
+# PRICE comes from the duals of the energy balance. A barrier solve without crossover
+# (SOLVER_PROFILE = fast) stops at loose tolerances and its duals are only as good as
+# those. The check is complementary slackness: the sum of |dual * slack| over the
+# inequality rows and bounds, relative to the objective. For dual feasible solutions
+# this is the duality gap.
+price_gap_tolerance = 1e-4
+
+def check_price(result, complementarity, objective):
+    result['PRICE_GAP'] = complementarity / abs(objective) if objective != 0 else complementarity
+    result['PRICE_VALID'] = bool(result['PRICE_GAP'] <= price_gap_tolerance)
+    if not result['PRICE_VALID']:
+        print ('Warning: duals are not accurate enough for PRICE, relative complementarity gap ',
+               result['PRICE_GAP'])
+
+#%%
+def add_cost_bound(result, objective_and_bound, cost_scaling):
+    # SYSTEM_COST_BOUND and COST_GAP from the best objective and the best bound the solver knows of
+    # (both the optimum for an optimal solve, see limit_objectives in Solver_Backend.py), -1 if unknown
+    objective, bound = objective_and_bound
+    result['SYSTEM_COST_BOUND'] = -1 if bound is None else bound / cost_scaling
+    result['COST_GAP'] = -1
+    if objective is not None and bound is not None:
+        result['COST_GAP'] = abs(objective - bound) / abs(objective) if objective != 0 else abs(bound)
+
+#%%
+def add_curtailment(case_dic, result):
+    # Curtailment is derived from capacities and dispatch, it is not a model variable
+    system_components = case_dic['SYSTEM_COMPONENTS']
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+
+    for technology in technology_registry:
+        if not technology['CURTAILMENT']:
+            continue
+        component = technology['NAME']
+        if component in system_components:
+            # potential output: capacity * capacity factor (or just capacity for e.g. nuclear)
+            if technology['SERIES'] is None:
+                potential = result['CAPACITY_' + component] * np.ones(num_time_periods)
+            else:
+                potential = result['CAPACITY_' + component] * np.array(case_dic[technology['SERIES']])
+            result['CURTAILMENT_' + component] = potential - result[technology['CURTAILMENT_KEY']]
+        else:
+            result['CURTAILMENT_' + component] = np.zeros(num_time_periods)
+
+    return result
+
+#%%
+def system_cost(case_dic, result):
+    # SYSTEM_COST from capacities and dispatch, as in the objective of the model engines:
+    # fixed costs per hour plus the mean variable cost per hour
+    cost = 0.
+    for technology in technology_registry:
+        if technology['NAME'] not in case_dic['SYSTEM_COMPONENTS']:
+            continue
+        for capacity_key, cost_key in technology['FIXED_COSTS']:
+            cost += result[capacity_key] * case_dic[cost_key]
+        for series_key, cost_key in technology['VAR_COSTS']:
+            cost += np.mean(result[series_key]) * case_dic[cost_key]
+    return cost
+
+#%%
+def co2_rate(case_dic, co2_key):
+    # FIXED_CO2_* (kgCO2/h per kW) or VAR_CO2_* (kgCO2/kWh), 0 if it is not given (-1)
+    return max(case_dic[co2_key], 0.)
+
+def co2_emissions(case_dic, result):
+    # CO2 emissions from capacities and dispatch (kgCO2/h), as in the CO2_CAP constraint of
+    # the model engines: FIXED_CO2_* per hour plus the mean of VAR_CO2_* per hour
+    emissions = 0.
+    for technology in technology_registry:
+        if technology['NAME'] not in case_dic['SYSTEM_COMPONENTS']:
+            continue
+        for capacity_key, cost_key in technology['FIXED_COSTS']:
+            if cost_key in technology['CO2_KEYS']:
+                emissions += result[capacity_key] * co2_rate(case_dic, technology['CO2_KEYS'][cost_key])
+        for series_key, cost_key in technology['VAR_COSTS']:
+            if cost_key in technology['CO2_KEYS']:
+                emissions += np.mean(result[series_key]) * co2_rate(case_dic, technology['CO2_KEYS'][cost_key])
+    return emissions
+
+def add_co2_emissions(case_dic, result):
+    # CO2_EMISSIONS of a solved case (-1 if there is no solution), and CO2_CAP_PRICE, the
+    # carbon price implied by the dual of its CO2_CAP constraint (-1 if it has none)
+    result['CO2_EMISSIONS'] = -1
+    if result['SYSTEM_COST'] != -1:
+        result['CO2_EMISSIONS'] = co2_emissions(case_dic, result)
+    result.setdefault('CO2_CAP_PRICE', -1)
+    return result
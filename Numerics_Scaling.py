@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+
+Numerics_Scaling.py
+
+Automatic choice of NUMERICS_COST_SCALING and NUMERICS_DEMAND_SCALING.
+
+All costs in the LP are multiplied by NUMERICS_COST_SCALING and all demands,
+capacities and dispatch by NUMERICS_DEMAND_SCALING (the results are scaled
+back). The fixed defaults (1e12 for both) put the objective coefficients and
+the right hand sides (demand, fixed capacities, max demand) far away from the
+range the solvers' tolerances are made for, which is a common reason for the
+re-solve with NUMERIC_FOCUS in <core_model>.
+
+With NUMERICS_AUTO_SCALING = true in the case input file, <auto_scaling>
+assembles the case's LP without scaling (with the DIRECT engine's assembly,
+which is cheap) and looks at the range of the nonzero
+
+    objective coefficients (fixed and variable costs),
+    right hand sides and bounds (demand, max demand, fixed capacities),
+    matrix coefficients (capacity factors, efficiencies, decay rates, ...).
+
+The objective coefficients are all proportional to NUMERICS_COST_SCALING and
+the right hand sides to NUMERICS_DEMAND_SCALING, so each factor is chosen as
+the power of 10 that centers its range (geometrically) on 1, which minimizes
+the largest deviation from 1 in that range. The matrix coefficients do not
+depend on either factor; their range is logged for information.
+
+"""
+
+import numpy as np
+
+from Direct_Model import assemble_direct_lp
+from Model_Results import value_range
+
+#%%
+def centering_scale(scale_range):
+    # power of 10 that puts the geometric center of <scale_range> closest to 1
+    if scale_range[1] == 0:
+        return 1.
+    return 10.**np.round(-0.5 * np.log10(scale_range[0] * scale_range[1]))
+
+#%%
+def problem_ranges(lp):
+    # ranges of the coefficients of an LP assembled by Direct_Model.py
+    matrix = [item[2] for kind in ['EQ','UB'] for item in lp['ROWS_' + kind]]
+    rhs = [b for kind in ['EQ','UB'] for b in lp['B_' + kind]] + [lp['LB'], lp['UB']]
+    return {
+            'MATRIX':value_range(np.concatenate(matrix)) if len(matrix) > 0 else [0., 0.],
+            'OBJECTIVE':value_range(lp['C']),
+            'RHS':value_range(np.concatenate(rhs))
+            }
+
+def auto_scaling(case_dic):
+    # Returns NUMERICS_COST_SCALING, NUMERICS_DEMAND_SCALING and the coefficient ranges
+    # of the LP with that scaling
+    unscaled_ranges = problem_ranges(assemble_direct_lp(
+            dict(case_dic, NUMERICS_COST_SCALING = 1., NUMERICS_DEMAND_SCALING = 1.)))
+    cost_scaling = centering_scale(unscaled_ranges['OBJECTIVE'])
+    demand_scaling = centering_scale(unscaled_ranges['RHS'])
+    ranges = {
+            'MATRIX':unscaled_ranges['MATRIX'],
+            'OBJECTIVE':[value * cost_scaling for value in unscaled_ranges['OBJECTIVE']],
+            'RHS':[value * demand_scaling for value in unscaled_ranges['RHS']]
+            }
+    return cost_scaling, demand_scaling, ranges
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+
+Parametric_Sweep.py
+
+Exact solution path of a sweep of one cost parameter.
+
+With PARAMETRIC_SWEEP = true (global section of the case input file), cases
+that are the same except for their costs (FIXED_COST_*, VAR_COST_*, also
+through CO2_PRICE) are solved as one parametric LP if the costs of all of them
+lie on a line c(t) = c0 + (t - t0) * d of one parameter t. t is CO2_PRICE if
+the costs follow it, else the first cost keyword that varies (in the order of
+Technology_Registry.py).
+
+Only the objective depends on t, so the optimal system cost f(t) is concave and
+piecewise linear in t, and the capacities and dispatch are constant between
+its breakpoints. Every solution x has a cost line l_x(t) = c(t) . x
+(system_cost in Model_Results.py) and f(t) is the lowest of them. <cost_path>
+finds the pieces of f by bisection at the crossings of cost lines (Eisner and
+Severance): solve at both ends of the sweep; if neither solution is optimal at
+the other end, solve again where their cost lines cross. If the new solution
+is no cheaper there (within breakpoint_tolerance), the crossing is a
+breakpoint; else both halves are searched again with the new solution.
+
+The whole path with P pieces would take 2P - 1 solves, and LPs with hourly
+dispatch can have many pieces (small shifts of the capacities), so the path
+is only traced as far as it decides the solution of a case: an interval with
+no case inside is left out of the path, and one with only a few cases inside
+is solved at its cases. A solve at a crossing that is not a breakpoint
+settles no case, so crossings are only solved while the solves made so far
+are fewer than the cases settled so far (at the ends of the sweep or inside
+pieces that were found); else the solve is at the case next to the crossing,
+which settles that case. So the path never takes more solves than there are
+cases, and far fewer when the cases fall in a few regimes.
+
+Each case of the sweep then gets the solution of its piece, with SYSTEM_COST at
+its own costs. The duals (PRICE) change with t within a piece, so a case that
+was not solved itself has the PRICE of the solve of its piece and PRICE_VALID
+False. The solve times of a path are reported with its first case.
+
+The path of each sweep is written to <global name>_path_<first case>.csv (see
+save_parametric_path in Save_Basic_Results.py): one row per piece, with the
+parameter and system cost at both of its ends and the capacities. Where the
+path is left out, a row is only the point at which it was solved (the same
+parameter at both ends).
+
+Sweeps of anything else (e.g. capacity factors or efficiencies, which are in
+the constraint matrix) have no such path and are solved case by case, as are
+cases with REPRESENTATIVE_DAYS, TIME_STEP_HOURS, ROLLING_HORIZON_HOURS,
+BENDERS_BLOCKS, screening or SENSITIVITY_REPORT, and sweeps of fewer than
+three cases.
+
+"""
+
+import numpy as np
+
+from Model_Results import system_cost
+from Numerics_Scaling import auto_scaling
+from Technology_Registry import technology_registry
+
+breakpoint_tolerance = 1e-6     # relative difference of system costs taken as equal
+affine_tolerance = 1e-9         # relative deviation of the costs from a line in the parameter
+
+#%%
+def cost_keys(case_dic):
+    # the cost keywords of the case, in the order of Technology_Registry.py
+    keys = []
+    for technology in technology_registry:
+        if technology['NAME'] in case_dic['SYSTEM_COMPONENTS']:
+            keys += [cost_key for capacity_key, cost_key in technology['FIXED_COSTS']]
+            keys += [cost_key for series_key, cost_key in technology['VAR_COSTS']]
+    return keys
+
+def one_lp_case(case_dic):
+    # True for cases that core_model_loop solves as one LP at full resolution, without
+    # a sensitivity report (which needs the duals of each case)
+    return not (case_dic['SENSITIVITY_REPORT'] or case_dic['REPRESENTATIVE_DAYS'] > 0 or case_dic['TIME_STEP_HOURS'] > 1 or
+                case_dic['ROLLING_HORIZON_HOURS'] > 0 or case_dic['BENDERS_BLOCKS'] > 1 or
+                case_dic['SCREENING_DAYS'] > 0 or case_dic['SCREENING_TIME_STEP_HOURS'] > 1)
+
+def family_key(case_dic):
+    # Cases with the same family key differ only in their costs
+    excluded = set(cost_keys(case_dic) + ['CASE_NAME', 'CO2_PRICE'])
+    key = []
+    for name in sorted(case_dic):
+        if name in excluded:
+            continue
+        value = case_dic[name]
+        if isinstance(value, (list, np.ndarray)):
+            value = np.asarray(value).tobytes()
+        key.append((name, value))
+    return tuple(key)
+
+def sweep_line(case_dic_list, case_indices):
+    # [parameter, t of each case, t0, c0, d] if the costs of the cases lie on a line, else None
+    keys = cost_keys(case_dic_list[case_indices[0]])
+    costs = np.array([[case_dic_list[index][key] for key in keys] for index in case_indices], dtype = float)
+    scale = max(np.max(np.abs(costs)), 1e-30)
+    for parameter in ['CO2_PRICE'] + keys:
+        t = np.array([case_dic_list[index][parameter] for index in case_indices], dtype = float)
+        if np.ptp(t) == 0:
+            continue
+        first = np.argmin(t)
+        d = np.linalg.lstsq((t - t[first])[:,None], costs - costs[first], rcond = None)[0][0]
+        if np.max(np.abs(costs - costs[first] - np.outer(t - t[first], d))) <= affine_tolerance * scale:
+            return [parameter, t, t[first], costs[first], d]
+    return None
+
+#%%
+def cost_path(solve_at, line_cost, grid, solves, settled, lo, hi, low_result, high_result):
+    # Pieces [from, to, result] of the optimal cost on [lo, hi], from the optimal results
+    # at both ends, as far as they decide the solution at the values of <grid>; None if a
+    # solve fails. <solves> are the solves so far, <settled> the values of <grid> whose
+    # solution is known.
+    on_interval = grid[(grid >= lo) & (grid <= hi)]
+    low_at_hi, high_at_hi = line_cost(low_result, hi), line_cost(high_result, hi)
+    if low_at_hi <= high_at_hi + breakpoint_tolerance * abs(high_at_hi):
+        settled.update(on_interval)
+        return [[lo, hi, low_result]]
+    low_at_lo, high_at_lo = line_cost(low_result, lo), line_cost(high_result, lo)
+    if high_at_lo <= low_at_lo + breakpoint_tolerance * abs(low_at_lo):
+        settled.update(on_interval)
+        return [[lo, hi, high_result]]
+    inside = grid[(grid > lo) & (grid < hi)]
+    if len(inside) == 0:
+        # no case in between: the breakpoints here are left out of the path
+        return [[lo, lo, low_result], [hi, hi, high_result]]
+    # where the cost lines cross inside (lo, hi)
+    value = lo + (hi - lo) * (high_at_lo - low_at_lo) / ((low_at_hi - low_at_lo) - (high_at_hi - high_at_lo))
+    # A solve at the crossing settles no case if it is not a breakpoint, so it is only made
+    # while the solves so far, it and one solve for each case not yet settled are no more
+    # than the cases (no more solves than <settled>). Else the solve is at the case next
+    # to the crossing, which settles that case.
+    crossing = len(inside) > 2 and len(solves) < len(settled)
+    if not crossing:
+        value = inside[np.argmin(np.abs(inside - value))]
+    result = solve_at(value)
+    if result['PROBLEM_STATUS'] != 'optimal':
+        return None
+    if not crossing:
+        settled.add(value)
+    line = line_cost(low_result, value)
+    if crossing and line_cost(result, value) >= line - breakpoint_tolerance * abs(line):
+        settled.update(on_interval)
+        return [[lo, value, low_result], [value, hi, high_result]]
+    low_pieces = cost_path(solve_at, line_cost, grid, solves, settled, lo, value, low_result, result)
+    high_pieces = cost_path(solve_at, line_cost, grid, solves, settled, value, hi, result, high_result)
+    if low_pieces is None or high_pieces is None:
+        return None
+    return low_pieces + high_pieces
+
+def merge_pieces(pieces):
+    # neighbouring pieces with the same solution are one piece
+    merged = [list(pieces[0])]
+    for piece in pieces[1:]:
+        if piece[2] is merged[-1][2] and piece[0] == merged[-1][1]:
+            merged[-1][1] = piece[1]
+        else:
+            merged.append(list(piece))
+    return merged
+
+#%%
+def sweep_path(global_dic, case_dic_list, case_indices, solve):
+    # Results of the cases <case_indices> (one family) on their path, and the path; None if
+    # the costs are not on a line or a solve fails
+    line = sweep_line(case_dic_list, case_indices)
+    if line is None:
+        return None
+    parameter, t, t0, c0, d = line
+    base_case_dic = case_dic_list[case_indices[0]]
+    keys = cost_keys(base_case_dic)
+
+    def case_at(value):
+        case_dic = dict(base_case_dic, CASE_NAME = base_case_dic['CASE_NAME'] + '_path')
+        case_dic.update(zip(keys, c0 + (value - t0) * d))
+        case_dic[parameter] = value
+        return case_dic
+
+    solves = []
+    def solve_at(value):
+        case_dic = case_at(value)
+        if case_dic['NUMERICS_AUTO_SCALING']:
+            case_dic['NUMERICS_COST_SCALING'], case_dic['NUMERICS_DEMAND_SCALING'], ranges = auto_scaling(case_dic)
+        result = solve(global_dic, case_dic)
+        solves.append([value, result])
+        return result
+
+    def line_cost(result, value):
+        return system_cost(case_at(value), result)
+
+    lo, hi = np.min(t), np.max(t)
+    low_result, high_result = solve_at(lo), solve_at(hi)
+    if low_result['PROBLEM_STATUS'] != 'optimal' or high_result['PROBLEM_STATUS'] != 'optimal':
+        return None
+    pieces = cost_path(solve_at, line_cost, np.unique(t), solves, {lo, hi}, lo, hi, low_result, high_result)
+    if pieces is None:
+        return None
+    pieces = merge_pieces(pieces)
+    breakpoints = [piece[1] for piece, next_piece in zip(pieces, pieces[1:]) if piece[1] == next_piece[0]]
+    solved_at = {id(result): value for value, result in solves}
+
+    results = {}
+    for i, case_index in enumerate(case_indices):
+        piece = [piece for piece in pieces if piece[0] <= t[i] <= piece[1]][0]
+        result = dict(piece[2])
+        if t[i] != solved_at[id(piece[2])]:
+            # same solution, at other costs: no duals or bound of its own
+            result['SYSTEM_COST'] = system_cost(case_dic_list[case_index], result)
+            result['SYSTEM_COST_BOUND'] = -1
+            result['COST_GAP'] = -1
+            result['PRICE_VALID'] = False
+        for key in ['MODEL_BUILD_TIME', 'MODEL_BUILD_TIME_SAVED', 'SOLVE_TIME', 'SOLVE_ITERATIONS']:
+            result[key] = sum(solve_result[key] for value, solve_result in solves) if i == 0 else 0
+        result['PATH_PARAMETER'] = parameter
+        result['PATH_VALUE'] = t[i]
+        result['PATH_SOLVES'] = len(solves)
+        result['PATH_BREAKPOINTS'] = len(breakpoints)
+        results[case_index] = result
+    path = [[piece[0], piece[1], line_cost(piece[2], piece[0]), line_cost(piece[2], piece[1]), piece[2]]
+            for piece in pieces]
+    return results, [parameter, path, breakpoints]
+
+def parametric_sweep(global_dic, case_dic_list, solve):
+    # Results of the cases on a parametric path (case index -> result) and the paths
+    # ([first case, parameter, pieces]), solved by <solve> (one LP by the case's engine)
+    verbose = global_dic['VERBOSE']
+    families = {}
+    for case_index, case_dic in enumerate(case_dic_list):
+        if one_lp_case(case_dic):
+            families.setdefault(family_key(case_dic), []).append(case_index)
+
+    path_results = {}
+    paths = []
+    for case_indices in families.values():
+        if len(case_indices) < 3:
+            continue
+        swept = sweep_path(global_dic, case_dic_list, case_indices, solve)
+        if swept is None:
+            if verbose:
+                print ('parametric sweep: cases ',[case_dic_list[index]['CASE_NAME'] for index in case_indices],
+                       ' are not on a cost path, they are solved one by one')
+            continue
+        results, [parameter, path, breakpoints] = swept
+        path_results.update(results)
+        paths.append([case_dic_list[case_indices[0]], parameter, path])
+        if verbose:
+            first_result = results[case_indices[0]]
+            print ('parametric sweep over ',parameter,': ',len(case_indices),' cases, ',first_result['PATH_SOLVES'],
+                   ' LP solves, breakpoints at ',[float(value) for value in breakpoints])
+    return path_results, paths
+
+def no_parametric_sweep():
+    # result entries of a case that is not solved on a parametric path
+    return {
+            'PATH_PARAMETER':               '',
+            'PATH_VALUE':                   -1,
+            'PATH_SOLVES':                  -1,
+            'PATH_BREAKPOINTS':             -1
+            }
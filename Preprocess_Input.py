@@ -16,8 +16,9 @@ It generates a result containing <global_dic> and <case_dic_list>
 
 Each dictionary in <case_dic_list> ALWAYS contains:
     
-    'SYSTEM_COMPONENTS' -- LIST OF COMPONENTS, CHOICES ARE: 'WIND','SOLAR', 
-                 'NATGAS','NATGAS_CCS','NUCLEAR','STORAGE', 'PGP_STORAGE', 'CSP', 'UNMET'
+    'SYSTEM_COMPONENTS' -- LIST OF COMPONENTS, CHOICES ARE THE NAMES IN Technology_Registry.py:
+                 'NATGAS','NATGAS_CCS','SOLAR','WIND','SOLAR2','WIND2','NUCLEAR',
+                 'STORAGE','STORAGE2','PGP_STORAGE','CSP','UNMET_DEMAND'
     'DEMAND_SERIES' -- TIME SERIES OF DEMAND DATA
     
 Each dictionary in <case_dic_list> OPTIONALLY contains keywords listed in the text below
@@ -27,6 +28,8 @@ Each dictionary in <case_dic_list> OPTIONALLY contains keywords listed in the te
 import csv
 import numpy as np
 from utilities import dict_of_lists_to_list_of_dicts
+from Technology_Registry import technology_registry, technologies, registry_keys
+from Work_Queue import write_queue
 
 
 
@@ -79,7 +82,7 @@ def import_case_input(case_input_path_filename):
 
 def read_csv_dated_data_file(start_year,start_month,start_day,start_hour,
                              end_year,end_month,end_day,end_hour,
-                             data_path, data_filename):
+                             data_path, data_filename, with_years = False):
     
     # turn dates into yyyymmddhh format for comparison.
     # Assumes all datasets are on the same time step and are not missing any data.
@@ -119,10 +122,13 @@ def read_csv_dated_data_file(start_year,start_month,start_day,start_hour,
 
     series = [item[1] for item in zip(hour_num,data_array[:,4]) if item[0]>= start_hour and item[0] <= end_hour]
     
+    if with_years: # also the year of each hour
+        years = [int(item[1]) for item in zip(hour_num,data_array[:,0]) if item[0]>= start_hour and item[0] <= end_hour]
+        return np.array(series).flatten(), np.array(years)
     return np.array(series).flatten() # return flatten series
 
 def literal_to_boolean(text):
-    if (text.strip())[0]=='T' or (text.strip())[0]=='t':  # if first non-space character is T or t, then True, else False
+    if (text.strip())[:1]=='T' or (text.strip())[:1]=='t':  # if first non-space character is T or t, then True, else False (also if blank)
         answer = True
     else:
         answer = False
@@ -136,92 +142,40 @@ def preprocess_input(case_input_path_filename):
     # Recognized keywords in case_input.csv file
     
     keywords_logical = list(map(str.upper,
-            ['VERBOSE','POSTPROCESS','QUICK_LOOK','NORMALIZE_DEMAND_TO_ONE']
+            ['VERBOSE','POSTPROCESS','QUICK_LOOK','NORMALIZE_DEMAND_TO_ONE',
+             'MODEL_TEMPLATE_CACHE','SWEEP_WARM_START','PARAMETRIC_SWEEP','ADAPTIVE_SWEEP','LEAN_FORMULATION',
+             'NUMERICS_AUTO_SCALING','TIME_AGGREGATION_CHECK','WEATHER_YEAR_BLOCKS',
+             'SENSITIVITY_REPORT','WORK_QUEUE']
             ))
 
     keywords_str = list(map(str.upper,
-            ['DATA_PATH','DEMAND_FILE',
-             'SOLAR2_CAPACITY_FILE','WIND2_CAPACITY_FILE',
-             'SOLAR_CAPACITY_FILE','WIND_CAPACITY_FILE','CSP_CAPACITY_FILE','OUTPUT_PATH',
-             'CASE_NAME','GLOBAL_NAME']
+            ['DATA_PATH','DEMAND_FILE','OUTPUT_PATH',
+             'CASE_NAME','GLOBAL_NAME',
+             'MODEL_ENGINE','SOLVER','SOLVER_PROFILE'] +
+            registry_keys('KEYWORDS_STR')  # capacity factor files, e.g. WIND_CAPACITY_FILE
             ))
     
+    # costs and CO2 emissions of the technologies in Technology_Registry.py
     keywords_real_scaled = list(map(str.upper,
-            [             
-            
-            'FIXED_COST_NATGAS','VAR_COST_NATGAS',
-            'FIXED_CO2_NATGAS','VAR_CO2_NATGAS',
-            
-            'FIXED_COST_NATGAS_CCS','VAR_COST_NATGAS_CCS',
-            'FIXED_CO2_NATGAS_CCS','VAR_CO2_NATGAS_CCS',
-            
-            'FIXED_COST_SOLAR','VAR_COST_SOLAR',
-            'FIXED_CO2_SOLAR','VAR_CO2_SOLAR',
-            
-            'FIXED_COST_SOLAR2','VAR_COST_SOLAR2',
-            'FIXED_CO2_SOLAR2','VAR_CO2_SOLAR2', 
-            
-            'FIXED_COST_WIND','VAR_COST_WIND',
-            'FIXED_CO2_WIND', 'VAR_CO2_WIND',
-            
-            'FIXED_COST_WIND2','VAR_COST_WIND2',
-            'FIXED_CO2_WIND2','VAR_CO2_WIND2',
-                        
-            'FIXED_COST_NUCLEAR','VAR_COST_NUCLEAR',
-            'FIXED_CO2_NUCLEAR','VAR_CO2_NUCLEAR',
-            
-            'FIXED_COST_STORAGE','VAR_COST_STORAGE',
-            'VAR_COST_TO_STORAGE','VAR_COST_FROM_STORAGE',
-           
-            'FIXED_COST_STORAGE2','VAR_COST_STORAGE2',
-            'VAR_COST_TO_STORAGE2','VAR_COST_FROM_STORAGE2',
-            
-            'FIXED_COST_PGP_STORAGE','FIXED_COST_TO_PGP_STORAGE','FIXED_COST_FROM_PGP_STORAGE',
-            'VAR_COST_TO_PGP_STORAGE','VAR_COST_FROM_PGP_STORAGE',
-
-            'FIXED_COST_CSP','VAR_COST_CSP',
-            'FIXED_COST_CSP_STORAGE','VAR_COST_CSP_STORAGE',
-            
-            'VAR_COST_UNMET_DEMAND'
-
-            ]
+            registry_keys('KEYWORDS_SCALED')
             ))
     
     keywords_real_notscaled = list(map(str.upper,
             [
-            'CO2_PRICE',
+            'CO2_PRICE','CO2_CAP',
             'NUMERICS_COST_SCALING','NUMERICS_DEMAND_SCALING',
             'END_DAY','END_HOUR','END_MONTH','END_YEAR',
             'START_DAY','START_HOUR','START_MONTH','START_YEAR',
-
-            'CAPACITY_NATGAS',
-            
-            'CAPACITY_NATGAS_CCS',
-            
-            'CAPACITY_SOLAR',
-
-            'CAPACITY_SOLAR2',
-
-            'CAPACITY_WIND',
-
-            'CAPACITY_WIND2',
-            
-            'CAPACITY_NUCLEAR',
-            
-            'CAPACITY_STORAGE','CHARGING_TIME_STORAGE',
-            'CHARGING_EFFICIENCY_STORAGE','DECAY_RATE_STORAGE',
-            
-            'CAPACITY_STORAGE2','CHARGING_TIME_STORAGE2',
-            'CHARGING_EFFICIENCY_STORAGE2','DECAY_RATE_STORAGE2',
-            
-            'CAPACITY_PGP_STORAGE','CAPACITY_TO_PGP_STORAGE','CAPACITY_FROM_PGP_STORAGE',
-            'CHARGING_EFFICIENCY_PGP_STORAGE','DECAY_RATE_PGP_STORAGE',
-
-            'CAPACITY_CSP','CAPACITY_CSP_STORAGE',
-            'DECAY_RATE_CSP_STORAGE','CHARGING_EFFICIENCY_CSP_STORAGE',
-            
-            'SYSTEM_RELIABILITY'
-            ]
+            'SYSTEM_RELIABILITY',
+            'TIME_LIMIT','MAX_RETRIES',
+            'REPRESENTATIVE_DAYS','TIME_STEP_HOURS',
+            'ROLLING_HORIZON_HOURS','LOOKAHEAD_HOURS','ROLLING_HORIZON_WORKERS',
+            'BENDERS_BLOCKS','BENDERS_TOLERANCE','BENDERS_MAX_ITERATIONS','BENDERS_WORKERS',
+            'SCREENING_DAYS','SCREENING_TIME_STEP_HOURS','SCREENING_MARGIN',
+            'ADAPTIVE_SWEEP_STEP','ADAPTIVE_SWEEP_TOLERANCE','ADAPTIVE_SWEEP_COST_GAP',
+            'WORKERS','SOLVER_THREADS','MEMORY_BUDGET_GB','QUEUE_LEASE_SECONDS','QUEUE_MAX_ATTEMPTS'
+            ] +
+            registry_keys('KEYWORDS_NOTSCALED') # capacities, charging times, efficiencies and decay rates
             ))
     
     #Capacity cost -- Cost per hour of capacity that must be incurred whether or 
@@ -255,6 +209,25 @@ def preprocess_input(case_input_path_filename):
     #------ DEFAULT VALUES FOR global_dic ---------
     # For now, default for quicklook output is True
     global_dic['QUICK_LOOK'] = True
+    # reuse compiled cvxpy problems for cases with the same structure (see Core_Model.py)
+    global_dic['MODEL_TEMPLATE_CACHE'] = True
+    # solve neighbouring cases one after another, starting from the previous solution (see Core_Model.py)
+    global_dic['SWEEP_WARM_START'] = False
+    # solve sweeps of one cost parameter on their exact path, at the breakpoints only (see Parametric_Sweep.py)
+    global_dic['PARAMETRIC_SWEEP'] = False
+    # solve grid sweeps only where the technology mix changes (see Adaptive_Sweep.py)
+    global_dic['ADAPTIVE_SWEEP'] = False
+    global_dic['ADAPTIVE_SWEEP_STEP'] = 4 # grid steps between the cases of the coarse grid that is solved first
+    global_dic['ADAPTIVE_SWEEP_TOLERANCE'] = 1e-2 # capacity difference per kW of mean demand taken as a change of the mix
+    global_dic['ADAPTIVE_SWEEP_COST_GAP'] = -1 # relative bound on the cost error of the cases filled in a grid of costs, -1 = not used (see Adaptive_Sweep.py)
+    # processes that solve the cases in parallel (see Core_Model.py)
+    global_dic['WORKERS'] = 1
+    global_dic['SOLVER_THREADS'] = 0 # threads of each solve, 0 = the solver's choice (with WORKERS > 1: the cores divided among the workers)
+    global_dic['MEMORY_BUDGET_GB'] = -1 # predicted memory of the cases the WORKERS solve at one time, -1 = no limit (see Scheduler.py)
+    # cases solved by any number of runs that take them from a queue of task files (see Work_Queue.py)
+    global_dic['WORK_QUEUE'] = False
+    global_dic['QUEUE_LEASE_SECONDS'] = 1800 # a claimed task whose worker gave no sign of life for this long goes back to the queue
+    global_dic['QUEUE_MAX_ATTEMPTS'] = 3 # claims of a task after which it fails
     # default global values to help with numerical issues
     #------convert file input to dictionary of global data ---------
     for list_item in global_data:
@@ -285,9 +258,25 @@ def preprocess_input(case_input_path_filename):
     # For now, default for quicklook output is True
     all_cases_dic['NORMALIZE_DEMAND_TO_ONE'] = False # If True, normalize mean demand to 1.0
     all_cases_dic['CO2_PRICE'] = 0.0 
+    all_cases_dic['CO2_CAP'] = -1. # kgCO2/h: cap on the emissions (FIXED_CO2_*, VAR_CO2_*) as a constraint, negative = no cap (see Core_Model.py)
     # default global values to help with numerical issues
     all_cases_dic['NUMERICS_COST_SCALING'] = 1e+12 # multiplies all costs by a factor and then divides at end
     all_cases_dic['NUMERICS_DEMAND_SCALING'] = 1e+12 # multiplies demand by a factor and then divides all costs and capacities at end
+    all_cases_dic['NUMERICS_AUTO_SCALING'] = False # If True, the two scaling factors above are chosen for each case (see Numerics_Scaling.py)
+    all_cases_dic['MODEL_ENGINE'] = 'CVXPY' # CVXPY builds the model with cvxpy (Core_Model.py), DIRECT assembles the sparse LP directly (Direct_Model.py)
+    all_cases_dic['SOLVER'] = 'GUROBI' # LP solver used by the CVXPY engine: GUROBI, HIGHS, CLP, CBC or GLPK (see Solver_Backend.py)
+    all_cases_dic['SOLVER_PROFILE'] = 'BALANCED' # FAST, BALANCED or ACCURATE solver settings (see Solver_Backend.py and the header of the case input file)
+    all_cases_dic['MAX_RETRIES'] = 1 # number of retries after a failed solve, down the fallback ladder in Solver_Backend.py (TIME_LIMIT in seconds, default -1 = none)
+    all_cases_dic['LEAN_FORMULATION'] = False # If True, simple bounds are variable bounds and redundant rows are left out of the LP
+    all_cases_dic['LOOKAHEAD_HOURS'] = 48 # hours after each ROLLING_HORIZON_HOURS window that are solved but not kept (see Rolling_Horizon.py)
+    all_cases_dic['ROLLING_HORIZON_WORKERS'] = 1 # processes that solve the weather years of a rolling horizon case in parallel
+    all_cases_dic['BENDERS_TOLERANCE'] = 1e-3 # relative gap at which a BENDERS_BLOCKS decomposition stops (see Benders.py)
+    all_cases_dic['BENDERS_MAX_ITERATIONS'] = 100 # iterations after which a BENDERS_BLOCKS decomposition stops
+    all_cases_dic['BENDERS_WORKERS'] = 1 # processes that solve the time blocks of a BENDERS_BLOCKS decomposition in parallel
+    all_cases_dic['SCREENING_MARGIN'] = 1e-3 # capacity per kW of mean demand below which SCREENING_DAYS/SCREENING_TIME_STEP_HOURS leave a technology out (see Screening.py)
+    all_cases_dic['TIME_AGGREGATION_CHECK'] = False # If True, cases with REPRESENTATIVE_DAYS > 0 or TIME_STEP_HOURS > 1 are also solved at full resolution to report the error (see Time_Aggregation.py)
+    all_cases_dic['SENSITIVITY_REPORT'] = False # If True, d(system cost)/d(costs, efficiencies, fixed capacities, reliability) are reported from the duals (see Sensitivity.py)
+    all_cases_dic['WEATHER_YEAR_BLOCKS'] = False # If True, storage is cyclic within each weather year: the years share the capacities only (see following_hours in Model_Results.py)
     
 
 
@@ -328,7 +317,7 @@ def preprocess_input(case_input_path_filename):
             setNegToM1[setNegToM1 < 0] = -1
             case_list_dic[input_key] = setNegToM1
         elif input_key in keywords_logical:
-            case_list_dic[input_key] = list(map(bool,input_values))
+            case_list_dic[input_key] = list(map(literal_to_boolean,input_values))
 
     # define all keywords in dictionary, but set to -1 if not present    
     dummy = [-1 for i in range(num_cases)]
@@ -355,62 +344,9 @@ def preprocess_input(case_input_path_filename):
         #if verbose:
         #    print ( 'Preprocess_Input.py:Components for ',case_list_dic['CASE_NAME'][case_index])
         component_list = []
-        if 'FIXED_COST_NUCLEAR' in have_keys:
-            if case_list_dic['FIXED_COST_NUCLEAR'][case_index] >= 0 and case_list_dic['VAR_COST_NUCLEAR'][case_index] >= 0 :
-                component_list.append('NUCLEAR')
-                                                
-        if 'FIXED_COST_NATGAS' in have_keys:
-            if case_list_dic['FIXED_COST_NATGAS'][case_index] >= 0 and case_list_dic['VAR_COST_NATGAS'][case_index] >= 0 :
-                component_list.append('NATGAS')
-                                                
-        if 'FIXED_COST_NATGAS_CCS' in have_keys:
-            if case_list_dic['FIXED_COST_NATGAS_CCS'][case_index] >= 0 and case_list_dic['VAR_COST_NATGAS_CCS'][case_index] >= 0 :
-                component_list.append('NATGAS_CCS')
-                                                
-        if 'FIXED_COST_WIND' in have_keys:
-            if case_list_dic['FIXED_COST_WIND'][case_index] >= 0 and case_list_dic['VAR_COST_WIND'][case_index] >= 0 :
-                component_list.append('WIND')
-                                                
-        if 'FIXED_COST_SOLAR' in have_keys:
-            if case_list_dic['FIXED_COST_SOLAR'][case_index] >= 0 and case_list_dic['VAR_COST_SOLAR'][case_index] >= 0 :
-                component_list.append('SOLAR')
-                                                
-        if 'FIXED_COST_WIND2' in have_keys:
-            if case_list_dic['FIXED_COST_WIND2'][case_index] >= 0 and case_list_dic['VAR_COST_WIND2'][case_index] >= 0 :
-                component_list.append('WIND2')
-                                                
-        if 'FIXED_COST_SOLAR2' in have_keys:
-            if case_list_dic['FIXED_COST_SOLAR2'][case_index] >= 0 and case_list_dic['VAR_COST_SOLAR2'][case_index] >= 0 :
-                component_list.append('SOLAR2')
-                                                
-        if 'FIXED_COST_STORAGE' in have_keys:
-            if (case_list_dic['FIXED_COST_STORAGE'][case_index] >= 0 and case_list_dic['VAR_COST_TO_STORAGE'][case_index] >= 0  and 
-            case_list_dic['VAR_COST_FROM_STORAGE'][case_index] >= 0 and case_list_dic['CHARGING_EFFICIENCY_STORAGE'][case_index] >= 0 and
-            case_list_dic['DECAY_RATE_STORAGE'][case_index] >= 0 and case_list_dic['CHARGING_TIME_STORAGE'][case_index] >= 0) :
-                component_list.append('STORAGE')
-                                                
-        if 'FIXED_COST_STORAGE2' in have_keys:
-            if (case_list_dic['FIXED_COST_STORAGE2'][case_index] >= 0 and case_list_dic['VAR_COST_TO_STORAGE2'][case_index] >= 0  and 
-            case_list_dic['VAR_COST_FROM_STORAGE2'][case_index] >= 0 and case_list_dic['CHARGING_EFFICIENCY_STORAGE2'][case_index] >= 0 and
-            case_list_dic['DECAY_RATE_STORAGE2'][case_index] >= 0 and case_list_dic['CHARGING_TIME_STORAGE2'][case_index] >= 0) :
-                component_list.append('STORAGE2')
-                
-        if 'FIXED_COST_PGP_STORAGE' in have_keys:
-            if (case_list_dic['FIXED_COST_PGP_STORAGE'][case_index] >= 0 and 
-                case_list_dic['FIXED_COST_TO_PGP_STORAGE'][case_index] >= 0 and case_list_dic['VAR_COST_TO_PGP_STORAGE'][case_index] >= 0 and 
-                case_list_dic['FIXED_COST_FROM_PGP_STORAGE'][case_index] >= 0 and case_list_dic['VAR_COST_FROM_PGP_STORAGE'][case_index] >= 0 and 
-                case_list_dic['DECAY_RATE_PGP_STORAGE'][case_index] >= 0 and case_list_dic['CHARGING_EFFICIENCY_PGP_STORAGE'][case_index] >= 0) :
-                component_list.append('PGP_STORAGE')
-                
-        if 'FIXED_COST_CSP' in have_keys:
-            if (case_list_dic['FIXED_COST_CSP'][case_index] >= 0 and case_list_dic['VAR_COST_CSP'][case_index] >= 0 and 
-                case_list_dic['FIXED_COST_CSP_STORAGE'][case_index] >= 0 and case_list_dic['VAR_COST_CSP_STORAGE'][case_index] >= 0 and 
-                case_list_dic['DECAY_RATE_CSP_STORAGE'][case_index] >= 0 and case_list_dic['CHARGING_EFFICIENCY_CSP_STORAGE'][case_index] >= 0):
-                component_list.append('CSP')
-                
-        if 'VAR_COST_UNMET_DEMAND' in have_keys:
-            if case_list_dic['VAR_COST_UNMET_DEMAND'][case_index] >= 0:
-                component_list.append('UNMET_DEMAND')
+        for technology in technology_registry:
+            if all(case_list_dic[key][case_index] >= 0 for key in technology['REQUIRED_KEYS']):
+                component_list.append(technology['NAME'])
                 
         if 'SYSTEM_RELIABILITY' in have_keys:
             if case_list_dic['SYSTEM_RELIABILITY'][case_index] >= 0:
@@ -423,19 +359,18 @@ def preprocess_input(case_input_path_filename):
     case_list_dic['SYSTEM_COMPONENTS'] = list_of_component_lists
 
 #%%    
-    solar_series_list = []
-    wind_series_list = []
-    solar2_series_list = []
-    wind2_series_list = []
     demand_series_list = []
-    csp_series_list = []
+    year_series_list = [] # year of each hour, e.g. for the weather years of Rolling_Horizon.py
+    # capacity factor series, e.g. 'WIND_SERIES' -> list with one series per case
+    series_lists = {technology['SERIES']:[] for technology in technology_registry
+                    if technology['SERIES'] is not None}
 
     for case_index in range(num_cases):
         if verbose:
             print ( 'Preprocess_Input.py: time series for ',case_list_dic['CASE_NAME'][case_index])
                 
         # first read in demand series (which must exist)
-        demand_series_list_item = read_csv_dated_data_file(
+        demand_series_list_item, year_series_list_item = read_csv_dated_data_file(
                     case_list_dic['START_YEAR'][case_index],
                     case_list_dic['START_MONTH'][case_index],
                     case_list_dic['START_DAY'][case_index],
@@ -445,101 +380,21 @@ def preprocess_input(case_input_path_filename):
                     case_list_dic['END_DAY'][case_index],
                     case_list_dic['END_HOUR'][case_index],
                     global_dic['DATA_PATH'],
-                    case_list_dic['DEMAND_FILE'][case_index]
+                    case_list_dic['DEMAND_FILE'][case_index],
+                    with_years = True
                     )
         if case_list_dic['NORMALIZE_DEMAND_TO_ONE'][case_index]:
             demand_series_list_item = demand_series_list_item / np.average(demand_series_list_item)
         demand_series_list.append(demand_series_list_item)
+        year_series_list.append(year_series_list_item)
         
         # check on each technology one by one
 
-        if 'FIXED_COST_SOLAR' in have_keys:
-            if case_list_dic['FIXED_COST_SOLAR'][case_index] >= 0:
-                solar_series_list.append(
-                        read_csv_dated_data_file(
-                                case_list_dic['START_YEAR'][case_index],
-                                case_list_dic['START_MONTH'][case_index],
-                                case_list_dic['START_DAY'][case_index],
-                                case_list_dic['START_HOUR'][case_index],
-                                case_list_dic['END_YEAR'][case_index],
-                                case_list_dic['END_MONTH'][case_index],
-                                case_list_dic['END_DAY'][case_index],
-                                case_list_dic['END_HOUR'][case_index],
-                                global_dic['DATA_PATH'],
-                                case_list_dic['SOLAR_CAPACITY_FILE'][case_index]
-                                )
-                        )
-            else:
-                solar_series_list.append([])
-        else:
-            solar_series_list.append([])
-                        
-        if 'FIXED_COST_WIND' in have_keys:
-            if case_list_dic['FIXED_COST_WIND'][case_index] >= 0:
-                wind_series_list.append(
-                        read_csv_dated_data_file(
-                                case_list_dic['START_YEAR'][case_index],
-                                case_list_dic['START_MONTH'][case_index],
-                                case_list_dic['START_DAY'][case_index],
-                                case_list_dic['START_HOUR'][case_index],
-                                case_list_dic['END_YEAR'][case_index],
-                                case_list_dic['END_MONTH'][case_index],
-                                case_list_dic['END_DAY'][case_index],
-                                case_list_dic['END_HOUR'][case_index],
-                                global_dic['DATA_PATH'],
-                                case_list_dic['WIND_CAPACITY_FILE'][case_index]
-                                )
-                        )
-            else:
-                wind_series_list.append([])
-        else:
-            wind_series_list.append([])
-
-        if 'FIXED_COST_SOLAR2' in have_keys:
-            if case_list_dic['FIXED_COST_SOLAR2'][case_index] >= 0:
-                solar2_series_list.append(
-                        read_csv_dated_data_file(
-                                case_list_dic['START_YEAR'][case_index],
-                                case_list_dic['START_MONTH'][case_index],
-                                case_list_dic['START_DAY'][case_index],
-                                case_list_dic['START_HOUR'][case_index],
-                                case_list_dic['END_YEAR'][case_index],
-                                case_list_dic['END_MONTH'][case_index],
-                                case_list_dic['END_DAY'][case_index],
-                                case_list_dic['END_HOUR'][case_index],
-                                global_dic['DATA_PATH'],
-                                case_list_dic['SOLAR2_CAPACITY_FILE'][case_index]
-                                )
-                        )
-            else:
-                solar2_series_list.append([])
-        else:
-            solar2_series_list.append([])
-                        
-        if 'FIXED_COST_WIND2' in have_keys:
-            if case_list_dic['FIXED_COST_WIND2'][case_index] >= 0:
-                wind2_series_list.append(
-                        read_csv_dated_data_file(
-                                case_list_dic['START_YEAR'][case_index],
-                                case_list_dic['START_MONTH'][case_index],
-                                case_list_dic['START_DAY'][case_index],
-                                case_list_dic['START_HOUR'][case_index],
-                                case_list_dic['END_YEAR'][case_index],
-                                case_list_dic['END_MONTH'][case_index],
-                                case_list_dic['END_DAY'][case_index],
-                                case_list_dic['END_HOUR'][case_index],
-                                global_dic['DATA_PATH'],
-                                case_list_dic['WIND2_CAPACITY_FILE'][case_index]
-                                )
-                        )
-            else:
-                wind2_series_list.append([])
-        else:
-            wind2_series_list.append([])
-                        
-        if 'FIXED_COST_CSP' in have_keys:
-            if case_list_dic['FIXED_COST_CSP'][case_index] >= 0:
-                csp_series_list.append(
+        for technology in technology_registry:
+            if technology['SERIES'] is None:
+                continue
+            if case_list_dic['FIXED_COST_' + technology['NAME']][case_index] >= 0:
+                series_lists[technology['SERIES']].append(
                         read_csv_dated_data_file(
                                 case_list_dic['START_YEAR'][case_index],
                                 case_list_dic['START_MONTH'][case_index],
@@ -550,20 +405,16 @@ def preprocess_input(case_input_path_filename):
                                 case_list_dic['END_DAY'][case_index],
                                 case_list_dic['END_HOUR'][case_index],
                                 global_dic['DATA_PATH'],
-                                case_list_dic['CSP_CAPACITY_FILE'][case_index]
+                                case_list_dic[technology['SERIES_FILE']][case_index]
                                 )
                         )
             else:
-                csp_series_list.append([])
-        else:
-            csp_series_list.append([])
+                series_lists[technology['SERIES']].append([])
     
     case_list_dic['DEMAND_SERIES'] = demand_series_list
-    case_list_dic['WIND_SERIES'] = wind_series_list
-    case_list_dic['SOLAR_SERIES'] = solar_series_list
-    case_list_dic['WIND2_SERIES'] = wind2_series_list
-    case_list_dic['SOLAR2_SERIES'] = solar2_series_list
-    case_list_dic['CSP_SERIES'] = csp_series_list
+    case_list_dic['YEAR_SERIES'] = year_series_list
+    for series_key in series_lists:
+        case_list_dic[series_key] = series_lists[series_key]
     
 #%%
 # update fixed and variable costs to reflect carbon prices
@@ -572,47 +423,10 @@ def preprocess_input(case_input_path_filename):
             
             system_components = case_list_dic['SYSTEM_COMPONENTS'][case_index]
             
-            if 'NUCLEAR' in system_components:
-                case_list_dic['FIXED_COST_NUCLEAR'][case_index] = (case_list_dic['FIXED_COST_NUCLEAR'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_NUCLEAR'][case_index])
-                case_list_dic['VAR_COST_NUCLEAR'][case_index] = (case_list_dic['VAR_COST_NUCLEAR'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_NUCLEAR'][case_index])
-                                                    
-            if 'NATGAS' in system_components:
-                case_list_dic['FIXED_COST_NATGAS'][case_index] = (case_list_dic['FIXED_COST_NATGAS'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_NATGAS'][case_index])
-                case_list_dic['VAR_COST_NATGAS'][case_index] = (case_list_dic['VAR_COST_NATGAS'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_NATGAS'][case_index])
-                                                    
-            if 'NATGAS_CCS' in system_components:
-                case_list_dic['FIXED_COST_NATGAS_CCS'][case_index] = (case_list_dic['FIXED_COST_NATGAS_CCS'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_NATGAS_CCS'][case_index])
-                case_list_dic['VAR_COST_NATGAS_CCS'][case_index] = (case_list_dic['VAR_COST_NATGAS_CCS'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_NATGAS_CCS'][case_index])
-                                                    
-            if 'WIND' in system_components:
-                case_list_dic['FIXED_COST_WIND'][case_index] = (case_list_dic['FIXED_COST_WIND'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_WIND'][case_index])
-                case_list_dic['VAR_COST_WIND'][case_index] = (case_list_dic['VAR_COST_WIND'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_WIND'][case_index])
-                                                    
-            if 'SOLAR' in system_components:
-                case_list_dic['FIXED_COST_SOLAR'][case_index] = (case_list_dic['FIXED_COST_SOLAR'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_SOLAR'][case_index])
-                case_list_dic['VAR_COST_SOLAR'][case_index] = (case_list_dic['VAR_COST_SOLAR'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_SOLAR'][case_index])  
-                                                    
-            if 'WIND2' in system_components:
-                case_list_dic['FIXED_COST_WIND2'][case_index] = (case_list_dic['FIXED_COST_WIND2'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_WIND2'][case_index])
-                case_list_dic['VAR_COST_WIND2'][case_index] = (case_list_dic['VAR_COST_WIND2'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_WIND2'][case_index])
-                                                    
-            if 'SOLAR2' in system_components:
-                case_list_dic['FIXED_COST_SOLAR2'][case_index] = (case_list_dic['FIXED_COST_SOLAR2'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['FIXED_CO2_SOLAR2'][case_index])
-                case_list_dic['VAR_COST_SOLAR2'][case_index] = (case_list_dic['VAR_COST_SOLAR2'][case_index] 
-                        + case_list_dic['CO2_PRICE'][case_index]*case_list_dic['VAR_CO2_SOLAR2'][case_index])  
+            for technology in technologies(system_components = system_components):
+                for cost_key, co2_key in technology['CO2_KEYS'].items():
+                    case_list_dic[cost_key][case_index] = (case_list_dic[cost_key][case_index]
+                            + case_list_dic['CO2_PRICE'][case_index]*case_list_dic[co2_key][case_index])
                                                   
             #  NOTE:  Carbon embodied in STORAGE, PGP_STORAGE or CSP is not considered here !!!
             
@@ -624,5 +438,8 @@ def preprocess_input(case_input_path_filename):
     # of dictionaries.  
     case_dic_list = dict_of_lists_to_list_of_dicts(case_list_dic)
     
+    if global_dic['WORK_QUEUE']:
+        write_queue(global_dic, case_dic_list)
+    
     return global_dic,case_dic_list
             
@@ -81,6 +81,7 @@ from Supporting_Functions import func_load_optimization_results
 from matplotlib.backends.backend_pdf import PdfPages
 
 from Save_Basic_Results import read_pickle_raw_results
+from Technology_Registry import technology_dic, technologies
 
 #%%
 
@@ -111,23 +112,12 @@ def quick_look(global_dic, case_dic_list):
     text_file = open(output_dir + '/' + output_text,'w')
         
     # --------------- define colors for plots --------------------- 
+    # technology colors are in Technology_Registry.py
     color_DEMAND = 'black'
-    color_NATGAS  = 'red' # not explicitly referenced but referenced through eval()
-    color_NATGAS_CCS  = 'brown' # not explicitly referenced but referenced through eval()
-    color_SOLAR   = 'orange' # not explicitly referenced but referenced through eval()
-    color_SOLAR2   = 'orangered' # not explicitly referenced but referenced through eval()
-    color_WIND    = 'blue' # not explicitly referenced but referenced through eval()
-    color_WIND2    = 'darkblue' # not explicitly referenced but referenced through eval()
-    color_NUCLEAR = 'green' # not explicitly referenced but referenced through eval()
-    color_STORAGE = 'purple'
-    color_STORAGE2 = 'violet'
-    color_PGP_STORAGE =  'pink'
     color_CURTAILMENT =  'lightgray'
-    color_UNMET_DEMAND =  'gray' # not explicitly referenced but referenced through eval()
-    color_CSP = 'yellow'
     
     num_cases = len (case_dic_list) # number of cases
-    # 'SYSTEM_COMPONENTS' -- LIST OF COMPONENTS, CHOICES ARE: 'WIND','SOLAR', 'NATGAS','NATGAS_CCS','NUCLEAR','STORAGE', 'PGP_STORAGE', 'UNMET'    
+    # 'SYSTEM_COMPONENTS' -- LIST OF COMPONENTS, CHOICES ARE THE NAMES IN Technology_Registry.py
     # Loop around and make output for individual cases  
     
     # ============= CREATE LIST OF input_data DICTIONARIES FOR PLOTTING PROGRAMS =========
@@ -158,12 +148,10 @@ def quick_look(global_dic, case_dic_list):
         component_index_dispatch = {}
 
         for component in system_components:
-            addfrom = ''
-            if component == 'STORAGE' or component == 'STORAGE2' or component == 'PGP_STORAGE' or component == 'CSP': 
-                addfrom = 'FROM_'
-            results_matrix_dispatch.append(result_dic['DISPATCH_' + addfrom + component ])
-            legend_list_dispatch.append( 'DISPATCH_' + addfrom + component +' kW' )
-            color_list_dispatch.append(eval('color_' + component))
+            dispatch_key = technology_dic[component]['DISPATCH_KEY'] # e.g. DISPATCH_FROM_STORAGE
+            results_matrix_dispatch.append(result_dic[dispatch_key])
+            legend_list_dispatch.append( dispatch_key +' kW' )
+            color_list_dispatch.append(technology_dic[component]['COLOR'])
             component_index_dispatch[component] = len(results_matrix_dispatch)-1 # row index for each component
         
         max_dispatch = np.max([sum(i) for i in zip(*results_matrix_dispatch)])
@@ -191,19 +179,13 @@ def quick_look(global_dic, case_dic_list):
         component_index_demand = {'DEMAND':1}
         
         component_list_storage = []
-        for component in system_components:
-            if component == 'STORAGE':
-                results_matrix_demand.append(result_dic['DISPATCH_TO_STORAGE'])
-                legend_list_demand.append('dispatch to storage (kW)')
-                color_list_demand.append(color_STORAGE)
-                component_index_demand['STORAGE'] = len(results_matrix_demand)-1
-                component_list_storage.append('STORAGE')
-            elif component == 'PGP_STORAGE': 
-                results_matrix_demand.append(result_dic['DISPATCH_TO_PGP_STORAGE'])
-                legend_list_demand.append('dispatch to pgp storage (kW)')
-                color_list_demand.append(color_PGP_STORAGE)
-                component_index_demand['PGP_STORAGE'] = len(results_matrix_demand)-1
-                component_list_storage.append('PGPSTORAGE')
+        for technology in technologies(system_components = system_components):
+            if technology['CHARGE_KEY'] is not None: # storage charged from the grid
+                results_matrix_demand.append(result_dic[technology['CHARGE_KEY']])
+                legend_list_demand.append('dispatch to ' + technology['LABEL'] + ' (kW)')
+                color_list_demand.append(technology['COLOR'])
+                component_index_demand[technology['NAME']] = len(results_matrix_demand)-1
+                component_list_storage.append(technology['NAME'])
         
         input_data['results_matrix_demand'] = np.transpose(np.array(results_matrix_demand))
         input_data['legend_list_demand'] = legend_list_demand
@@ -224,7 +206,7 @@ def quick_look(global_dic, case_dic_list):
         for component in curtailment_dic.keys():
             results_matrix_curtailment.append(curtailment_dic[component])
             legend_list_curtailment.append(component + ' (kW)')
-            color_list_curtailment.append(eval('color_' + component))
+            color_list_curtailment.append(technology_dic[component]['COLOR'])
             component_index_curtailment[component] = len(results_matrix_curtailment)-1
             
         input_data['results_matrix_curtailment'] = np.transpose(np.array(results_matrix_curtailment))
@@ -2436,40 +2418,15 @@ def compute_curtailment(case_dic, result_dic):
     system_components = case_dic['SYSTEM_COMPONENTS']        
     curtailment_dic = {}
     
-    for component in system_components:
-        
-        if component == 'WIND':
-            wind_series = np.array(case_dic['WIND_SERIES'])
-            capacity_wind = np.array(result_dic['CAPACITY_WIND'])
-            dispatch_wind = np.array(result_dic['DISPATCH_WIND'])
-            curtailment_dic['WIND'] = wind_series * capacity_wind - dispatch_wind
-        
-        if component == 'WIND2':
-            wind2_series = np.array(case_dic['WIND2_SERIES'])
-            capacity_wind2 = np.array(result_dic['CAPACITY_WIND2'])
-            dispatch_wind2 = np.array(result_dic['DISPATCH_WIND2'])
-            curtailment_dic['WIND2'] = wind2_series * capacity_wind2 - dispatch_wind2
-        
-        elif component == 'SOLAR':
-            solar_series = np.array(case_dic['SOLAR_SERIES'])
-            capacity_solar = np.array(result_dic['CAPACITY_SOLAR'])
-            dispatch_solar = np.array(result_dic['DISPATCH_SOLAR'])
-            curtailment_dic['SOLAR'] = solar_series * capacity_solar - dispatch_solar
-        
-        elif component == 'SOLAR2':
-            solar2_series = np.array(case_dic['SOLAR2_SERIES'])
-            capacity_solar2 = np.array(result_dic['CAPACITY_SOLAR2'])
-            dispatch_solar2 = np.array(result_dic['DISPATCH_SOLAR2'])
-            curtailment_dic['SOLAR2'] = solar2_series * capacity_solar2 - dispatch_solar2
-            
-        elif component == 'NATGAS':
-            curtailment_dic['NATGAS'] = np.array(result_dic['CAPACITY_NATGAS']) - np.array(result_dic['DISPATCH_NATGAS'])
-            
-        elif component == 'NATGAS_CCS':
-            curtailment_dic['NATGAS_CCS'] = np.array(result_dic['CAPACITY_NATGAS_CCS']) - np.array(result_dic['DISPATCH_NATGAS_CCS'])
-            
-        elif component == 'NUCLEAR':
-            curtailment_dic['NUCLEAR'] = np.array(result_dic['CAPACITY_NUCLEAR']) - np.array(result_dic['DISPATCH_NUCLEAR'])
+    # generation that was available but not dispatched (for natural gas and nuclear,
+    # the unused capacity)
+    for technology in technologies('GENERATOR', system_components):
+        component = technology['NAME']
+        if technology['SERIES'] is None:
+            available = np.array(result_dic['CAPACITY_' + component])
+        else:
+            available = np.array(case_dic[technology['SERIES']]) * np.array(result_dic['CAPACITY_' + component])
+        curtailment_dic[component] = available - np.array(result_dic['DISPATCH_' + component])
         
     return curtailment_dic
                 
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+
+Rolling_Horizon.py
+
+Dispatch of a fixed fleet over many years, in windows.
+
+With ROLLING_HORIZON_HOURS = W (a case keyword, default -1 = off) and every
+capacity of the case given (all CAPACITY_* keywords of its SYSTEM_COMPONENTS
+>= 0), the only coupling across time in core_model is the state of charge of
+storage. <rolling_horizon> then solves the case as a sequence of overlapping
+windows of W + LOOKAHEAD_HOURS hours (default 48) and keeps the first W hours
+of each. The state of charge at the start of hour W of a window is the initial
+state of charge of the next window (ROLLING_WINDOW in Core_Model.py: storage
+is not cyclic in a window). The LP has the size of one window whatever the
+length of the case, and all full-length windows have the same template, so
+they are canonicalized once.
+
+The weather years of the case (YEAR_SERIES) are independent, each starts from
+its own initial state of charge, so they are solved in parallel by
+ROLLING_HORIZON_WORKERS processes (default 1). The results do not depend on
+the number of workers.
+
+Initial state of charge of each year and state of charge at the end of each window:
+
+    With REPRESENTATIVE_DAYS > 0, a representative-day solve of the whole case
+    (see Time_Aggregation.py) gives the seasonal state of charge: each year
+    starts with it, and windows have to end with at least that much in
+    storage. This keeps seasonal storage (PGP_STORAGE) from being emptied at
+    the end of every window. A window that cannot reach that level is solved
+    again without it.
+
+    Otherwise storage is cyclic within each year: the first window of a year
+    starts with the state of charge of a warm-up solve of its hours as one
+    cyclic LP (ending with what it started with), and the last window of the
+    year has to end with at least that much in storage. The other windows may
+    end empty, which is fine for storage that is cycled within
+    LOOKAHEAD_HOURS.
+
+    If the warm-up or a window of a year is infeasible (e.g. a fleet of
+    solar and seasonal storage without UNMET_DEMAND, which cannot get through
+    a window on its own), the year is solved once as one cyclic LP and its
+    windows are solved again with the state of charge of that LP as the plan.
+    Each window can then reach its planned state of charge, as that LP does,
+    so a fleet that is feasible as one LP of the year is feasible in windows;
+    such a year takes the memory of one LP of the year.
+
+The windows are solved with the CVXPY engine. SYSTEM_RELIABILITY applies to
+each window. The results of the windows are joined to one result for all hours
+of the case; SYSTEM_COST is computed from the joined dispatch (system_cost in
+Model_Results.py) and ROLLING_WINDOWS is the number of windows.
+
+"""
+
+import concurrent.futures
+import numpy as np
+
+from Model_Results import capacity_result_keys, component_of_capacity, failed_result, system_cost
+from Time_Aggregation import series_keys, stored_energy_names, aggregate_case, expand_result
+
+#%%
+def all_capacities_fixed(case_dic):
+    return all(case_dic[key] >= 0 for key in capacity_result_keys
+               if component_of_capacity(key) in case_dic['SYSTEM_COMPONENTS'])
+
+def year_segments(case_dic):
+    # [first hour, end hour] of each weather year of the case
+    years = np.asarray(case_dic['YEAR_SERIES'])
+    starts = [0] + list(np.flatnonzero(np.diff(years)) + 1)
+    return list(zip(starts, starts[1:] + [len(years)]))
+
+def slice_case(case_dic, first, end):
+    # <case_dic> for hours first ... end-1
+    sliced_case_dic = dict(case_dic)
+    for key in series_keys(case_dic) + ['YEAR_SERIES']:
+        sliced_case_dic[key] = np.asarray(case_dic[key])[first:end]
+    return sliced_case_dic
+
+def planned_energy(case_dic, plan):
+    # state of charge at the start of each hour of the case and of the hour after it
+    # (name -> series), from the representative-day solve <plan>, else all zero
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    if plan is None:
+        return {name: np.zeros(num_time_periods + 1) for name in stored_energy_names(case_dic)}
+    return {name: np.append(plan['ENERGY_' + name], plan['ENERGY_' + name][0])   # the plan is cyclic
+            for name in stored_energy_names(case_dic)}
+
+def cyclic_energy(solve, global_dic, year_case_dic, energy_plan, end):
+    # [plan, result]: <energy_plan> with the state of charge of the hours before <end> from
+    # the <result> of a solve of them as one cyclic LP, and the state of charge at the end of
+    # the year tied to its start; the plan is None if that LP cannot be solved
+    result = solve(global_dic, slice_case(year_case_dic, 0, end))
+    if result['PROBLEM_STATUS'] != 'optimal':
+        return [None, result]
+    cyclic_plan = {}
+    for name in energy_plan:
+        cyclic_plan[name] = np.array(energy_plan[name], dtype = float)
+        cyclic_plan[name][:end] = result['ENERGY_' + name]
+        cyclic_plan[name][end] = cyclic_plan[name][-1] = result['ENERGY_' + name][0]
+    return [cyclic_plan, result]
+
+#%%
+def solve_year(solve, global_dic, year_case_dic, energy_plan, planned):
+    # Solves the windows of one weather year in turn, returns their results for the hours kept:
+    # from the state of charge <energy_plan> if <planned> (representative days), else of a
+    # warm-up solve of the first window; if that fails, from that of the year as one LP
+    num_time_periods = len(year_case_dic['DEMAND_SERIES'])
+    warm_up_hours = 0
+    plan_results = []
+    if planned:
+        window_results = solve_windows(solve, global_dic, year_case_dic, energy_plan)
+    else:
+        warm_up_hours = min(int(year_case_dic['ROLLING_HORIZON_HOURS']) + max(int(year_case_dic['LOOKAHEAD_HOURS']), 0),
+                            num_time_periods)
+        warm_up_plan, result = cyclic_energy(solve, global_dic, year_case_dic, energy_plan, warm_up_hours)
+        plan_results.append(result)
+        window_results = [result]
+        if warm_up_plan is not None:
+            window_results = solve_windows(solve, global_dic, year_case_dic, warm_up_plan)
+    if window_results[-1]['PROBLEM_STATUS'] != 'optimal' and warm_up_hours < num_time_periods:
+        print ('Rolling_Horizon.py: a year of ',year_case_dic['CASE_NAME'],
+               ' is solved again in windows with the state of charge of the year as one LP')
+        year_plan, result = cyclic_energy(solve, global_dic, year_case_dic, energy_plan, num_time_periods)
+        plan_results.append(result)
+        window_results = [result]
+        if year_plan is not None:
+            window_results = solve_windows(solve, global_dic, year_case_dic, year_plan)
+    if window_results[-1]['PROBLEM_STATUS'] == 'optimal':
+        # the times of the cyclic solves are counted with the first window
+        for key in ['MODEL_BUILD_TIME', 'SOLVE_TIME', 'SOLVE_ITERATIONS']:
+            window_results[0][key] += sum(result[key] for result in plan_results)
+    return window_results
+
+def solve_windows(solve, global_dic, year_case_dic, energy_plan):
+    # Solves the windows of one weather year in turn, from the state of charge <energy_plan>
+    window_hours = int(year_case_dic['ROLLING_HORIZON_HOURS'])
+    lookahead_hours = max(int(year_case_dic['LOOKAHEAD_HOURS']), 0)
+    num_time_periods = len(year_case_dic['DEMAND_SERIES'])
+    energy = {name: energy_plan[name][0] for name in energy_plan}
+    window_results = []
+    for start in range(0, num_time_periods, window_hours):
+        end = min(start + window_hours + lookahead_hours, num_time_periods)
+        kept_hours = min(window_hours, end - start)
+        window_case_dic = dict(slice_case(year_case_dic, start, end), ROLLING_WINDOW = True)
+        for name in energy_plan:
+            window_case_dic['INITIAL_ENERGY_' + name] = energy[name]
+            window_case_dic['TERMINAL_ENERGY_' + name] = energy_plan[name][end]
+        result = solve(global_dic, window_case_dic)
+        if result['PROBLEM_STATUS'] != 'optimal' and any(energy_plan[name][end] > 0 for name in energy_plan):
+            print ('Rolling_Horizon.py: window at hour ',start,' of ',year_case_dic['CASE_NAME'],
+                   ' cannot reach the planned state of charge, solved again without it')
+            for name in energy_plan:
+                window_case_dic['TERMINAL_ENERGY_' + name] = 0.
+            result = solve(global_dic, window_case_dic)
+        if result['PROBLEM_STATUS'] != 'optimal':
+            return window_results + [result]
+        for name in energy_plan:
+            if kept_hours < end - start:
+                energy[name] = result['ENERGY_' + name][kept_hours]
+        for key in result:
+            if isinstance(result[key], np.ndarray) and len(result[key]) == end - start:
+                result[key] = result[key][:kept_hours]
+        window_results.append(result)
+    return window_results
+
+def join_results(case_dic, window_results):
+    # One result for all hours of the case from the results of the windows
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    failed = [result for result in window_results if result['PROBLEM_STATUS'] != 'optimal']
+    if len(failed) > 0:
+        result = dict(failed[0])
+        result.update(failed_result(failed[0]['PROBLEM_STATUS'], num_time_periods))
+    else:
+        result = dict(window_results[0])
+        for key in result:
+            if isinstance(result[key], np.ndarray):
+                result[key] = np.concatenate([window_result[key] for window_result in window_results])
+        result['SYSTEM_COST'] = system_cost(case_dic, result)
+        result['SYSTEM_COST_BOUND'] = -1
+        result['COST_GAP'] = -1
+        result['PRICE_GAP'] = max(window_result['PRICE_GAP'] for window_result in window_results)
+        result['PRICE_VALID'] = all(window_result['PRICE_VALID'] for window_result in window_results)
+    for key in ['MODEL_BUILD_TIME', 'MODEL_BUILD_TIME_SAVED', 'SOLVE_TIME', 'SOLVE_ITERATIONS']:
+        result[key] = sum(window_result[key] for window_result in window_results)
+    for key in ['MODEL_CACHE_HIT', 'NUMERIC_FOCUS_RETRY']:
+        result[key] = any(window_result[key] for window_result in window_results)
+    result['ROLLING_WINDOWS'] = len(window_results)
+    return result
+
+#%%
+def rolling_horizon(global_dic, case_dic, solve):
+    # Result of <case_dic> solved in rolling horizon windows by <solve> (core_model)
+    plan = None
+    if case_dic['REPRESENTATIVE_DAYS'] > 0:
+        aggregated_case_dic = aggregate_case(case_dic)
+        plan = solve(global_dic, aggregated_case_dic)
+        if plan['PROBLEM_STATUS'] == 'optimal':
+            expand_result(case_dic, aggregated_case_dic, plan)
+        else:
+            print ('Rolling_Horizon.py: representative-day solve of ',case_dic['CASE_NAME'],
+                   ' failed, storage is cyclic within each year')
+            plan = None
+    energy_plan = planned_energy(case_dic, plan)
+
+    years = year_segments(case_dic)
+    year_case_dics = [slice_case(case_dic, first, end) for first, end in years]
+    year_energy_plans = [{name: energy_plan[name][first:end + 1] for name in energy_plan} for first, end in years]
+    num_workers = min(int(case_dic['ROLLING_HORIZON_WORKERS']), len(years))
+    if num_workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(num_workers) as pool:
+            year_results = list(pool.map(solve_year, [solve]*len(years), [global_dic]*len(years),
+                                         year_case_dics, year_energy_plans, [plan is not None]*len(years)))
+    else:
+        year_results = [solve_year(solve, global_dic, year_case_dic, year_energy_plan, plan is not None)
+                        for year_case_dic, year_energy_plan in zip(year_case_dics, year_energy_plans)]
+    return join_results(case_dic, [result for results in year_results for result in results])
+
+def no_rolling_horizon():
+    # result entries of a case that is not solved in rolling horizon windows
+    return {
+            'ROLLING_WINDOWS':              -1
+            }
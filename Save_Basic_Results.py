@@ -19,6 +19,9 @@ import datetime
 import contextlib
 import pickle
 from utilities import list_of_dicts_to_dict_of_lists, unique_list_of_lists
+from Technology_Registry import technology_registry
+from Model_Results import system_cost
+from Rolling_Horizon import year_segments, slice_case
 
 
 
@@ -97,18 +100,9 @@ def save_vector_results_as_csv( global_dic, case_dic, result_dic ):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
              
-    if len(case_dic['WIND_SERIES']) == 0:
-        case_dic['WIND_SERIES'] = ( 0.*np.array(case_dic['DEMAND_SERIES'])).tolist()
-    if len(case_dic['SOLAR_SERIES']) == 0:
-        case_dic['SOLAR_SERIES'] = ( 0.*np.array(case_dic['DEMAND_SERIES'])).tolist()
-             
-    if len(case_dic['WIND2_SERIES']) == 0:
-        case_dic['WIND2_SERIES'] = ( 0.*np.array(case_dic['DEMAND_SERIES'])).tolist()
-    if len(case_dic['SOLAR2_SERIES']) == 0:
-        case_dic['SOLAR2_SERIES'] = ( 0.*np.array(case_dic['DEMAND_SERIES'])).tolist()
-    
-    if len(case_dic['CSP_SERIES']) == 0:
-        case_dic['CSP_SERIES'] = ( 0.*np.array(case_dic['DEMAND_SERIES'])).tolist()
+    for technology in technology_registry:
+        if technology['SERIES'] is not None and len(case_dic[technology['SERIES']]) == 0:
+            case_dic[technology['SERIES']] = ( 0.*np.array(case_dic['DEMAND_SERIES'])).tolist()
     
     header_list = []
     series_list = []
@@ -119,105 +113,111 @@ def save_vector_results_as_csv( global_dic, case_dic, result_dic ):
     header_list += ['demand (kW)']
     series_list.append( case_dic['DEMAND_SERIES'] )
     
-    header_list += ['solar capacity factor (-)']
-    series_list.append( np.array(case_dic['SOLAR_SERIES']))    
-    
-    header_list += ['wind capacity factor (-)']
-    series_list.append( np.array(case_dic['WIND_SERIES']))
-
-    header_list += ['solar2 capacity factor (-)']
-    series_list.append( np.array(case_dic['SOLAR2_SERIES']))    
-    
-    header_list += ['wind2 capacity factor (-)']
-    series_list.append( np.array(case_dic['WIND2_SERIES']))
-
-    header_list += ['dispatch natgas (kW)']
-    series_list.append( result_dic['DISPATCH_NATGAS'].flatten() )
-    
-    header_list += ['dispatch natgas ccs (kW)']
-    series_list.append( result_dic['DISPATCH_NATGAS_CCS'].flatten() )
-    
-    header_list += ['dispatch solar (kW)']
-    series_list.append( result_dic['DISPATCH_SOLAR'].flatten() ) 
-    
-    header_list += ['dispatch wind (kW)']
-    series_list.append( result_dic['DISPATCH_WIND'].flatten() )
+    # columns for each technology in Technology_Registry.py
+    for technology in technology_registry:
+        if technology['KIND'] == 'GENERATOR' and technology['SERIES'] is not None:
+            header_list += [technology['LABEL'] + ' capacity factor (-)']
+            series_list.append( np.array(case_dic[technology['SERIES']]))
     
-    header_list += ['dispatch solar2 (kW)']
-    series_list.append( result_dic['DISPATCH_SOLAR2'].flatten() ) 
+    for technology in technology_registry:
+        for header, key in technology['VECTOR_COLUMNS']:
+            header_list += [header]
+            series_list.append( result_dic[key].flatten() )
     
-    header_list += ['dispatch wind2 (kW)']
-    series_list.append( result_dic['DISPATCH_WIND2'].flatten() )
+    for technology in technology_registry:
+        if technology['CURTAILMENT']:
+            header_list += ['curtailment ' + technology['LABEL'] + ' (kW)']
+            series_list.append( result_dic['CURTAILMENT_' + technology['NAME']].flatten() )
     
-    header_list += ['dispatch nuclear (kW)']
-    series_list.append( result_dic['DISPATCH_NUCLEAR'].flatten() )
-    
-    header_list += ['dispatch to storage (kW)']
-    series_list.append( result_dic['DISPATCH_TO_STORAGE'].flatten() )
-    
-    header_list += ['dispatch from storage (kW)']
-    series_list.append( result_dic['DISPATCH_FROM_STORAGE'].flatten() )  # THere is no FROM in dispatch results
-
-    header_list += ['energy storage (kWh)']
-    series_list.append( result_dic['ENERGY_STORAGE'].flatten() )
+    header_list += ['price ($/kWh)']
+    series_list.append( result_dic['PRICE'].flatten() )
+     
+    output_file_name = global_dic['GLOBAL_NAME']+'_'+case_dic['CASE_NAME']
     
-    header_list += ['dispatch to storage2 (kW)']
-    series_list.append( result_dic['DISPATCH_TO_STORAGE2'].flatten() )
+    with contextlib.closing(open(output_folder + "/" + output_file_name + '.csv', 'w',newline='')) as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(header_list)
+        writer.writerows((np.asarray(series_list)).transpose())
+        output_file.close()
+        
+#%%
+# save results by weather year of a case with WEATHER_YEAR_BLOCKS
+def save_year_results( global_dic, case_dic, result_dic ):
     
-    header_list += ['dispatch from storage2 (kW)']
-    series_list.append( result_dic['DISPATCH_FROM_STORAGE2'].flatten() )  # THere is no FROM in dispatch results
+    output_path = global_dic['OUTPUT_PATH']
+    global_name = global_dic['GLOBAL_NAME']
+    output_folder = output_path + '/' + global_name
 
-    header_list += ['energy storage2 (kWh)']
-    series_list.append( result_dic['ENERGY_STORAGE2'].flatten() )
-    
-    header_list += ['dispatch to pgp storage (kW)']
-    series_list.append( result_dic['DISPATCH_TO_PGP_STORAGE'].flatten() )
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
     
-    header_list += ['dispatch pgp storage (kW)']
-    series_list.append( result_dic['DISPATCH_FROM_PGP_STORAGE'].flatten() )
-
-    header_list += ['energy pgp storage (kWh)']
-    series_list.append( result_dic['ENERGY_PGP_STORAGE'].flatten() )
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    header_list = ['year', 'hours', 'mean demand (kW)', 'system cost ($ or $/kWh)']
+    for technology in technology_registry:
+        if technology['NAME'] in case_dic['SYSTEM_COMPONENTS']:
+            header_list += [header for header, key in technology['RESULT_COLUMNS']]
+    header_list += ['mean price ($/kWh)']
+    
+    # one row per weather year; capacities are those of all years, dispatch is the mean of the year
+    rows = []
+    for first, end in year_segments(case_dic):
+        year_case_dic = slice_case(case_dic, first, end)
+        year_result_dic = {}
+        for key in result_dic:
+            res = result_dic[key]
+            if isinstance(res, np.ndarray) and res.shape[-1:] == (num_time_periods,):
+                year_result_dic[key] = res[..., first:end]
+            else:
+                year_result_dic[key] = res
+        row = [case_dic['YEAR_SERIES'][first], end - first, np.mean(year_case_dic['DEMAND_SERIES'])]
+        if result_dic['PROBLEM_STATUS'] != 'optimal':
+            row += [-1]
+        else:
+            row += [system_cost(year_case_dic, year_result_dic)]
+        for technology in technology_registry:
+            if technology['NAME'] in case_dic['SYSTEM_COMPONENTS']:
+                row += [np.mean(year_result_dic[key]) for header, key in technology['RESULT_COLUMNS']]
+        row += [np.mean(year_result_dic['PRICE'])]
+        rows.append(row)
+     
+    output_file_name = global_dic['GLOBAL_NAME']+'_'+case_dic['CASE_NAME']+'_years'
     
-    header_list += ['dispatch to csp storage (kW)']
-    series_list.append( result_dic['DISPATCH_TO_CSP_STORAGE'].flatten() )  # THere is no FROM in dispatch results
+    with contextlib.closing(open(output_folder + "/" + output_file_name + '.csv', 'w',newline='')) as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(header_list)
+        writer.writerows(rows)
+        output_file.close()
+        
+#%%
+# save the exact path of a sweep of one cost parameter (see Parametric_Sweep.py)
+def save_parametric_path( global_dic, case_dic, parameter, path ):
     
-    header_list += ['dispatch from csp storage (kW)']
-    series_list.append( result_dic['DISPATCH_FROM_CSP'].flatten() )  # THere is no FROM in dispatch results
+    output_path = global_dic['OUTPUT_PATH']
+    global_name = global_dic['GLOBAL_NAME']
+    output_folder = output_path + '/' + global_name
 
-    header_list += ['energy csp storage (kWh)']
-    series_list.append( result_dic['ENERGY_CSP_STORAGE'].flatten() )
-    
-    header_list += ['dispatch unmet demand (kW)']
-    series_list.append( result_dic['DISPATCH_UNMET_DEMAND'].flatten() )
-    
-    header_list += ['cutailment solar (kW)']
-    series_list.append( result_dic['CURTAILMENT_SOLAR'].flatten() )
-    
-    header_list += ['cutailment wind (kW)']
-    series_list.append( result_dic['CURTAILMENT_WIND'].flatten() )
-    
-    header_list += ['cutailment solar2 (kW)']
-    series_list.append( result_dic['CURTAILMENT_SOLAR2'].flatten() )
-    
-    header_list += ['cutailment wind2 (kW)']
-    series_list.append( result_dic['CURTAILMENT_WIND2'].flatten() )
-    
-    header_list += ['cutailment csp (kW)']
-    series_list.append( result_dic['CURTAILMENT_CSP'].flatten() )
-    
-    header_list += ['cutailment nuclear (kW)']
-    series_list.append( result_dic['CURTAILMENT_NUCLEAR'].flatten() )
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
     
-    header_list += ['price ($/kWh)']
-    series_list.append( result_dic['PRICE'].flatten() )
+    capacity_columns = []
+    for technology in technology_registry:
+        if technology['NAME'] in case_dic['SYSTEM_COMPONENTS']:
+            capacity_columns += [[header, key] for header, key in technology['RESULT_COLUMNS']
+                                 if key in technology['CAPACITY_KEYS']]
+    header_list = [parameter + ' from', parameter + ' to', 'system cost from ($ or $/kWh)', 'system cost to ($ or $/kWh)']
+    header_list += [header for header, key in capacity_columns]
+    
+    # one row per piece of the path: the capacities are the same from one breakpoint to the next
+    rows = []
+    for value_from, value_to, cost_from, cost_to, result_dic in path:
+        rows.append([value_from, value_to, cost_from, cost_to] + [result_dic[key] for header, key in capacity_columns])
      
-    output_file_name = global_dic['GLOBAL_NAME']+'_'+case_dic['CASE_NAME']
+    output_file_name = global_dic['GLOBAL_NAME']+'_path_'+case_dic['CASE_NAME']
     
     with contextlib.closing(open(output_folder + "/" + output_file_name + '.csv', 'w',newline='')) as output_file:
         writer = csv.writer(output_file)
         writer.writerow(header_list)
-        writer.writerows((np.asarray(series_list)).transpose())
+        writer.writerows(rows)
         output_file.close()
         
 #%%
@@ -276,6 +276,9 @@ def save_basic_results( global_dic, case_dic_list ):
     header_list += ['CO2 price ($/kgCO2)']
     series_list.append( case_list_dic['CO2_PRICE'])
 
+    header_list += ['CO2 cap (kgCO2/h)']
+    series_list.append( case_list_dic['CO2_CAP'])
+
     # Demand
     
     header_list += ['norm. demand to 1']
@@ -287,173 +290,12 @@ def save_basic_results( global_dic, case_dic_list ):
     header_list += ['mean demand (kW)']
     series_list.append(case_list_dic['DEMAND_SERIES'])
     
-    # Input: NATGAS
-    if 'NATGAS' in components:
-        header_list += ['fixed cost natgas ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_NATGAS'])
-    
-        header_list += ['var cost natgas ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_NATGAS'])
-
-    # Input: NATGAS_CCS
-    if 'NATGAS_CCS' in components:
-        header_list += ['fixed cost natgas_ccs ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_NATGAS_CCS'])
-    
-        header_list += ['var cost natgas_ccs ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_NATGAS_CCS'])
-   
-    # Input: SOLAR
-    if 'SOLAR' in components: 
-        header_list += ['fixed cost solar ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_SOLAR'])
-     
-        header_list += ['var cost solar ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_SOLAR'])
-    
-        header_list += ['solar file']
-        series_list.append(case_list_dic['SOLAR_CAPACITY_FILE'])
-    
-        header_list += ['cap factor solar (-)']
-        series_list.append( case_list_dic['SOLAR_SERIES'])
-    
-    # Input: SOLAR2
-    if 'SOLAR2' in components: 
-        header_list += ['fixed cost solar2 ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_SOLAR2'])
-    
-        header_list += ['var cost solar2 ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_SOLAR2'])
-    
-        header_list += ['solar2 file']
-        series_list.append(case_list_dic['SOLAR2_CAPACITY_FILE'])
-        
-        header_list += ['cap factor solar2 (-)']
-        series_list.append( case_list_dic['SOLAR2_SERIES'])
-
-    # Input: WIND
-    if 'WIND' in components: 
-        header_list += ['fixed cost wind ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_WIND'])
-    
-        header_list += ['var cost wind ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_WIND'] )
-    
-        header_list += ['wind file']
-        series_list.append(case_list_dic['WIND_CAPACITY_FILE'])
-    
-        header_list += ['cap factor wind (-)']
-        series_list.append(case_list_dic['WIND_SERIES'])
-    
-    # Input: WIND2
-    if 'WIND2' in components: 
-        header_list += ['fixed cost wind2 ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_WIND2'])
-    
-        header_list += ['var cost wind2 ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_WIND2'] )
-    
-        header_list += ['wind2 file']
-        series_list.append(case_list_dic['WIND2_CAPACITY_FILE'])
-    
-        header_list += ['cap factor wind2 (-)']
-        series_list.append( case_list_dic['WIND2_SERIES'])
-    
-    # Input: NUCLEAR
-    if 'NUCLEAR' in components: 
-        header_list += ['fixed cost nuclear ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_NUCLEAR'] )
-    
-        header_list += ['var cost nuclear ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_NUCLEAR'] )
-
-    # Input: STORAGE
-    if 'STORAGE' in components: 
-        header_list += ['fixed cost storage ($/kWh/h)']
-        series_list.append( case_list_dic['FIXED_COST_STORAGE'])
-    
-        header_list += ['var cost storage ($/kWh/h)']
-        series_list.append( case_list_dic['VAR_COST_STORAGE'] )
-    
-        header_list += ['storage charging efficiency']
-        series_list.append( case_list_dic['CHARGING_EFFICIENCY_STORAGE'])
-    
-        header_list += ['storage charging time (h)']
-        series_list.append( case_list_dic['CHARGING_TIME_STORAGE'] )
-    
-        header_list += ['storage decay rate (1/h))']
-        series_list.append( case_list_dic['DECAY_RATE_STORAGE'] )
-    
-    # Input: STORAGE2
-    if 'STORAGE2' in components: 
-        header_list += ['fixed cost storage2 ($/kWh/h)']
-        series_list.append( case_list_dic['FIXED_COST_STORAGE2'])
-    
-        header_list += ['var cost storage2 ($/kWh/h)']
-        series_list.append( case_list_dic['VAR_COST_STORAGE2'])
-    
-        header_list += ['storage2 charging efficiency']
-        series_list.append( case_list_dic['CHARGING_EFFICIENCY_STORAGE2'])
-    
-        header_list += ['storage2 charging time (h)']
-        series_list.append( case_list_dic['CHARGING_TIME_STORAGE2'])
-    
-        header_list += ['storage2 decay rate (1/h))']
-        series_list.append( case_list_dic['DECAY_RATE_STORAGE2'] )
-
-    # Input: PGP_STORAGE
-    if 'PGP_STORAGE' in components: 
-        header_list += ['fixed cost pgp storage ($/kWh/h)']
-        series_list.append( case_list_dic['FIXED_COST_PGP_STORAGE'] )
-    
-        header_list += ['fixed cost to pgp storage ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_TO_PGP_STORAGE'])
-    
-        header_list += ['fixed cost from pgp storage ($/kW/h)']
-        series_list.append ( case_list_dic['FIXED_COST_FROM_PGP_STORAGE'])
-    
-        header_list += ['var cost to pgp storage ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_TO_PGP_STORAGE'])
-    
-        header_list += ['var cost from pgp storage ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_FROM_PGP_STORAGE'])
-    
-        header_list += ['pgp storage charging efficiency']
-        series_list.append( case_list_dic['CHARGING_EFFICIENCY_PGP_STORAGE'])
-    
-        header_list += ['pgp storage decay rate (1/h))']
-        series_list.append( case_list_dic['DECAY_RATE_PGP_STORAGE'])
-    
-    # Input: CSP
-    if 'CSP' in components: 
-        header_list += ['fixed cost csp ($/kW/h)']
-        series_list.append( case_list_dic['FIXED_COST_CSP'])
-    
-        header_list += ['var cost csp ($/kW/h)']
-        series_list.append( case_list_dic['VAR_COST_CSP'])
-    
-        header_list += ['fixed cost csp storage ($/kWh/h)']
-        series_list.append( case_list_dic['FIXED_COST_CSP_STORAGE'])
-        
-        header_list += ['var cost csp storage ($/kWh/h)']
-        series_list.append( case_list_dic['VAR_COST_CSP_STORAGE'])
-        
-        header_list += ['csp charging efficiency']
-        series_list.append( case_list_dic['CHARGING_EFFICIENCY_CSP_STORAGE'])
-    
-        header_list += ['csp storage decay rate (1/h))']
-        series_list.append( case_list_dic['DECAY_RATE_CSP_STORAGE'])
-    
-        header_list += ['csp file']
-        series_list.append(case_list_dic['CSP_CAPACITY_FILE'])
-        
-        header_list += ['cap factor csp (-)']
-        series_list.append(case_list_dic['CSP_SERIES'])
-          
-    # Input: UNMET_DEMAND
-    if 'UNMET_DEMAND' in components: 
-        header_list += ['var cost unmet demand ($/kWh)']
-        series_list.append( case_list_dic['VAR_COST_UNMET_DEMAND'])
+    # Input: costs, efficiencies, capacity factors etc. of each technology (see Technology_Registry.py)
+    for technology in technology_registry:
+        if technology['NAME'] in components:
+            for header, key in technology['INPUT_COLUMNS']:
+                header_list += [header]
+                series_list.append( case_list_dic[key])
 
     #==========================================================================
     # OUTPUT VARIABLES
@@ -463,149 +305,18 @@ def save_basic_results( global_dic, case_dic_list ):
     header_list += ['system cost ($ or $/kWh)']
     series_list.append( case_list_dic['SYSTEM_COST'])
 
-    # Results: NATGAS
-    if 'NATGAS' in components: 
-        header_list += ['capacity natgas (kW)']
-        series_list.append( case_list_dic['CAPACITY_NATGAS'])
-    
-        header_list += ['dispatch natgas (kW)']
-        series_list.append( case_list_dic['DISPATCH_NATGAS'])
-    
-    # Results: NATGAS_CCS
-    if 'NATGAS_CCS' in components: 
-        header_list += ['capacity natgas_ccs (kW)']
-        series_list.append( case_list_dic['CAPACITY_NATGAS_CCS'])
-    
-        header_list += ['dispatch natgas ccs (kW)']
-        series_list.append( case_list_dic['DISPATCH_NATGAS_CCS'])
-    
-    # Results: SOLAR
-    if 'SOLAR' in components: 
-        header_list += ['capacity solar (kW)']
-        series_list.append(  case_list_dic['CAPACITY_SOLAR'])
-    
-        header_list += ['dispatch solar (kW)']
-        series_list.append( case_list_dic['DISPATCH_SOLAR'])
-    
-        header_list += ['curtailment solar (kW)']
-        series_list.append( case_list_dic['CURTAILMENT_SOLAR'])
-    
-    # Results: SOLAR2
-    if 'SOLAR2' in components: 
-        header_list += ['capacity solar2 (kW)']
-        series_list.append(  case_list_dic['CAPACITY_SOLAR2'])
-    
-        header_list += ['dispatch solar2 (kW)']
-        series_list.append( case_list_dic['DISPATCH_SOLAR2'])
-    
-        header_list += ['curtailment solar2 (kW)']
-        series_list.append( case_list_dic['CURTAILMENT_SOLAR2'])
-    
-    # Results: WIND
-    if 'WIND' in components: 
-        header_list += ['capacity wind (kW)']
-        series_list.append(  case_list_dic['CAPACITY_WIND'])
-    
-        header_list += ['dispatch wind (kW)']
-        series_list.append( case_list_dic['DISPATCH_WIND'])
-    
-        header_list += ['curtailment wind (kW)']
-        series_list.append( case_list_dic['CURTAILMENT_WIND'])
-    
-    # Results: WIND2
-    if 'WIND2' in components: 
-        header_list += ['capacity wind2 (kW)']
-        series_list.append(  case_list_dic['CAPACITY_WIND2'])
-    
-        header_list += ['dispatch wind2 (kW)']
-        series_list.append( case_list_dic['DISPATCH_WIND2'])
-    
-        header_list += ['curtailment wind2 (kW)']
-        series_list.append( case_list_dic['CURTAILMENT_WIND2'])
-    
-    # Results: NUCLEAR
-    if 'NUCLEAR' in components: 
-        header_list += ['capacity nuclear (kW)']
-        series_list.append(  case_list_dic['CAPACITY_NUCLEAR'])
-    
-        header_list += ['dispatch nuclear (kW)']
-        series_list.append( case_list_dic['DISPATCH_NUCLEAR'])
-    
-        header_list += ['curtailment nuclear (kW)']
-        series_list.append( case_list_dic['CURTAILMENT_NUCLEAR'])
-    
-    # Results: STORAGE
-    if 'STORAGE' in components: 
-        header_list += ['capacity storage (kW)']
-        series_list.append(  case_list_dic['CAPACITY_STORAGE'])
-    
-        header_list += ['energy storage (kW)']
-        series_list.append( case_list_dic['ENERGY_STORAGE'])
-    
-        header_list += ['dispatch to storage (kW)']
-        series_list.append( case_list_dic['DISPATCH_TO_STORAGE'])
-    
-        header_list += ['dispatch from storage (kW)']
-        series_list.append( case_list_dic['DISPATCH_FROM_STORAGE'])
-    
-    # Results: STORAGE2
-    if 'STORAGE2' in components: 
-        header_list += ['capacity storage2 (kW)']
-        series_list.append(  case_list_dic['CAPACITY_STORAGE2'])
-    
-        header_list += ['energy storage2 (kW)']
-        series_list.append( case_list_dic['ENERGY_STORAGE2'])
-    
-        header_list += ['dispatch to storage2 (kW)']
-        series_list.append( case_list_dic['DISPATCH_TO_STORAGE2'])
-    
-        header_list += ['dispatch from storage2 (kW)']
-        series_list.append( case_list_dic['DISPATCH_FROM_STORAGE2'])
-   
-    # Results: PGP STORAGE
-    if 'PGP_STORAGE' in components: 
-        header_list += ['capacity pgp storage (kW)']
-        series_list.append(  case_list_dic['CAPACITY_PGP_STORAGE'])
-       
-        header_list += ['capacity to pgp storage (kW)']
-        series_list.append(  case_list_dic['CAPACITY_TO_PGP_STORAGE'])
-       
-        header_list += ['capacity from pgp storage (kW)']
-        series_list.append(  case_list_dic['CAPACITY_FROM_PGP_STORAGE'])
-    
-        header_list += ['energy pgp storage (kW)']
-        series_list.append( case_list_dic['ENERGY_PGP_STORAGE'])
-    
-        header_list += ['dispatch to pgp storage (kW)']
-        series_list.append( case_list_dic['DISPATCH_TO_PGP_STORAGE'])
-    
-        header_list += ['dispatch from pgp storage (kW)']
-        series_list.append( case_list_dic['DISPATCH_FROM_PGP_STORAGE'])
-   
-    # Results: CSP
-    if 'CSP' in components: 
-        header_list += ['capacity csp (kW)']
-        series_list.append( case_list_dic['CAPACITY_CSP'])
-       
-        header_list += ['capacity csp storage (kW)']
-        series_list.append( case_list_dic['CAPACITY_CSP_STORAGE'])
-    
-        header_list += ['energy csp storage (kW)']
-        series_list.append( case_list_dic['ENERGY_CSP_STORAGE'])
-    
-        header_list += ['dispatch to csp storage (kW)']
-        series_list.append( case_list_dic['DISPATCH_TO_CSP_STORAGE'])
-    
-        header_list += ['dispatch from csp (kW)']
-        series_list.append( case_list_dic['DISPATCH_FROM_CSP'])
-    
-        header_list += ['curtailment csp (kW)']
-        series_list.append( case_list_dic['CURTAILMENT_CSP'])
+    header_list += ['CO2 emissions (kgCO2/h)']
+    series_list.append( case_list_dic['CO2_EMISSIONS'])
 
-    #Results: UNMET_DEMAND   
-    if 'UNMET_DEMAND' in components: 
-        header_list += ['dispatch unmet demand (kW)']
-        series_list.append( case_list_dic['DISPATCH_UNMET_DEMAND'])
+    header_list += ['CO2 cap price ($/kgCO2)']
+    series_list.append( case_list_dic['CO2_CAP_PRICE'])
+
+    # Results: capacities, dispatch and curtailment of each technology
+    for technology in technology_registry:
+        if technology['NAME'] in components:
+            for header, key in technology['RESULT_COLUMNS']:
+                header_list += [header]
+                series_list.append( case_list_dic[key])
 
     #=========================================================================
     # set missing vector means to zero
@@ -616,8 +327,16 @@ def save_basic_results( global_dic, case_dic_list ):
             sl = np.array(series_list[i])
             sl[np.isnan(sl)] = 0
             series_list[i] = sl.tolist()
+
+    # Marginal values d(SYSTEM_COST)/d(keyword) (see Sensitivity.py), left NaN
+    # where a case has none
+    sensitivity_keys = []
+    for sensitivity in case_list_dic['SENSITIVITY']:
+        sensitivity_keys += [key for key in sensitivity if key not in sensitivity_keys]
+    for key in sensitivity_keys:
+        header_list += ['d system cost / d ' + key]
+        series_list.append([sensitivity.get(key, np.nan) for sensitivity in case_list_dic['SENSITIVITY']])
         
-    
     output_array = np.array(series_list).T.tolist()
     output_array.insert(0,header_list)    
     output_array = np.array(output_array).T.tolist()
@@ -642,3 +361,110 @@ def save_basic_results( global_dic, case_dic_list ):
     if verbose: 
         print ( 'file written: ' + output_file_name + '.csv')
 
+
+#%%
+# save run statistics (model build and solve times) for all cases
+def save_run_summary( global_dic, case_dic_list ):
+    
+    verbose = global_dic['VERBOSE']
+    
+    header_list = ['case name','problem status','model engine','solver','solver profile','solve order','template cache hit',
+                   'model build time (s)','build time saved (s)','solve time (s)',
+                   'warm start','solver iterations','iterations vs. first cold solve','solve time vs. first cold solve (s)',
+                   'predicted time (s)',
+                   'predicted memory (GB)',
+                   'rows','columns','nonzeros','full model rows','full model nonzeros',
+                   'cost scaling','demand scaling','matrix min','matrix max',
+                   'time step (h)','representative days','series error','cost error','capacity error','rolling windows','benders iterations',
+                   'screened out','screening check','path parameter','path solves','path breakpoints',
+                   'adaptive solved','adaptive solves',
+                   'solve attempts','system cost bound','cost gap','price gap','price valid',
+                   'retried']
+    keys = ['SOLVE_ORDER','MODEL_CACHE_HIT','MODEL_BUILD_TIME','MODEL_BUILD_TIME_SAVED','SOLVE_TIME',
+            'WARM_START','SOLVE_ITERATIONS','ITERATIONS_VS_FIRST_SOLVE','SOLVE_TIME_VS_FIRST_SOLVE','PREDICTED_TIME',
+            'PREDICTED_MEMORY']
+    rows = []
+    for case_dic in case_dic_list:
+        result_dic = read_pickle_raw_results(global_dic, case_dic)
+        rows.append([case_dic['CASE_NAME'], result_dic['PROBLEM_STATUS'], case_dic['MODEL_ENGINE'],
+                     result_dic['SOLVER'], result_dic['SOLVER_PROFILE']] + [result_dic[key] for key in keys] +
+                    result_dic['MODEL_SIZE'] + [result_dic['FULL_MODEL_SIZE'][0], result_dic['FULL_MODEL_SIZE'][2]] +
+                    [result_dic['NUMERICS_COST_SCALING'], result_dic['NUMERICS_DEMAND_SCALING']] +
+                    result_dic['MATRIX_RANGE'] +
+                    [result_dic['TIME_STEP_HOURS'], result_dic['REPRESENTATIVE_DAYS'], result_dic['AGGREGATION_SERIES_ERROR'],
+                     result_dic['AGGREGATION_COST_ERROR'], result_dic['AGGREGATION_CAPACITY_ERROR'], result_dic['ROLLING_WINDOWS'],
+                     result_dic['BENDERS_ITERATIONS'], result_dic['SCREENED_OUT'], result_dic['SCREENING_CHECK'],
+                     result_dic['PATH_PARAMETER'], result_dic['PATH_SOLVES'], result_dic['PATH_BREAKPOINTS'],
+                     result_dic['ADAPTIVE_SOLVED'], result_dic['ADAPTIVE_SOLVES']] +
+                    [result_dic['SOLVE_ATTEMPTS'], result_dic['SYSTEM_COST_BOUND'], result_dic['COST_GAP'],
+                     result_dic['PRICE_GAP'], result_dic['PRICE_VALID'], result_dic['NUMERIC_FOCUS_RETRY']])
+    column = dict(zip(keys, zip(*[row[5:] for row in rows])))
+    num_retries = sum(row[-1] for row in rows)
+    num_invalid_prices = sum(not row[-2] for row in rows)
+    num_time_limits = sum(row[1] == 'user_limit' for row in rows)
+    num_reordered_cold = sum(str.upper(row[2]) != 'DIRECT' for row in rows) if global_dic['SWEEP_WARM_START'] else 0
+    # wall time of each case: model build and solve
+    wall_times = np.array(column['MODEL_BUILD_TIME']) + np.array(column['SOLVE_TIME'])
+    # factor by which the predicted times (see Scheduler.py) are off, of the cases that were solved
+    solved = wall_times > 0
+    prediction_errors = np.exp(np.abs(np.log(wall_times[solved] / np.array(column['PREDICTED_TIME'])[solved])))
+    
+    num_cases = len(rows)
+    num_hits = sum(column['MODEL_CACHE_HIT'])
+    hit_rate = num_hits / max(num_cases, 1)
+    total_time_saved = sum(column['MODEL_BUILD_TIME_SAVED'])
+    
+    summary_rows = [
+            ['template cache hits', num_hits],
+            ['template cache hit rate', hit_rate],
+            ['total model build time (s)', sum(column['MODEL_BUILD_TIME'])],
+            ['total build time saved (s)', total_time_saved],
+            ['total solve time (s)', sum(column['SOLVE_TIME'])],
+            ['max solve time (s)', max(column['SOLVE_TIME'])],
+            ['wall time p50 (s)', np.percentile(wall_times, 50)],
+            ['wall time p95 (s)', np.percentile(wall_times, 95)],
+            ['wall time max (s)', np.max(wall_times)],
+            ['predicted time off by, median factor', np.median(prediction_errors) if np.any(solved) else np.nan],
+            ['cases retried', num_retries],
+            ['cases stopped at the time limit', num_time_limits],
+            ['cases with inaccurate PRICE', num_invalid_prices],
+            # only the DIRECT engine warm starts, CVXPY cases of a sweep are reordered and solved cold
+            ['warm started cases (DIRECT engine only)', sum(column['WARM_START'])],
+            ['cases reordered but solved cold (CVXPY engine)', num_reordered_cold],
+            # vs. the first (cold) solve of each chain of a template, not vs. a cold solve of the same case
+            ['total iterations vs. first cold solve of chain', sum(column['ITERATIONS_VS_FIRST_SOLVE'])],
+            ['total solve time vs. first cold solve of chain (s)', sum(column['SOLVE_TIME_VS_FIRST_SOLVE'])]
+            ]
+    
+    output_path = global_dic['OUTPUT_PATH']
+    global_name = global_dic['GLOBAL_NAME']
+    output_folder = output_path + "/" + global_name
+    output_file_name = global_name + '_run_summary'
+    
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    
+    with contextlib.closing(open(output_folder + "/" + output_file_name + '.csv', 'w',newline='')) as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(header_list)
+        writer.writerows(rows)
+        writer.writerow([])
+        writer.writerows(summary_rows)
+        output_file.close()
+        
+    if verbose: 
+        print ( 'template cache hit rate: %.2f (%d of %d cases), build time saved: %.2f s' %
+               (hit_rate, num_hits, num_cases, total_time_saved) )
+        if sum(column['WARM_START']) > 0:
+            print ( 'warm started %d cases (DIRECT engine only), %d iterations and %.2f s solve time fewer than'
+                   ' the first cold solve of their chains' %
+                   (sum(column['WARM_START']), sum(column['ITERATIONS_VS_FIRST_SOLVE']),
+                    sum(column['SOLVE_TIME_VS_FIRST_SOLVE'])) )
+        if num_reordered_cold > 0:
+            print ( '%d CVXPY cases were reordered for the sweep but solved cold (no warm start)' % num_reordered_cold )
+        print ( 'cases retried: %d, max solve time: %.2f s' % (num_retries, max(column['SOLVE_TIME'])) )
+        print ( 'wall time per case p50: %.2f s, p95: %.2f s, max: %.2f s, %d cases stopped at the time limit' %
+               (np.percentile(wall_times, 50), np.percentile(wall_times, 95), np.max(wall_times), num_time_limits) )
+        if num_invalid_prices > 0:
+            print ( 'PRICE is not accurate (or not solved) for %d cases, see the price gap column' % num_invalid_prices )
+        print ( 'file written: ' + output_file_name + '.csv')
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+
+Scheduler.py
+
+Predicted solve time and memory of a case, so that parallel runs start the
+long cases first (longest processing time first) and do not run out of memory.
+
+With many cases and few workers, a run takes as long as its last case to
+finish. If the longest cases are dispatched first, the short ones fill the
+gaps at the end, so core_model_loop (WORKERS > 1) and the workers of the work
+queue (WORK_QUEUE, see Work_Queue.py) take cases in the order of their
+predicted time, longest first. The serial loop keeps the case order.
+
+The predicted time (model build and solve, seconds) is
+
+    log(time) = w0 + w1 * log(time periods) + w2 * storage technologies
+                   + w3 * free capacities
+
+with the time periods of the LP (REPRESENTATIVE_DAYS, TIME_STEP_HOURS), the
+technologies of the case that store energy and the capacities that are
+optimized (CAPACITY_* < 0). The weights are fitted (least squares, with
+prior_weights below as prior) to the times of the cases solved before, which
+each solve appends to OUTPUT_PATH/solve_time_history.csv with the predicted
+time, so the predictions get better with every run. A process fits the
+weights once, at its first prediction.
+
+Each result has the prediction as PREDICTED_TIME, and the run summary
+compares it with the time the case took.
+
+The predicted peak memory of a process that solves a case is
+
+    process_memory_gb + reference_memory_gb * (size / reference_size)**1.5
+
+where size is the number of constraints plus variables of its LP, counted
+from its technologies and time periods (<model_counts>). Canonicalization
+and solve take more memory per row for large LPs: with cvxpy and HiGHS, the
+LP of a year of hours with all technologies (about 590,000 rows and columns)
+took 2.4 GB more than the process before, one of 2000 hours 0.15 GB. With
+MEMORY_BUDGET_GB > 0 (global section of the case input file), core_model_loop
+starts a case only while the predicted memory of the cases being solved
+stays within the budget, and a case that alone needs more than the budget
+is solved by itself, when all others are done.
+
+"""
+
+import csv
+import datetime
+import io
+import os
+import numpy as np
+
+from Model_Results import free_capacity_keys
+from Technology_Registry import technologies
+
+history_header = ['date','global name','case name','model engine','solver',
+                  'time periods','storage technologies','free capacities',
+                  'predicted time (s)','time (s)']
+
+prior_weights = np.array([-8.7, 1.2, 0.5, 0.15])    # about a minute for a year of hours with two storage technologies
+prior_strength = 1.     # weight of the prior in the fit, in cases
+
+cost_models = {}        # history file -> fitted weights, in this process
+
+process_memory_gb = 0.15        # a worker with the model code loaded
+reference_size = 590000         # rows + columns of the LP that took ...
+reference_memory_gb = 2.4       # ... this much memory to build and solve
+memory_exponent = 1.5
+
+#%%
+def case_features(case_dic):
+    # [time periods, storage technologies, free capacities] of <case_dic>
+    num_time_periods = len(case_dic['DEMAND_SERIES']) / max(case_dic['TIME_STEP_HOURS'], 1)
+    if case_dic['REPRESENTATIVE_DAYS'] > 0:
+        num_time_periods = min(num_time_periods, 24 * case_dic['REPRESENTATIVE_DAYS'])
+    num_storage = len([technology for technology in technologies(system_components = case_dic['SYSTEM_COMPONENTS'])
+                       if technology['STORAGE']])
+    return [num_time_periods, num_storage, len(free_capacity_keys(case_dic))]
+
+def feature_vector(features):
+    num_time_periods, num_storage, num_free = features
+    return np.array([1., np.log(max(num_time_periods, 1)), num_storage, num_free])
+
+#%%
+def history_file(global_dic):
+    return global_dic['OUTPUT_PATH'] + '/solve_time_history.csv'
+
+def fit_weights(rows):
+    # weights of the cost model for the history <rows>
+    # (ridge regression of log time, towards prior_weights)
+    x = np.array([feature_vector(row[:3]) for row in rows]).reshape(-1, len(prior_weights))
+    y = np.log(np.array([row[3] for row in rows]))
+    matrix = x.T.dot(x) + prior_strength * np.eye(len(prior_weights))
+    return np.linalg.solve(matrix, x.T.dot(y) + prior_strength * prior_weights)
+
+def cost_model(global_dic):
+    # the weights fitted to the solve time history of this OUTPUT_PATH
+    file_name = history_file(global_dic)
+    if file_name not in cost_models:
+        rows = []
+        if os.path.exists(file_name):
+            with open(file_name, newline = '') as history:
+                for row in csv.DictReader(history):
+                    try:
+                        rows.append([float(row[key]) for key in
+                                     ['time periods','storage technologies','free capacities','time (s)']])
+                    except (KeyError, TypeError, ValueError):
+                        continue    # a line cut off by a worker that died
+        rows = [row for row in rows if row[3] > 0]
+        cost_models[file_name] = fit_weights(rows)
+        if global_dic['VERBOSE']:
+            print ('Scheduler.py: solve time model fitted to ',len(rows),' past cases, weights ',cost_models[file_name])
+    return cost_models[file_name]
+
+def predicted_time(global_dic, case_dic):
+    # predicted model build and solve time of <case_dic>, seconds
+    return float(np.exp(cost_model(global_dic).dot(feature_vector(case_features(case_dic)))))
+
+#%%
+def longest_first(global_dic, case_dic_list, chains):
+    # <chains> ([solve index, case index, ...] of the cases of each) in the order of their
+    # predicted time, longest first
+    chain_times = [sum(predicted_time(global_dic, case_dic_list[item[1]]) for item in chain) for chain in chains]
+    return [chains[i] for i in sorted(range(len(chains)), key = lambda i: -chain_times[i])]
+
+#%%
+def model_counts(case_dic):
+    # [constraints, variables] of the LP of <case_dic>, estimated from its technologies
+    # (each time series per hour has a bound by its capacity and a row in a balance)
+    num_time_periods = case_features(case_dic)[0]
+    if case_dic['ROLLING_HORIZON_HOURS'] > 0:
+        num_time_periods = min(num_time_periods, case_dic['ROLLING_HORIZON_HOURS'] + case_dic['LOOKAHEAD_HOURS'])
+    system_technologies = technologies(system_components = case_dic['SYSTEM_COMPONENTS'])
+    num_series = sum(len(technology['VECTOR_KEYS']) for technology in system_technologies)
+    num_storage = len([technology for technology in system_technologies if technology['STORAGE']])
+    return [num_time_periods * (2 * num_series + 1 + num_storage),
+            num_time_periods * num_series + len(system_technologies)]
+
+def predicted_memory(case_dic):
+    # predicted peak memory of a process that solves <case_dic>, GB
+    size = sum(model_counts(case_dic))
+    return process_memory_gb + reference_memory_gb * (size / reference_size)**memory_exponent
+
+def record_solve_time(global_dic, case_dic, result_dic):
+    # Append the time <case_dic> took and its prediction to the solve time history
+    file_name = history_file(global_dic)
+    row = [datetime.datetime.now().isoformat(timespec = 'seconds'), global_dic['GLOBAL_NAME'], case_dic['CASE_NAME'],
+           case_dic['MODEL_ENGINE'], result_dic['SOLVER']] + case_features(case_dic) + \
+          [result_dic['PREDICTED_TIME'], result_dic['MODEL_BUILD_TIME'] + result_dic['SOLVE_TIME']]
+    if not os.path.exists(global_dic['OUTPUT_PATH']):
+        os.makedirs(global_dic['OUTPUT_PATH'], exist_ok = True)
+    new_file = not os.path.exists(file_name)
+    # one write of whole lines, so that the lines of workers that write at the same time are not mixed
+    text = io.StringIO()
+    writer = csv.writer(text)
+    if new_file:
+        writer.writerow(history_header)
+    writer.writerow(row)
+    with open(file_name, 'a', newline = '') as history:
+        history.write(text.getvalue())
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+
+Screening.py
+
+Two-stage solve that leaves out the technologies a case does not build.
+
+With SCREENING_DAYS = N and/or SCREENING_TIME_STEP_HOURS = h (case keywords,
+default -1 = off) <two_stage_screening> solves the case twice:
+
+    Stage one solves the case over N representative days and/or with time
+    steps of h hours (see Time_Aggregation.py), which is fast.
+
+    Stage two solves the case at full resolution without the technologies
+    that stage one did not build: all of their capacities are calculated (the
+    CAPACITY_* keywords < 0) and below SCREENING_MARGIN (default 1e-3) kW or
+    kWh per kW of mean demand. Each of them leaves several hourly variables
+    out of the LP. (The solvers only take a starting basis for the same LP,
+    so stage two starts from scratch; what it gets from stage one is the
+    smaller LP.)
+
+The solution of stage two is optimal for the whole case if no left out
+technology would lower the system cost at the prices of stage two (PRICE, the
+duals of its energy balance). That is the reduced cost check of linear
+programming: for each left out technology, <price_taker_profit> finds the most
+it could earn with at most one unit of each of its capacities, selling and
+buying at PRICE, after its fixed and variable costs. If that is more than
+reduced_cost_tolerance of its fixed costs, the check fails and the whole case
+is solved again at full resolution.
+
+The result is in the usual format, with SCREENED_OUT (the technologies left
+out, joined with '+') and SCREENING_CHECK (PASSED, or FAILED if the case was
+solved again). MODEL_BUILD_TIME and SOLVE_TIME are those of all solves.
+
+"""
+
+import cvxpy as cvx
+import numpy as np
+
+from Solver_Backend import solve_with_backend, profile_options
+from Technology_Registry import technologies
+from Time_Aggregation import coarsen_case, refine_result, aggregate_case
+
+reduced_cost_tolerance = 1e-4
+
+#%%
+def stage_one_case(case_dic):
+    # the case as solved in stage one, and the case before representative days
+    coarse_case_dic = dict(case_dic, TIME_STEP_HOURS = case_dic['SCREENING_TIME_STEP_HOURS'],
+                           REPRESENTATIVE_DAYS = case_dic['SCREENING_DAYS'])
+    if coarse_case_dic['TIME_STEP_HOURS'] > 1:
+        coarse_case_dic = coarsen_case(coarse_case_dic)
+    if coarse_case_dic['REPRESENTATIVE_DAYS'] > 0:
+        return aggregate_case(coarse_case_dic), coarse_case_dic
+    return coarse_case_dic, coarse_case_dic
+
+def screened_technologies(case_dic, result):
+    # technologies with calculated capacities that are all below the margin in <result>
+    margin = case_dic['SCREENING_MARGIN'] * np.mean(case_dic['DEMAND_SERIES'])
+    return [technology['NAME'] for technology in technologies(system_components = case_dic['SYSTEM_COMPONENTS'])
+            if len(technology['CAPACITY_KEYS']) > 0 and
+            all(case_dic[key] < 0 and result[key] <= margin for key in technology['CAPACITY_KEYS'])]
+
+#%%
+def next_hour(x):
+    # as in Core_Model.py: x rotated by one hour, cyclic
+    return cvx.hstack([x[1:], x[:1]])
+
+def price_taker_profit(case_dic, technology, price):
+    # The most <technology> earns at <price> ($/kWh, PRICE of a result) with each capacity
+    # at most 1, minus its costs, as in the objective of the model (fixed costs per hour,
+    # mean variable costs). Returns [profit, fixed costs of one unit of each capacity].
+    name = technology['NAME']
+    num_time_periods = len(price)
+    fixed_cost = sum(case_dic[cost_key] for capacity_key, cost_key in technology['FIXED_COSTS'])
+
+    if technology['KIND'] == 'GENERATOR':
+        # dispatched whenever the price is above its variable cost
+        series = np.array(case_dic[technology['SERIES']]) if technology['SERIES'] is not None else np.ones(num_time_periods)
+        return [np.mean(np.maximum(price - case_dic['VAR_COST_' + name], 0.) * series) - fixed_cost, fixed_cost]
+
+    capacity = cvx.Variable(len(technology['CAPACITY_KEYS']), nonneg = True)
+    dispatch_to = cvx.Variable(num_time_periods, nonneg = True)
+    dispatch_from = cvx.Variable(num_time_periods, nonneg = True)
+    energy = cvx.Variable(num_time_periods, nonneg = True)
+    constraints = [capacity <= 1]
+    if technology['KIND'] == 'STORAGE':
+        charging_limit = capacity[0] / case_dic['CHARGING_TIME_' + name]
+        constraints += [
+                dispatch_to <= charging_limit,
+                dispatch_from <= charging_limit,
+                energy <= capacity[0],
+                next_hour(energy) == energy * (1 - case_dic['DECAY_RATE_' + name]) +
+                    case_dic['CHARGING_EFFICIENCY_' + name] * dispatch_to - dispatch_from
+                ]
+        revenue = price @ (dispatch_from - dispatch_to)
+        var_cost = case_dic['VAR_COST_TO_' + name] * cvx.sum(dispatch_to) + case_dic['VAR_COST_FROM_' + name] * cvx.sum(dispatch_from)
+    elif technology['KIND'] == 'PGP_STORAGE':
+        # capacities: storage, to storage, from storage
+        constraints += [
+                dispatch_to <= capacity[1],
+                dispatch_from <= capacity[2],
+                energy <= capacity[0],
+                next_hour(energy) == energy * (1 - case_dic['DECAY_RATE_PGP_STORAGE']) +
+                    case_dic['CHARGING_EFFICIENCY_PGP_STORAGE'] * dispatch_to - dispatch_from
+                ]
+        revenue = price @ (dispatch_from - dispatch_to)
+        var_cost = case_dic['VAR_COST_TO_PGP_STORAGE'] * cvx.sum(dispatch_to) + \
+            case_dic['VAR_COST_FROM_PGP_STORAGE'] * cvx.sum(dispatch_from)
+    elif technology['KIND'] == 'CSP':
+        # capacities: CSP, CSP storage; charged by the sun only (dispatch_to)
+        constraints += [
+                dispatch_to <= capacity[0] * np.array(case_dic['CSP_SERIES']),
+                dispatch_from <= energy * (1 - case_dic['DECAY_RATE_CSP_STORAGE']) +
+                    case_dic['CHARGING_EFFICIENCY_STORAGE'] * dispatch_to,
+                energy <= capacity[1],
+                next_hour(energy) == energy * (1 - case_dic['DECAY_RATE_CSP_STORAGE']) +
+                    case_dic['CHARGING_EFFICIENCY_CSP_STORAGE'] * dispatch_to - dispatch_from
+                ]
+        revenue = price @ dispatch_from
+        var_cost = case_dic['VAR_COST_CSP'] * cvx.sum(dispatch_from) + case_dic['VAR_COST_CSP_STORAGE'] * cvx.sum(energy)
+    else:
+        raise ValueError('Screening.py: no reduced cost check for ' + name)
+    fixed_costs = np.array([case_dic[cost_key] for capacity_key, cost_key in technology['FIXED_COSTS']])
+    prob = cvx.Problem(cvx.Maximize((revenue - var_cost) / num_time_periods - fixed_costs @ capacity), constraints)
+    status = solve_with_backend(prob, case_dic['SOLVER'], profile_options(case_dic['SOLVER_PROFILE']))
+    if status != 'optimal':
+        return [np.inf, fixed_cost]    # no proof that the technology is not needed
+    return [prob.value, fixed_cost]
+
+def reduced_cost_check(case_dic, result, screened_out):
+    # True if none of the <screened_out> technologies would lower the cost of <result>
+    check = True
+    for technology in technologies(system_components = screened_out):
+        profit, fixed_cost = price_taker_profit(case_dic, technology, result['PRICE'])
+        if profit > reduced_cost_tolerance * fixed_cost:
+            print ('Screening.py: ',technology['NAME'],' would earn ',profit,' per unit at the prices of stage two')
+            check = False
+    return check
+
+#%%
+def two_stage_screening(global_dic, case_dic, solve, stage_one_solve):
+    # Result of <case_dic> solved by <solve> without the technologies that <stage_one_solve>
+    # (core_model, since stage one may have representative days) does not build
+    verbose = global_dic['VERBOSE']
+    solve_case_dic, coarse_case_dic = stage_one_case(case_dic)
+    stage_one_result = stage_one_solve(global_dic, solve_case_dic)
+    screened_out = []
+    if stage_one_result['PROBLEM_STATUS'] == 'optimal':
+        if coarse_case_dic['TIME_STEP_HOURS'] > 1:
+            refine_result(case_dic, coarse_case_dic, stage_one_result)
+        screened_out = screened_technologies(case_dic, stage_one_result)
+    if verbose:
+        print ('screening stage one: ',stage_one_result['PROBLEM_STATUS'],', LP size ',stage_one_result['MODEL_SIZE'],
+               ', left out: ',screened_out)
+
+    screened_case_dic = dict(case_dic, SYSTEM_COMPONENTS = [component for component in case_dic['SYSTEM_COMPONENTS']
+                                                            if component not in screened_out])
+    result = solve(global_dic, screened_case_dic)
+    times = [stage_one_result, result]
+    screening_check = 'PASSED'
+    if len(screened_out) > 0 and (result['PROBLEM_STATUS'] != 'optimal' or
+                                  not reduced_cost_check(case_dic, result, screened_out)):
+        screening_check = 'FAILED'
+        print ('Screening.py: case ',case_dic['CASE_NAME'],' is solved again with all technologies')
+        result = solve(global_dic, case_dic)
+        times.append(result)
+    if verbose:
+        print ('screening stage two: ',result['PROBLEM_STATUS'],', LP size ',result['MODEL_SIZE'],
+               ', reduced cost check ',screening_check)
+
+    for key in ['MODEL_BUILD_TIME', 'SOLVE_TIME']:
+        result[key] = sum(stage_result[key] for stage_result in times)
+    result['SCREENED_OUT'] = '+'.join(screened_out)
+    result['SCREENING_CHECK'] = screening_check
+    return result
+
+def no_screening():
+    # result entries of a case that is solved without screening
+    return {
+            'SCREENED_OUT':                 '',
+            'SCREENING_CHECK':              'NONE'
+            }
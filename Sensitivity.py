@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+
+Sensitivity.py
+
+Marginal value of the inputs of a case, from the duals of one solve.
+
+With SENSITIVITY_REPORT = true (a case keyword), core_model adds SENSITIVITY
+to the result of a case solved as one LP at full resolution: input keyword ->
+d(SYSTEM_COST)/d(keyword), for
+
+    the costs of each technology (FIXED_COST_*, VAR_COST_*),
+    its efficiencies, decay rates and charging times,
+    its fixed capacities (CAPACITY_* >= 0), and
+    SYSTEM_RELIABILITY and CO2_CAP, if the case has them.
+
+By the envelope theorem of linear programming the derivative of the optimal
+cost is that of the Lagrangian, objective + sum over the constraints of
+dual * (lhs - rhs), at the optimal solution and duals, where only the inputs
+change. <system_cost_gradient> sets the parameters of the solved model (see
+parameter_value in Core_Model.py) for each keyword a little up and down and
+takes the central difference of the Lagrangian over the objective and the
+constraints that use them: the capacity bounds, the storage balances, the
+reliability constraint, the CO2 cap and the energy balance. No further solve is needed.
+
+The derivative is one sided where the optimal basis changes at the input
+(the two sided derivatives differ); the central difference then lies between
+them. In the lean formulation (LEAN_FORMULATION) fixed capacities are
+constant variable bounds, whose duals cvxpy does not report: their keywords
+are NaN.
+
+save_basic_results writes SENSITIVITY as 'd system cost / d <keyword>'
+columns. Cases solved in rolling horizon windows, Benders time blocks, over
+representative days or with coarser time steps have no SENSITIVITY; the DIRECT
+engine solves cases with SENSITIVITY_REPORT with CVXPY.
+
+"""
+
+import numpy as np
+
+from Technology_Registry import technologies
+
+relative_step = 1e-4    # of the central differences, relative to the keyword (absolute if it is 0)
+
+#%%
+def sensitivity_case(case_dic):
+    # True if <case_dic> is solved as one LP of all its hours
+    return case_dic['SENSITIVITY_REPORT'] and not (case_dic.get('ROLLING_WINDOW', False) or
+        case_dic.get('BENDERS_SUBPROBLEM', False) or 'DAY_MAP' in case_dic or case_dic['TIME_STEP_HOURS'] > 1)
+
+def sensitivity_keys(case_dic):
+    # the input keywords of the case whose marginal values are reported
+    keys = []
+    for technology in technologies(system_components = case_dic['SYSTEM_COMPONENTS']):
+        keys += [cost_key for capacity_key, cost_key in technology['FIXED_COSTS']]
+        keys += [cost_key for series_key, cost_key in technology['VAR_COSTS']]
+        keys += [key for key in technology['KEYWORDS_NOTSCALED']
+                 if not key.startswith('CAPACITY_') or case_dic[key] >= 0]
+    if case_dic['SYSTEM_RELIABILITY'] >= 0:
+        keys.append('SYSTEM_RELIABILITY')
+    if case_dic['CO2_CAP'] >= 0:
+        keys.append('CO2_CAP')
+    return keys
+
+def lagrangian(prob, constraints):
+    # objective + sum of dual * (lhs - rhs) over <constraints> of the solved problem <prob>,
+    # at the current values of its parameters
+    value = prob.objective.expr.value
+    for constraint in constraints:
+        value += np.sum(constraint.dual_value * constraint.expr.value)
+    return value
+
+#%%
+def system_cost_gradient(model, case_dic, parameter_value):
+    # Keyword -> d(SYSTEM_COST)/d(keyword) for the solved <model> of <case_dic>
+    # (<parameter_value> from Core_Model.py)
+    prob = model['PROBLEM']
+    cost_scaling = case_dic['NUMERICS_COST_SCALING'] * case_dic['NUMERICS_DEMAND_SCALING']
+    constraint_parameters = [[constraint, set(parameter.name() for parameter in constraint.parameters())]
+                             for constraint in prob.constraints]
+    gradient = {}
+    for key in sensitivity_keys(case_dic):
+        step = relative_step * abs(case_dic[key]) if case_dic[key] != 0 else relative_step
+        values = {}
+        for sign in [1, -1]:
+            perturbed_case_dic = dict(case_dic)
+            perturbed_case_dic[key] = case_dic[key] + sign * step
+            values[sign] = {name: parameter_value(perturbed_case_dic, name) for name in model['PARAMETERS']}
+        changed = [name for name in model['PARAMETERS']
+                   if not np.array_equal(values[1][name], model['PARAMETERS'][name].value)]
+        if any(name in model['CONSTANTS'] for name in changed):
+            gradient[key] = np.nan     # a constant bound of the lean formulation
+            continue
+        constraints = [constraint for constraint, names in constraint_parameters if not names.isdisjoint(changed)]
+        unperturbed = {name: model['PARAMETERS'][name].value for name in changed}
+        lagrangian_values = {}
+        for sign in [1, -1]:
+            for name in changed:
+                model['PARAMETERS'][name].value = values[sign][name]
+            lagrangian_values[sign] = lagrangian(prob, constraints)
+        for name in changed:
+            model['PARAMETERS'][name].value = unperturbed[name]
+        gradient[key] = float(np.sum(lagrangian_values[1] - lagrangian_values[-1])) / (2 * step) / cost_scaling
+    return gradient
+
+def no_sensitivity():
+    # result entries of a case without a sensitivity report
+    return {
+            'SENSITIVITY':                  {}
+            }
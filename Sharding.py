@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+
+Sharding.py
+
+Runs of a slice of the cases, e.g. the tasks of a cluster job array, and the
+merge of their results.
+
+    python Simple_Energy_Model.py case.csv --shard i/N
+
+solves shard i (1 to N) of the cases: the i-th of N contiguous slices of the
+cases of the case input file, which differ in size by one case at most. A
+shard writes its results (case CSV files, pickles and a summary of its own
+cases) to the folder GLOBAL_NAME_shard_i_of_N next to the folder GLOBAL_NAME,
+so shards can run at the same time, on any number of nodes or on one box.
+Nothing is shared between shards but the file system, so any scheduler that
+starts N processes with their index (e.g. SLURM_ARRAY_TASK_ID) will do.
+
+    python Simple_Energy_Model.py case.csv --merge
+
+takes the results of each case from the shard folders (of any N; the newest
+if a case was solved by more than one shard), saves them to the folder
+GLOBAL_NAME as a run without shards would, and writes the summary CSV files
+and the Quick_Look PDFs of all cases. If a case has no results in any shard
+folder the merge reports the missing cases and the shard they belong to, and
+writes nothing.
+
+Sweeps that are solved together (SWEEP_WARM_START chains, PARAMETRIC_SWEEP,
+ADAPTIVE_SWEEP) only span the cases of one shard.
+
+"""
+
+import glob
+import os
+import pickle
+import re
+import shutil
+
+from Save_Basic_Results import save_vector_results_as_csv, save_year_results, pickle_raw_results
+
+#%%
+def parse_shard(text):
+    # 'i/N' -> [i, N]
+    match = re.match(r'^\s*(\d+)\s*/\s*(\d+)\s*$', text)
+    if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError('Sharding.py: --shard must be i/N with 1 <= i <= N, not ' + text)
+    return [int(match.group(1)), int(match.group(2))]
+
+def shard_range(num_cases, shard, num_shards):
+    # [first, end) of the case indices of <shard> (1 to <num_shards>)
+    return [(shard - 1) * num_cases // num_shards, shard * num_cases // num_shards]
+
+def case_shard(case_index, num_cases, num_shards):
+    # the shard (1 to <num_shards>) that solves case <case_index>
+    for shard in range(1, num_shards + 1):
+        first, end = shard_range(num_cases, shard, num_shards)
+        if first <= case_index < end:
+            return shard
+
+def shard_name(global_dic, shard, num_shards):
+    return global_dic['GLOBAL_NAME'] + '_shard_' + str(shard) + '_of_' + str(num_shards)
+
+def shard_cases(global_dic, case_dic_list, shard, num_shards):
+    # global_dic and case_dic_list of the run of <shard>
+    first, end = shard_range(len(case_dic_list), shard, num_shards)
+    shard_global_dic = dict(global_dic, GLOBAL_NAME = shard_name(global_dic, shard, num_shards))
+    return shard_global_dic, case_dic_list[first:end]
+
+#%%
+def shard_folders(global_dic):
+    # shard name -> number of shards of that run, for the shard folders of GLOBAL_NAME
+    folders = {}
+    pattern = re.compile('^' + re.escape(global_dic['GLOBAL_NAME']) + r'_shard_(\d+)_of_(\d+)$')
+    for folder in glob.glob(glob.escape(global_dic['OUTPUT_PATH']) + '/*'):
+        match = pattern.match(os.path.basename(folder))
+        if match is not None and os.path.isdir(folder):
+            folders[os.path.basename(folder)] = int(match.group(2))
+    return folders
+
+def merge_shards(global_dic, case_dic_list):
+    # Save the results of the cases from the shard folders as a run without shards;
+    # returns the names of the cases that no shard has results of (then nothing is saved)
+    verbose = global_dic['VERBOSE']
+    output_path = global_dic['OUTPUT_PATH']
+    folders = shard_folders(global_dic)
+
+    found = []      # case index -> [shard name, pickle file] with the newest results
+    missing = []
+    for case_index, case_dic in enumerate(case_dic_list):
+        files = [[name, output_path + '/' + name + '/' + name + '_' + case_dic['CASE_NAME'] + '.pickle']
+                 for name in sorted(folders)]
+        files = [[name, file_name] for name, file_name in files if os.path.exists(file_name)]
+        if len(files) == 0:
+            missing.append(case_index)
+        else:
+            found.append(max(files, key = lambda name_file: os.path.getmtime(name_file[1])))
+
+    if len(missing) > 0:
+        num_shards = sorted(set(folders.values()))
+        print ('Sharding.py: no results for ',len(missing),' of ',len(case_dic_list),' cases in the shard folders ',
+               sorted(folders))
+        for case_index in missing:
+            print ('    ',case_dic_list[case_index]['CASE_NAME'],', shard ',
+                   ', '.join(str(case_shard(case_index, len(case_dic_list), n)) + '/' + str(n) for n in num_shards))
+        return [case_dic_list[case_index]['CASE_NAME'] for case_index in missing]
+
+    for case_index, [name, file_name] in enumerate(found):
+        with open(file_name, 'rb') as db:
+            [shard_global_dic, case_dic, result_dic] = pickle.load(db)
+        # the shard's case has the scaling factors that were used (NUMERICS_AUTO_SCALING)
+        case_dic_list[case_index] = case_dic
+        save_vector_results_as_csv(global_dic, case_dic, result_dic)
+        if case_dic['WEATHER_YEAR_BLOCKS']:
+            save_year_results(global_dic, case_dic, result_dic)
+        pickle_raw_results(global_dic, case_dic, result_dic)
+        if verbose:
+            print ('merged ',case_dic['CASE_NAME'],' from ',name)
+
+    # paths of parametric sweeps (see Save_Basic_Results.save_parametric_path)
+    output_folder = output_path + '/' + global_dic['GLOBAL_NAME']
+    for name in sorted(folders):
+        for file_name in glob.glob(glob.escape(output_path + '/' + name + '/' + name) + '_path_*.csv'):
+            shutil.copy2(file_name, output_folder + '/' + global_dic['GLOBAL_NAME'] +
+                         os.path.basename(file_name)[len(name):])
+    return []
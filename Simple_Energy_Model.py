@@ -12,16 +12,24 @@
   and enter the file name of your input .csv file, e.g., Check 'command line options'
   and enter ./case_input_base_190716.csv
   
+  Command line options after the file name:
+      --workers N   solve the cases in N processes (see Core_Model.py)
+      --shard i/N   solve only shard i of N of the cases (see Sharding.py)
+      --merge       merge the results of the shards and write the summary (see Sharding.py)
+  
 '''
 
 from Core_Model import core_model_loop
 from Preprocess_Input import preprocess_input
 from Postprocess_Results import post_process
 #from Postprocess_Results_kc180214 import postprocess_key_scalar_results,merge_two_dicts
-from Save_Basic_Results import save_basic_results
+from Save_Basic_Results import save_basic_results, save_run_summary
 from Quick_Look import quick_look
+from Sharding import parse_shard, shard_cases, merge_shards
+from Work_Queue import queue_worker
 
 from shutil import copy2
+import argparse
 import os
 import sys
  
@@ -30,17 +38,36 @@ import sys
 #whoami = subprocess.check_output('whoami')
 #if whoami == 'kcaldeira-carbo\\kcaldeira\r\n':
 #    case_input_path_filename = '/Users/kcaldeira/Google Drive/git/SEM-1/case_input.csv'
-if len(sys.argv) == 1:
-    #case_input_path_filename = './case_input.csv'
-    case_input_path_filename = './case_input_test_191130.csv'
-else:
-    case_input_path_filename = sys.argv[1]
+parser = argparse.ArgumentParser(description = 'Simple Energy Model')
+#parser.add_argument('case_input_path_filename', nargs = '?', default = './case_input.csv')
+parser.add_argument('case_input_path_filename', nargs = '?', default = './case_input_test_191130.csv')
+parser.add_argument('--workers', type = int, default = None,
+                    help = 'processes that solve the cases (overrides WORKERS of the case input file)')
+parser.add_argument('--shard', type = parse_shard, default = None, metavar = 'i/N',
+                    help = 'solve only shard i of N of the cases')
+parser.add_argument('--merge', action = 'store_true',
+                    help = 'merge the results of the shards instead of solving')
+args = parser.parse_args()
+case_input_path_filename = args.case_input_path_filename
+if args.shard is not None and args.merge:
+    parser.error('--shard and --merge are separate runs')
 
 # -----------------------------------------------------------------------------
 # =============================================================================
 
 print ('Simple_Energy_Model: Pre-processing input')
 global_dic,case_dic_list = preprocess_input(case_input_path_filename)
+if args.workers is not None:
+    global_dic['WORKERS'] = args.workers
+if args.shard is not None:
+    global_dic,case_dic_list = shard_cases(global_dic, case_dic_list, *args.shard)
+    print ('Simple_Energy_Model: shard ',args.shard[0],' of ',args.shard[1],', ',len(case_dic_list),' cases')
+    if len(case_dic_list) == 0:
+        sys.exit()
+    # the figures of a sharded run are made by the merge
+    global_dic['WORK_QUEUE'] = False
+    global_dic['POSTPROCESS'] = False
+    global_dic['QUICK_LOOK'] = False
 
 # -----------------------------------------------------------------------------
 
@@ -58,12 +85,23 @@ except:
 
 # -----------------------------------------------------------------------------
 
-print ('Simple_Energy_Model: Executing core model loop')
-core_model_loop (global_dic, case_dic_list)
+if args.merge:
+    print ('Simple_Energy_Model: Merging the results of the shards')
+    missing_cases = merge_shards(global_dic, case_dic_list)
+    if len(missing_cases) > 0:
+        sys.exit('Simple_Energy_Model: merge stopped, ' + str(len(missing_cases)) + ' cases have no results')
+elif global_dic['WORK_QUEUE']:
+    print ('Simple_Energy_Model: Solving cases from the work queue')
+    if not queue_worker(global_dic, case_dic_list):
+        sys.exit()  # the summary is written by another worker
+else:
+    print ('Simple_Energy_Model: Executing core model loop')
+    core_model_loop (global_dic, case_dic_list)
 
 print ('Simple_Energy_Model: Saving basic results')
 # Note that results for individual cases are output from core_model_loop
 save_basic_results(global_dic, case_dic_list)
+save_run_summary(global_dic, case_dic_list)
 
 # -----------------------------------------------------------------------------
 
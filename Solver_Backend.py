@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+
+Solver_Backend.py
+
+The LP solvers that <core_model> can use. The solver is chosen with the case
+keyword SOLVER (default GUROBI):
+
+    GUROBI  -- commercial, needs a license
+    HIGHS   -- open source, through highspy (pip install highspy)
+    CLP     -- open source (COIN-OR), through cylp (pip install cylp).
+               cvxpy calls this solver 'CBC', and uses CLP for LPs.
+    CBC     -- same as CLP, since the model is a pure LP
+    GLPK    -- open source, through cvxopt (pip install cvxopt)
+
+Solver options are given to <solve_with_backend> with generic names:
+
+    SEED             -- random seed
+    TIME_LIMIT       -- seconds
+    THREADS          -- number of threads
+    FEASIBILITY_TOL  -- primal feasibility tolerance
+    OPTIMALITY_TOL   -- dual feasibility (optimality) tolerance
+    METHOD           -- AUTO, PRIMAL_SIMPLEX, DUAL_SIMPLEX or BARRIER
+    CROSSOVER        -- True to finish a barrier solve with crossover to a basis
+    BARRIER_TOL      -- barrier convergence tolerance
+
+and are mapped to each solver's own option names (and units). Options that a
+solver does not have are dropped.
+
+Named sets of these options are chosen with the case keyword SOLVER_PROFILE
+(see solver_profiles below and the header of the case input files):
+
+    FAST      -- barrier without crossover, loose barrier tolerance (1e-6), all
+                 threads. The solution is not a vertex and the duals are only as
+                 good as the tolerance, so PRICE is checked (see Model_Results.py).
+                 The feasibility tolerances are left alone: HiGHS does not call a
+                 barrier solution optimal if they are looser than its own.
+    BALANCED  -- the solver's defaults (default profile)
+    ACCURATE  -- barrier with crossover, tight tolerances (1e-9)
+
+When a solve fails, it is tried again down the fallback_ladder below: first
+with the solver's settings for numerically difficult problems (NUMERIC_FOCUS
+below, e.g. NumericFocus = 3 for Gurobi), then barrier with crossover, dual
+simplex, and finally with different NUMERICS_*_SCALING factors (chosen as in
+Numerics_Scaling.py). The case keyword MAX_RETRIES (default 1) is the number of
+steps of the ladder that are used, and TIME_LIMIT (seconds, default none) is
+the time all attempts of a case together may take. A case that runs out of time
+is reported with status 'user_limit' and the best objective and bound that the
+solver knows of, if any (see <limit_objectives>).
+
+Status strings are normalized to the cvxpy names ('optimal', 'infeasible',
+'unbounded', 'user_limit', 'solver_error', ...), also for the DIRECT engine.
+cvxpy converts the duals of all the solvers above to its own convention, so
+PRICE comes out the same whichever solver is used.
+
+"""
+
+import time
+import cvxpy as cvx
+
+#%%
+# OPTIONS: generic option name -> [solver option name, factor to convert the value]
+#          (the factor is a dictionary for options that take one of a few values)
+# OPTION_GROUP: if not None, the options are passed as a dictionary with this name
+solver_backends = {
+        'GUROBI':{
+                'CVXPY_SOLVER':'GUROBI',
+                'OPTIONS':{
+                        'SEED':['Seed', 1],
+                        'TIME_LIMIT':['TimeLimit', 1],
+                        'THREADS':['Threads', 1],
+                        'FEASIBILITY_TOL':['FeasibilityTol', 1],
+                        'OPTIMALITY_TOL':['OptimalityTol', 1],
+                        'METHOD':['Method', {'AUTO':-1, 'PRIMAL_SIMPLEX':0, 'DUAL_SIMPLEX':1, 'BARRIER':2}],
+                        'CROSSOVER':['Crossover', {True:-1, False:0}],
+                        'BARRIER_TOL':['BarConvTol', 1]
+                        },
+                'OPTION_GROUP':None,
+                'NUMERIC_FOCUS':{'NumericFocus':3}
+                },
+        'HIGHS':{
+                'CVXPY_SOLVER':'HIGHS',
+                'OPTIONS':{
+                        'SEED':['random_seed', 1],
+                        'TIME_LIMIT':['time_limit', 1],
+                        'THREADS':['threads', 1],
+                        'FEASIBILITY_TOL':['primal_feasibility_tolerance', 1],
+                        'OPTIMALITY_TOL':['dual_feasibility_tolerance', 1],
+                        'METHOD':['solver', {'AUTO':'choose', 'PRIMAL_SIMPLEX':'simplex',
+                                             'DUAL_SIMPLEX':'simplex', 'BARRIER':'ipm'}],
+                        'CROSSOVER':['run_crossover', {True:'on', False:'off'}],
+                        'BARRIER_TOL':['ipm_optimality_tolerance', 1]
+                        },
+                'OPTION_GROUP':'highs_options', # HiGHS' 'solver' option would clash with cvxpy's
+                # interior point with crossover instead of the default dual simplex
+                'NUMERIC_FOCUS':{'solver':'ipm', 'run_crossover':'on'}
+                },
+        'CLP':{
+                'CVXPY_SOLVER':'CBC',
+                'OPTIONS':{
+                        'FEASIBILITY_TOL':['primalTolerance', 1],
+                        'OPTIMALITY_TOL':['dualTolerance', 1]
+                        },
+                'OPTION_GROUP':None,
+                'NUMERIC_FOCUS':{'presolve':'off'}
+                },
+        'GLPK':{
+                'CVXPY_SOLVER':'GLPK',
+                'OPTIONS':{
+                        'TIME_LIMIT':['tm_lim', 1000], # milliseconds
+                        'FEASIBILITY_TOL':['tol_bnd', 1],
+                        'OPTIMALITY_TOL':['tol_dj', 1]
+                        },
+                'OPTION_GROUP':'glpk',
+                # dual simplex, switching to primal simplex if the dual fails
+                'NUMERIC_FOCUS':{'meth':'GLP_DUALP'}
+                }
+        }
+solver_backends['CBC'] = solver_backends['CLP']
+
+# The retries after a failed solve, in order. OPTIONS are added to the case's options.
+# RESCALE solves the case again with other NUMERICS_*_SCALING factors.
+fallback_ladder = [
+        {'NAME':'NUMERIC_FOCUS', 'OPTIONS':{}, 'NUMERIC_FOCUS':True, 'RESCALE':False},
+        {'NAME':'BARRIER', 'OPTIONS':{'METHOD':'BARRIER', 'CROSSOVER':True}, 'NUMERIC_FOCUS':False, 'RESCALE':False},
+        {'NAME':'DUAL_SIMPLEX', 'OPTIONS':{'METHOD':'DUAL_SIMPLEX'}, 'NUMERIC_FOCUS':False, 'RESCALE':False},
+        {'NAME':'RESCALE', 'OPTIONS':{}, 'NUMERIC_FOCUS':True, 'RESCALE':True}
+        ]
+
+# SOLVER_PROFILE -> generic options
+solver_profiles = {
+        'FAST':{
+                'METHOD':'BARRIER',
+                'CROSSOVER':False,
+                'BARRIER_TOL':1e-6,
+                'THREADS':0     # solver's choice, usually all cores
+                },
+        'BALANCED':{},
+        'ACCURATE':{
+                'METHOD':'BARRIER',
+                'CROSSOVER':True,
+                'FEASIBILITY_TOL':1e-9,
+                'OPTIMALITY_TOL':1e-9,
+                'BARRIER_TOL':1e-10
+                }
+        }
+
+#%%
+def solver_backend(solver):
+    solver = str.upper(solver)
+    if solver not in solver_backends:
+        raise ValueError('Solver_Backend.py: unknown SOLVER ' + solver +
+                         ', choices are ' + ', '.join(sorted(solver_backends)))
+    return solver_backends[solver]
+
+#%%
+def profile_options(profile):
+    profile = str.upper(profile)
+    if profile not in solver_profiles:
+        raise ValueError('Solver_Backend.py: unknown SOLVER_PROFILE ' + profile +
+                         ', choices are ' + ', '.join(sorted(solver_profiles)))
+    return dict(solver_profiles[profile])
+
+def case_solver_options(global_dic, case_dic):
+    # the options of the case's SOLVER_PROFILE, with SOLVER_THREADS threads if it is given
+    # (global section of the case input file; core_model_loop sets it for its WORKERS)
+    options = profile_options(case_dic['SOLVER_PROFILE'])
+    if global_dic['SOLVER_THREADS'] > 0:
+        options['THREADS'] = int(global_dic['SOLVER_THREADS'])
+    return options
+
+#%%
+def solver_options(solver, options, numeric_focus = False):
+    # Map generic <options> to the options of <solver>
+    backend = solver_backend(solver)
+    mapped_options = {}
+    for key in options:
+        if key in backend['OPTIONS']:
+            name, factor = backend['OPTIONS'][key]
+            if isinstance(factor, dict):
+                mapped_options[name] = factor[options[key]]
+            else:
+                mapped_options[name] = options[key] * factor
+    if numeric_focus:
+        mapped_options.update(backend['NUMERIC_FOCUS'])
+    if backend['OPTION_GROUP'] is not None:
+        mapped_options = {backend['OPTION_GROUP']:mapped_options}
+    return mapped_options
+
+#%%
+def normalize_status(status):
+    # cvxpy status names; 'solved' is what older versions of cvxpy returned for 'optimal'
+    if status is None:
+        return 'solver_error'
+    status = str.lower(status)
+    if status == 'solved':
+        status = 'optimal'
+    return status
+
+#%%
+def solve_with_backend(prob, solver, options, numeric_focus = False, warm_start = False):
+    # Solve the cvx.Problem <prob> with <solver> and return the normalized status
+    backend = solver_backend(solver)
+    if backend['CVXPY_SOLVER'] not in cvx.installed_solvers():
+        raise cvx.error.SolverError('solver ' + str.upper(solver) + ' (' + backend['CVXPY_SOLVER'] +
+                                    ' in cvxpy) is not installed')
+    try:
+        prob.solve(solver = backend['CVXPY_SOLVER'], warm_start = warm_start,
+                   **solver_options(solver, options, numeric_focus))
+    except ValueError as err:
+        # cvxpy cannot unpack a solution without a status, e.g. HiGHS' 'unknown'
+        # after a barrier solve that stopped short of its tolerances
+        if 'Cannot unpack invalid solution' not in str(err):
+            raise
+        return 'solver_error'
+    return normalize_status(prob.status)
+
+#%%
+def solve_with_fallbacks(solve, solver, options, time_limit = -1, max_retries = 1, rescale = True):
+    # <solve>(options, numeric_focus, rescale) solves the case once and returns the normalized
+    # status, or None if it cannot do what is asked (e.g. the scaling would not change).
+    # Goes down the fallback_ladder until a solve is optimal, runs out of time, or
+    # <max_retries> retries are used. The RESCALE step is left out if not <rescale>.
+    # Returns the status and the names of the attempts.
+    start_time = time.time()
+    first_attempt = {'NAME':'FIRST', 'OPTIONS':{}, 'NUMERIC_FOCUS':False, 'RESCALE':False}
+    status = 'solver_error'
+    attempts = []
+    tried = []
+    for step in [first_attempt] + fallback_ladder[:max(int(max_retries), 0)]:
+        step_options = dict(options, **step['OPTIONS'])
+        mapped_options = solver_options(solver, step_options, step['NUMERIC_FOCUS'])
+        if step['RESCALE'] and not rescale:
+            continue
+        if mapped_options in tried and not step['RESCALE']:
+            continue    # same settings as an earlier attempt for this solver
+        if time_limit > 0:
+            remaining_time = time_limit - (time.time() - start_time)
+            if remaining_time <= 0:
+                break
+            step_options['TIME_LIMIT'] = remaining_time
+        if len(attempts) > 0:
+            print('Trying to solve again with ' + step['NAME'])
+        step_status = solve(step_options, step['NUMERIC_FOCUS'], step['RESCALE'])
+        if step_status is None:
+            continue
+        status = step_status
+        attempts.append(step['NAME'])
+        tried.append(mapped_options)
+        print(status)
+        if status in ['optimal', 'user_limit']:
+            break
+    return status, attempts
+
+#%%
+def limit_objectives(solver, extra_stats, objective):
+    # [best objective, best bound] of a solve that stopped at a limit, where <objective> is the
+    # objective value it stopped at. None where the solver has no feasible primal (dual) solution
+    # or does not say. HiGHS often has neither when it stops inside its presolved problem.
+    best, bound = None, None
+    solver = str.upper(solver)
+    if extra_stats is None or objective is None:
+        return [best, bound]
+    if solver == 'HIGHS':
+        if extra_stats.primal_solution_status == 2:  # kSolutionStatusFeasible
+            best = objective
+        if extra_stats.dual_solution_status == 2:
+            bound = objective
+    elif solver == 'GUROBI':
+        if extra_stats.SolCount > 0:
+            best = objective
+        try:
+            bound = extra_stats.ObjBound + objective - extra_stats.ObjVal
+        except Exception:   # not available for LPs stopped before the end
+            pass
+    return [best, bound]
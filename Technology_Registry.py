@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+
+Technology_Registry.py
+
+Descriptors of the technologies in the Simple Energy Model.
+
+Preprocess_Input.py (keywords, system components, capacity factor files, CO2
+price), the model engines, Model_Results.py, Save_Basic_Results.py and
+Quick_Look.py all work from <technology_registry>, so a new technology class,
+e.g., a third wind class with its own capacity factor file, only needs a new
+line here:
+
+    generator('WIND3', 'WIND', 'wind3', 'navy', series = True),
+
+Technologies of the same KIND and FAMILY (e.g. WIND and WIND2) share one
+(classes x hours) dispatch variable in <core_model>.
+
+Each descriptor is a dictionary with:
+
+    'NAME'          -- component name in SYSTEM_COMPONENTS, e.g. 'WIND2'
+    'KIND'          -- GENERATOR, STORAGE, PGP_STORAGE, CSP or UNMET_DEMAND
+    'FAMILY'        -- e.g. 'WIND' for WIND and WIND2
+    'STORAGE'       -- True if the technology stores energy
+    'SERIES'        -- key of the capacity factor series, None if there is none
+    'SERIES_FILE'   -- keyword of the file with the capacity factor series
+    'BOUNDED'       -- capacity rule: if True, capacity <= max demand
+    'CURTAILMENT'   -- if True, CURTAILMENT_<name> = capacity * series - CURTAILMENT_KEY
+    'CURTAILMENT_KEY' -- the time series that is curtailed, None if there is no curtailment
+    'REQUIRED_KEYS' -- the technology is in the system if all of these are >= 0
+    'CO2_KEYS'      -- cost key -> CO2 key; CO2_PRICE * CO2 key is added to the cost
+    'KEYWORDS_SCALED', 'KEYWORDS_NOTSCALED', 'KEYWORDS_STR'
+                    -- keywords in the case input file (see Preprocess_Input.py)
+    'CAPACITY_KEYS' -- capacity result keys
+    'FIXED_COSTS'   -- [capacity key, fixed cost key] pairs of the fixed costs in the objective
+    'VAR_COSTS'     -- [time series key, variable cost key] pairs of the variable costs
+    'VECTOR_KEYS'   -- time series result keys
+    'DISPATCH_KEY'  -- time series of electricity to the grid
+    'CHARGE_KEY'    -- time series of electricity from the grid (storage), else None
+    'INPUT_COLUMNS', 'RESULT_COLUMNS', 'VECTOR_COLUMNS'
+                    -- [header, key] of the columns written by Save_Basic_Results.py
+    'LABEL'         -- name in output files
+    'COLOR'         -- color in Quick_Look.py plots
+
+"""
+
+#%%
+def generator(name, family, label, color, series = False, bounded = False, curtailment = None):
+    # A generator with capacity CAPACITY_<name> and dispatch DISPATCH_<name>.
+    # With <series>, its capacity factor is read from <name>_CAPACITY_FILE.
+    series_key = name + '_SERIES' if series else None
+    if curtailment is None:
+        curtailment = series
+    input_columns = [
+            ['fixed cost ' + label + ' ($/kW/h)', 'FIXED_COST_' + name],
+            ['var cost ' + label + ' ($/kW/h)', 'VAR_COST_' + name]
+            ]
+    if series:
+        input_columns += [
+                [label + ' file', name + '_CAPACITY_FILE'],
+                ['cap factor ' + label + ' (-)', series_key]
+                ]
+    result_columns = [
+            ['capacity ' + label + ' (kW)', 'CAPACITY_' + name],
+            ['dispatch ' + label + ' (kW)', 'DISPATCH_' + name]
+            ]
+    if curtailment:
+        result_columns += [['curtailment ' + label + ' (kW)', 'CURTAILMENT_' + name]]
+    return {
+            'NAME':name, 'KIND':'GENERATOR', 'FAMILY':family, 'STORAGE':False,
+            'SERIES':series_key,
+            'SERIES_FILE':name + '_CAPACITY_FILE' if series else None,
+            'BOUNDED':bounded,
+            'CURTAILMENT':curtailment,
+            'CURTAILMENT_KEY':'DISPATCH_' + name if curtailment else None,
+            'REQUIRED_KEYS':['FIXED_COST_' + name, 'VAR_COST_' + name],
+            'CO2_KEYS':{'FIXED_COST_' + name:'FIXED_CO2_' + name, 'VAR_COST_' + name:'VAR_CO2_' + name},
+            'KEYWORDS_SCALED':['FIXED_COST_' + name, 'VAR_COST_' + name, 'FIXED_CO2_' + name, 'VAR_CO2_' + name],
+            'KEYWORDS_NOTSCALED':['CAPACITY_' + name],
+            'KEYWORDS_STR':[name + '_CAPACITY_FILE'] if series else [],
+            'CAPACITY_KEYS':['CAPACITY_' + name],
+            'FIXED_COSTS':[['CAPACITY_' + name, 'FIXED_COST_' + name]],
+            'VAR_COSTS':[['DISPATCH_' + name, 'VAR_COST_' + name]],
+            'VECTOR_KEYS':['DISPATCH_' + name],
+            'DISPATCH_KEY':'DISPATCH_' + name,
+            'CHARGE_KEY':None,
+            'INPUT_COLUMNS':input_columns,
+            'RESULT_COLUMNS':result_columns,
+            'VECTOR_COLUMNS':[['dispatch ' + label + ' (kW)', 'DISPATCH_' + name]],
+            'LABEL':label,
+            'COLOR':color
+            }
+
+def storage(name, label, color):
+    # A storage technology with energy capacity CAPACITY_<name> that is charged and
+    # discharged at most at CAPACITY_<name> / CHARGING_TIME_<name>
+    return {
+            'NAME':name, 'KIND':'STORAGE', 'FAMILY':'STORAGE', 'STORAGE':True,
+            'SERIES':None, 'SERIES_FILE':None, 'BOUNDED':False,
+            'CURTAILMENT':False, 'CURTAILMENT_KEY':None,
+            'REQUIRED_KEYS':['FIXED_COST_' + name, 'VAR_COST_TO_' + name, 'VAR_COST_FROM_' + name,
+                             'CHARGING_EFFICIENCY_' + name, 'DECAY_RATE_' + name, 'CHARGING_TIME_' + name],
+            'CO2_KEYS':{},
+            'KEYWORDS_SCALED':['FIXED_COST_' + name, 'VAR_COST_' + name,
+                               'VAR_COST_TO_' + name, 'VAR_COST_FROM_' + name],
+            'KEYWORDS_NOTSCALED':['CAPACITY_' + name, 'CHARGING_TIME_' + name,
+                                  'CHARGING_EFFICIENCY_' + name, 'DECAY_RATE_' + name],
+            'KEYWORDS_STR':[],
+            'CAPACITY_KEYS':['CAPACITY_' + name],
+            'FIXED_COSTS':[['CAPACITY_' + name, 'FIXED_COST_' + name]],
+            'VAR_COSTS':[['DISPATCH_TO_' + name, 'VAR_COST_TO_' + name], ['DISPATCH_FROM_' + name, 'VAR_COST_FROM_' + name]],
+            'VECTOR_KEYS':['DISPATCH_TO_' + name, 'DISPATCH_FROM_' + name, 'ENERGY_' + name],
+            'DISPATCH_KEY':'DISPATCH_FROM_' + name,
+            'CHARGE_KEY':'DISPATCH_TO_' + name,
+            'INPUT_COLUMNS':[
+                    ['fixed cost ' + label + ' ($/kWh/h)', 'FIXED_COST_' + name],
+                    ['var cost ' + label + ' ($/kWh/h)', 'VAR_COST_' + name],
+                    [label + ' charging efficiency', 'CHARGING_EFFICIENCY_' + name],
+                    [label + ' charging time (h)', 'CHARGING_TIME_' + name],
+                    [label + ' decay rate (1/h))', 'DECAY_RATE_' + name]
+                    ],
+            'RESULT_COLUMNS':[
+                    ['capacity ' + label + ' (kW)', 'CAPACITY_' + name],
+                    ['energy ' + label + ' (kW)', 'ENERGY_' + name],
+                    ['dispatch to ' + label + ' (kW)', 'DISPATCH_TO_' + name],
+                    ['dispatch from ' + label + ' (kW)', 'DISPATCH_FROM_' + name]
+                    ],
+            'VECTOR_COLUMNS':[
+                    ['dispatch to ' + label + ' (kW)', 'DISPATCH_TO_' + name],
+                    ['dispatch from ' + label + ' (kW)', 'DISPATCH_FROM_' + name],
+                    ['energy ' + label + ' (kWh)', 'ENERGY_' + name]
+                    ],
+            'LABEL':label,
+            'COLOR':color
+            }
+
+#%%
+# Order of the technologies in SYSTEM_COMPONENTS and in the output files
+technology_registry = [
+        generator('NATGAS', 'NATGAS', 'natgas', 'red', bounded = True),
+        generator('NATGAS_CCS', 'NATGAS_CCS', 'natgas ccs', 'brown', bounded = True),
+        generator('SOLAR', 'SOLAR', 'solar', 'orange', series = True),
+        generator('WIND', 'WIND', 'wind', 'blue', series = True),
+        generator('SOLAR2', 'SOLAR', 'solar2', 'orangered', series = True),
+        generator('WIND2', 'WIND', 'wind2', 'darkblue', series = True),
+        generator('NUCLEAR', 'NUCLEAR', 'nuclear', 'green', bounded = True, curtailment = True),
+        storage('STORAGE', 'storage', 'purple'),
+        storage('STORAGE2', 'storage2', 'violet'),
+        {
+            'NAME':'PGP_STORAGE', 'KIND':'PGP_STORAGE', 'FAMILY':'PGP_STORAGE', 'STORAGE':True,
+            'SERIES':None, 'SERIES_FILE':None, 'BOUNDED':False,
+            'CURTAILMENT':False, 'CURTAILMENT_KEY':None,
+            'REQUIRED_KEYS':['FIXED_COST_PGP_STORAGE', 'FIXED_COST_TO_PGP_STORAGE', 'VAR_COST_TO_PGP_STORAGE',
+                             'FIXED_COST_FROM_PGP_STORAGE', 'VAR_COST_FROM_PGP_STORAGE',
+                             'DECAY_RATE_PGP_STORAGE', 'CHARGING_EFFICIENCY_PGP_STORAGE'],
+            'CO2_KEYS':{},
+            'KEYWORDS_SCALED':['FIXED_COST_PGP_STORAGE', 'FIXED_COST_TO_PGP_STORAGE', 'FIXED_COST_FROM_PGP_STORAGE',
+                               'VAR_COST_TO_PGP_STORAGE', 'VAR_COST_FROM_PGP_STORAGE'],
+            'KEYWORDS_NOTSCALED':['CAPACITY_PGP_STORAGE', 'CAPACITY_TO_PGP_STORAGE', 'CAPACITY_FROM_PGP_STORAGE',
+                                  'CHARGING_EFFICIENCY_PGP_STORAGE', 'DECAY_RATE_PGP_STORAGE'],
+            'KEYWORDS_STR':[],
+            'CAPACITY_KEYS':['CAPACITY_PGP_STORAGE', 'CAPACITY_TO_PGP_STORAGE', 'CAPACITY_FROM_PGP_STORAGE'],
+            'FIXED_COSTS':[['CAPACITY_PGP_STORAGE', 'FIXED_COST_PGP_STORAGE'],
+                           ['CAPACITY_TO_PGP_STORAGE', 'FIXED_COST_TO_PGP_STORAGE'],
+                           ['CAPACITY_FROM_PGP_STORAGE', 'FIXED_COST_FROM_PGP_STORAGE']],
+            'VAR_COSTS':[['DISPATCH_TO_PGP_STORAGE', 'VAR_COST_TO_PGP_STORAGE'],
+                         ['DISPATCH_FROM_PGP_STORAGE', 'VAR_COST_FROM_PGP_STORAGE']],
+            'VECTOR_KEYS':['DISPATCH_TO_PGP_STORAGE', 'DISPATCH_FROM_PGP_STORAGE', 'ENERGY_PGP_STORAGE'],
+            'DISPATCH_KEY':'DISPATCH_FROM_PGP_STORAGE',
+            'CHARGE_KEY':'DISPATCH_TO_PGP_STORAGE',
+            'INPUT_COLUMNS':[
+                    ['fixed cost pgp storage ($/kWh/h)', 'FIXED_COST_PGP_STORAGE'],
+                    ['fixed cost to pgp storage ($/kW/h)', 'FIXED_COST_TO_PGP_STORAGE'],
+                    ['fixed cost from pgp storage ($/kW/h)', 'FIXED_COST_FROM_PGP_STORAGE'],
+                    ['var cost to pgp storage ($/kW/h)', 'VAR_COST_TO_PGP_STORAGE'],
+                    ['var cost from pgp storage ($/kW/h)', 'VAR_COST_FROM_PGP_STORAGE'],
+                    ['pgp storage charging efficiency', 'CHARGING_EFFICIENCY_PGP_STORAGE'],
+                    ['pgp storage decay rate (1/h))', 'DECAY_RATE_PGP_STORAGE']
+                    ],
+            'RESULT_COLUMNS':[
+                    ['capacity pgp storage (kW)', 'CAPACITY_PGP_STORAGE'],
+                    ['capacity to pgp storage (kW)', 'CAPACITY_TO_PGP_STORAGE'],
+                    ['capacity from pgp storage (kW)', 'CAPACITY_FROM_PGP_STORAGE'],
+                    ['energy pgp storage (kW)', 'ENERGY_PGP_STORAGE'],
+                    ['dispatch to pgp storage (kW)', 'DISPATCH_TO_PGP_STORAGE'],
+                    ['dispatch from pgp storage (kW)', 'DISPATCH_FROM_PGP_STORAGE']
+                    ],
+            'VECTOR_COLUMNS':[
+                    ['dispatch to pgp storage (kW)', 'DISPATCH_TO_PGP_STORAGE'],
+                    ['dispatch pgp storage (kW)', 'DISPATCH_FROM_PGP_STORAGE'],
+                    ['energy pgp storage (kWh)', 'ENERGY_PGP_STORAGE']
+                    ],
+            'LABEL':'pgp storage',
+            'COLOR':'pink'
+            },
+        {
+            'NAME':'CSP', 'KIND':'CSP', 'FAMILY':'CSP', 'STORAGE':True,
+            'SERIES':'CSP_SERIES', 'SERIES_FILE':'CSP_CAPACITY_FILE', 'BOUNDED':False,
+            # curtailment is relative to what goes into CSP storage
+            'CURTAILMENT':True, 'CURTAILMENT_KEY':'DISPATCH_TO_CSP_STORAGE',
+            'REQUIRED_KEYS':['FIXED_COST_CSP', 'VAR_COST_CSP', 'FIXED_COST_CSP_STORAGE', 'VAR_COST_CSP_STORAGE',
+                             'DECAY_RATE_CSP_STORAGE', 'CHARGING_EFFICIENCY_CSP_STORAGE'],
+            'CO2_KEYS':{},
+            'KEYWORDS_SCALED':['FIXED_COST_CSP', 'VAR_COST_CSP', 'FIXED_COST_CSP_STORAGE', 'VAR_COST_CSP_STORAGE'],
+            'KEYWORDS_NOTSCALED':['CAPACITY_CSP', 'CAPACITY_CSP_STORAGE',
+                                  'DECAY_RATE_CSP_STORAGE', 'CHARGING_EFFICIENCY_CSP_STORAGE'],
+            'KEYWORDS_STR':['CSP_CAPACITY_FILE'],
+            'CAPACITY_KEYS':['CAPACITY_CSP', 'CAPACITY_CSP_STORAGE'],
+            'FIXED_COSTS':[['CAPACITY_CSP', 'FIXED_COST_CSP'], ['CAPACITY_CSP_STORAGE', 'FIXED_COST_CSP_STORAGE']],
+            'VAR_COSTS':[['DISPATCH_FROM_CSP', 'VAR_COST_CSP'], ['ENERGY_CSP_STORAGE', 'VAR_COST_CSP_STORAGE']],
+            'VECTOR_KEYS':['DISPATCH_TO_CSP_STORAGE', 'DISPATCH_FROM_CSP', 'ENERGY_CSP_STORAGE'],
+            'DISPATCH_KEY':'DISPATCH_FROM_CSP',
+            'CHARGE_KEY':None,
+            'INPUT_COLUMNS':[
+                    ['fixed cost csp ($/kW/h)', 'FIXED_COST_CSP'],
+                    ['var cost csp ($/kW/h)', 'VAR_COST_CSP'],
+                    ['fixed cost csp storage ($/kWh/h)', 'FIXED_COST_CSP_STORAGE'],
+                    ['var cost csp storage ($/kWh/h)', 'VAR_COST_CSP_STORAGE'],
+                    ['csp charging efficiency', 'CHARGING_EFFICIENCY_CSP_STORAGE'],
+                    ['csp storage decay rate (1/h))', 'DECAY_RATE_CSP_STORAGE'],
+                    ['csp file', 'CSP_CAPACITY_FILE'],
+                    ['cap factor csp (-)', 'CSP_SERIES']
+                    ],
+            'RESULT_COLUMNS':[
+                    ['capacity csp (kW)', 'CAPACITY_CSP'],
+                    ['capacity csp storage (kW)', 'CAPACITY_CSP_STORAGE'],
+                    ['energy csp storage (kW)', 'ENERGY_CSP_STORAGE'],
+                    ['dispatch to csp storage (kW)', 'DISPATCH_TO_CSP_STORAGE'],
+                    ['dispatch from csp (kW)', 'DISPATCH_FROM_CSP'],
+                    ['curtailment csp (kW)', 'CURTAILMENT_CSP']
+                    ],
+            'VECTOR_COLUMNS':[
+                    ['dispatch to csp storage (kW)', 'DISPATCH_TO_CSP_STORAGE'],
+                    ['dispatch from csp storage (kW)', 'DISPATCH_FROM_CSP'],
+                    ['energy csp storage (kWh)', 'ENERGY_CSP_STORAGE']
+                    ],
+            'LABEL':'csp',
+            'COLOR':'yellow'
+            },
+        {
+            'NAME':'UNMET_DEMAND', 'KIND':'UNMET_DEMAND', 'FAMILY':'UNMET_DEMAND', 'STORAGE':False,
+            'SERIES':None, 'SERIES_FILE':None, 'BOUNDED':False,
+            'CURTAILMENT':False, 'CURTAILMENT_KEY':None,
+            'REQUIRED_KEYS':['VAR_COST_UNMET_DEMAND'],
+            'CO2_KEYS':{},
+            'KEYWORDS_SCALED':['VAR_COST_UNMET_DEMAND'],
+            'KEYWORDS_NOTSCALED':[],
+            'KEYWORDS_STR':[],
+            'CAPACITY_KEYS':[],
+            'FIXED_COSTS':[],
+            'VAR_COSTS':[['DISPATCH_UNMET_DEMAND', 'VAR_COST_UNMET_DEMAND']],
+            'VECTOR_KEYS':['DISPATCH_UNMET_DEMAND'],
+            'DISPATCH_KEY':'DISPATCH_UNMET_DEMAND',
+            'CHARGE_KEY':None,
+            'INPUT_COLUMNS':[['var cost unmet demand ($/kWh)', 'VAR_COST_UNMET_DEMAND']],
+            'RESULT_COLUMNS':[['dispatch unmet demand (kW)', 'DISPATCH_UNMET_DEMAND']],
+            'VECTOR_COLUMNS':[['dispatch unmet demand (kW)', 'DISPATCH_UNMET_DEMAND']],
+            'LABEL':'unmet demand',
+            'COLOR':'gray'
+            }
+        ]
+
+technology_dic = {technology['NAME']:technology for technology in technology_registry}
+
+#%%
+def technologies(kind = None, system_components = None):
+    # Descriptors of the technologies of <kind> (all kinds if None) that are in
+    # <system_components> (all technologies if None), in registry order
+    return [technology for technology in technology_registry
+            if (kind is None or technology['KIND'] == kind) and
+               (system_components is None or technology['NAME'] in system_components)]
+
+def technology_families(kind, system_components):
+    # [[family, [descriptors of the classes in the family]], ...] for the technologies
+    # of <kind> in <system_components>, in registry order
+    families = []
+    for technology in technologies(kind, system_components):
+        if len(families) == 0 or families[-1][0] != technology['FAMILY']:
+            matching = [family for family in families if family[0] == technology['FAMILY']]
+            if len(matching) > 0:
+                matching[0][1].append(technology)
+                continue
+            families.append([technology['FAMILY'], []])
+        families[-1][1].append(technology)
+    return families
+
+def registry_keys(field):
+    # e.g. registry_keys('CAPACITY_KEYS') -> all capacity result keys, in registry order
+    return [key for technology in technology_registry for key in technology[field]]
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+
+Time_Aggregation.py
+
+Coarser time steps and representative days, for runs over many years of
+hourly data.
+
+With TIME_STEP_HOURS = h (a case keyword, default -1 = hourly), <coarsen_case>
+averages demand and the capacity factor series over steps of h hours before
+core_model. Dispatch variables stay in kW (averages over the step), so costs,
+prices and power limits need no change. Stored energy is counted in units of
+h hours of kW: the energy capacities, the costs per kWh of storage capacity
+and the charging times are scaled by h (1/h for energy capacities and charging
+times, so capacity / charging time stays the same power), and the decay rates
+become the decay over h hours. <refine_result> scales the energies back and
+repeats each step h times, so the output writers see hourly results.
+
+With REPRESENTATIVE_DAYS = N (a case keyword, default -1 = off), each case is
+aggregated between preprocess_input and core_model (see core_model_loop):
+
+    <aggregate_case> clusters the days of the case with k-means on their daily
+    profiles of demand and of all capacity factor series of the case (each
+    normalized by its mean). The LP is then solved over the N cluster means
+    only, each hour weighted by the number of days in its cluster. The day
+    with the highest demand is always a cluster of its own, so the LP sees the
+    peak. Cluster means keep the total demand and the mean capacity factors
+    of the full series.
+
+    Storage stays chronological (add_day_linked_storage in Core_Model.py).
+    The state of charge within a representative day is relative to the start
+    of that day. A state of charge for the start of every day of the full
+    series is chained through all days by what each day's representative day
+    adds, so STORAGE and PGP_STORAGE can still move energy between seasons.
+    CSP storage holds hours of energy and is cyclic within each day.
+
+    <expand_result> maps the results back to the full chronology (each day
+    gets the dispatch and price of its representative day, the state of
+    charge is rebuilt from the chain), so the output writers work as before.
+
+Both can be combined (h has to divide 24). The LP has about 1/h and about
+N/days of the size of the full one. The error made is reported:
+
+    AGGREGATION_SERIES_ERROR -- largest RMS error of the representative days'
+                                input series, relative to the mean of the series
+    AGGREGATION_COST_ERROR   -- relative error in system cost, and
+    AGGREGATION_CAPACITY_ERROR  largest error in a capacity (kW, kWh for storage)
+                                per kW of mean demand,
+                                compared with the case solved at full resolution.
+                                Only with TIME_AGGREGATION_CHECK = true, since that
+                                solves the case a second time at full resolution.
+
+Only the CVXPY engine has representative days; DIRECT cases with
+REPRESENTATIVE_DAYS are run with CVXPY. Both engines take TIME_STEP_HOURS.
+
+"""
+
+import numpy as np
+
+from Technology_Registry import technology_registry, technologies
+from Model_Results import capacity_result_keys
+
+hours_per_day = 24
+
+#%%
+def series_keys(case_dic):
+    # the time series of the case: demand and the capacity factors of its technologies
+    return ['DEMAND_SERIES'] + [technology['SERIES'] for technology in technology_registry
+                                if technology['SERIES'] is not None and len(case_dic[technology['SERIES']]) > 0]
+
+def steps_per_day(case_dic):
+    # time steps of a day, with TIME_STEP_HOURS
+    if case_dic['TIME_STEP_HOURS'] > 1:
+        return hours_per_day // int(case_dic['TIME_STEP_HOURS'])
+    return hours_per_day
+
+def kmeans(data, num_clusters, seed = 0, max_iterations = 300):
+    # Lloyd's algorithm from k-means++ starting centers; returns the cluster of each row of <data>
+    random_state = np.random.RandomState(seed)
+    centers = data[[random_state.randint(len(data))]]
+    while len(centers) < num_clusters:
+        distance = np.min(squared_distances(data, centers), axis = 1)
+        if np.sum(distance) == 0:
+            break   # fewer distinct days than clusters
+        centers = np.vstack([centers, data[random_state.choice(len(data), p = distance/np.sum(distance))]])
+    labels = None
+    for iteration in range(max_iterations):
+        new_labels = np.argmin(squared_distances(data, centers), axis = 1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for cluster in range(len(centers)):
+            if np.any(labels == cluster):
+                centers[cluster] = np.mean(data[labels == cluster], axis = 0)
+    return np.unique(labels, return_inverse = True)[1]   # numbered 0, 1, ... without empty clusters
+
+def squared_distances(data, centers):
+    # (rows of data x centers), without the (rows x centers x columns) intermediate
+    return np.maximum(np.sum(data**2, axis = 1)[:,np.newaxis] - 2 * data @ centers.T +
+                      np.sum(centers**2, axis = 1)[np.newaxis,:], 0.)
+
+#%%
+def stored_energy_names(case_dic):
+    # e.g. STORAGE, PGP_STORAGE, CSP_STORAGE: the names in ENERGY_<name> of the storage in the case
+    return [key[len('ENERGY_'):] for technology in technologies(system_components = case_dic['SYSTEM_COMPONENTS'])
+            if technology['STORAGE'] for key in technology['VECTOR_KEYS'] if key.startswith('ENERGY_')]
+
+def coarsen_case(case_dic):
+    # Returns a copy of <case_dic> with time steps of TIME_STEP_HOURS hours
+    step = int(case_dic['TIME_STEP_HOURS'])
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    if num_time_periods % step != 0:
+        raise ValueError('Time_Aggregation.py: TIME_STEP_HOURS = ' + str(step) + ' does not divide the ' +
+                         str(num_time_periods) + ' hours of case ' + case_dic['CASE_NAME'])
+    coarse_case_dic = dict(case_dic)
+    for key in series_keys(case_dic):
+        coarse_case_dic[key] = np.mean(np.reshape(np.array(case_dic[key], dtype = float), (-1, step)), axis = 1)
+    coarse_case_dic['YEAR_SERIES'] = np.asarray(case_dic['YEAR_SERIES'])[::step]
+    # stored energy in units of <step> hours of kW
+    for name in stored_energy_names(case_dic):
+        coarse_case_dic['DECAY_RATE_' + name] = 1. - (1. - case_dic['DECAY_RATE_' + name])**step
+        for key in ['FIXED_COST_' + name, 'VAR_COST_' + name]:
+            if key in case_dic:
+                coarse_case_dic[key] = case_dic[key] * step
+        for key in ['CAPACITY_' + name, 'CHARGING_TIME_' + name]:
+            if key in case_dic and case_dic[key] > 0:   # fixed capacity
+                coarse_case_dic[key] = case_dic[key] / step
+    return coarse_case_dic
+
+def refine_result(case_dic, coarse_case_dic, result):
+    # Maps the results for <coarse_case_dic> back to the hours of <case_dic>
+    step = int(case_dic['TIME_STEP_HOURS'])
+    num_steps = len(coarse_case_dic['DEMAND_SERIES'])
+    for key in list(result):
+        if isinstance(result[key], np.ndarray) and len(result[key]) == num_steps:
+            result[key] = np.repeat(result[key], step)
+    if result['SYSTEM_COST'] >= 0:   # not a failed_result
+        for name in stored_energy_names(case_dic):
+            result['ENERGY_' + name] = result['ENERGY_' + name] * step
+            result['CAPACITY_' + name] = result['CAPACITY_' + name] * step
+    result['TIME_STEP_HOURS'] = step
+
+#%%
+def aggregate_case(case_dic):
+    # Returns a copy of <case_dic> with the series of N representative days and
+    #   DAY_MAP       -- representative day of each day of the full series
+    #   HOUR_WEIGHTS  -- number of days each representative day stands for, for each of its hours
+    #   HOURS_PER_DAY -- time steps per day
+    num_representative_days = int(case_dic['REPRESENTATIVE_DAYS'])
+    num_time_periods = len(case_dic['DEMAND_SERIES'])
+    day_length = steps_per_day(case_dic)
+    if num_time_periods % day_length != 0 or day_length * max(case_dic['TIME_STEP_HOURS'], 1) != hours_per_day:
+        raise ValueError('Time_Aggregation.py: REPRESENTATIVE_DAYS needs whole days, case ' +
+                         case_dic['CASE_NAME'] + ' has ' + str(num_time_periods) + ' time steps of ' +
+                         str(max(case_dic['TIME_STEP_HOURS'], 1)) + ' hours')
+    num_days = num_time_periods // day_length
+    keys = series_keys(case_dic)
+    daily = {key: np.reshape(np.array(case_dic[key], dtype = float), (num_days, day_length)) for key in keys}
+
+    # features: daily profiles of all series, each relative to its mean
+    features = np.hstack([daily[key] / (np.mean(daily[key]) if np.mean(daily[key]) > 0 else 1.) for key in keys])
+
+    # the peak demand day is a cluster of its own, the other days are clustered by k-means
+    peak_day = np.argmax(np.max(daily['DEMAND_SERIES'], axis = 1))
+    other_days = np.array([day for day in range(num_days) if day != peak_day])
+    day_map = np.zeros(num_days, dtype = int)
+    if num_representative_days >= num_days:
+        day_map = np.arange(num_days)
+    elif num_representative_days > 1:
+        day_map[other_days] = kmeans(features[other_days], num_representative_days - 1)
+        day_map[peak_day] = np.max(day_map[other_days]) + 1
+    num_representative_days = np.max(day_map) + 1
+    day_weights = np.bincount(day_map, minlength = num_representative_days).astype(float)
+
+    aggregated_case_dic = dict(case_dic)
+    for key in keys:
+        representative = np.array([np.mean(daily[key][day_map == cluster], axis = 0)
+                                   for cluster in range(num_representative_days)])
+        aggregated_case_dic[key] = representative.flatten()
+    aggregated_case_dic['DAY_MAP'] = day_map
+    aggregated_case_dic['HOUR_WEIGHTS'] = np.repeat(day_weights, day_length)
+    aggregated_case_dic['HOURS_PER_DAY'] = day_length
+
+    # error of the aggregated series
+    series_errors = [np.sqrt(np.mean((expand_series(aggregated_case_dic[key], day_map, day_length) - np.array(case_dic[key]))**2)) /
+                     np.mean(case_dic[key]) for key in keys if np.mean(case_dic[key]) > 0]
+    aggregated_case_dic['AGGREGATION_SERIES_ERROR'] = max(series_errors) if len(series_errors) > 0 else 0.
+    return aggregated_case_dic
+
+#%%
+def expand_series(values, day_map, day_length):
+    # series over the representative days -> series over all days of the full series
+    return np.reshape(values, (-1, day_length))[day_map].flatten()
+
+def expand_result(case_dic, aggregated_case_dic, result):
+    # Maps the vectors in <result> (solved for <aggregated_case_dic>) to the full series of <case_dic>
+    day_map = aggregated_case_dic['DAY_MAP']
+    day_length = aggregated_case_dic['HOURS_PER_DAY']
+    num_representative_hours = len(aggregated_case_dic['DEMAND_SERIES'])
+    interday_keys = [key for key in result if key.startswith('INTERDAY_')]
+    for key in list(result):
+        if key in interday_keys or not isinstance(result[key], np.ndarray) or len(result[key]) != num_representative_hours:
+            continue
+        energy_start = 'INTERDAY_' + key
+        if energy_start in interday_keys:
+            # state of charge = start of the day, decayed, + relative state of charge of its representative day
+            retention = (1. - case_dic['DECAY_RATE_' + key[len('ENERGY_'):]])**np.arange(day_length)
+            result[key] = (result[energy_start][:,np.newaxis] * retention[np.newaxis,:] +
+                           np.reshape(result[key], (-1, day_length))[day_map]).flatten()
+        else:
+            result[key] = expand_series(result[key], day_map, day_length)
+    for key in interday_keys:   # only some cases have them, the writers need the same keys in all cases
+        del result[key]
+    result['REPRESENTATIVE_DAYS'] = np.max(day_map) + 1
+    result['AGGREGATION_SERIES_ERROR'] = aggregated_case_dic['AGGREGATION_SERIES_ERROR']
+
+def compare_to_full_resolution(case_dic, result, full_result):
+    # errors of the representative days' result against the case solved at full resolution
+    if full_result['PROBLEM_STATUS'] != 'optimal' or result['PROBLEM_STATUS'] != 'optimal':
+        return
+    mean_demand = np.mean(case_dic['DEMAND_SERIES'])
+    result['AGGREGATION_COST_ERROR'] = (result['SYSTEM_COST'] - full_result['SYSTEM_COST']) / full_result['SYSTEM_COST']
+    result['AGGREGATION_CAPACITY_ERROR'] = max(abs(result[key] - full_result[key]) for key in capacity_result_keys) / mean_demand
+    result['FULL_RESOLUTION_MODEL_SIZE'] = full_result['MODEL_SIZE']
+    result['FULL_RESOLUTION_SOLVE_TIME'] = full_result['SOLVE_TIME']
+
+def no_time_aggregation():
+    # result entries of a case solved hourly over all days
+    return {
+            'TIME_STEP_HOURS':              1,
+            'REPRESENTATIVE_DAYS':          -1,
+            'AGGREGATION_SERIES_ERROR':     -1,
+            'AGGREGATION_COST_ERROR':       -1,
+            'AGGREGATION_CAPACITY_ERROR':   -1,
+            'FULL_RESOLUTION_MODEL_SIZE':   [-1, -1, -1],
+            'FULL_RESOLUTION_SOLVE_TIME':   -1
+            }
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+
+Work_Queue.py
+
+Cases solved by any number of worker processes on any number of nodes that
+share a file system, without a scheduler.
+
+With WORK_QUEUE = true (global section of the case input file),
+preprocess_input writes one task file for each case (for each chain of cases
+with SWEEP_WARM_START, see case_chains in Core_Model.py) to the folder
+OUTPUT_PATH/GLOBAL_NAME/queue, if there is none yet. Every run of
+
+    python Simple_Energy_Model.py case.csv
+
+is then a worker. It claims a task by renaming its file to queue/claimed
+(a rename is atomic, so only one worker gets it), solves and saves its cases
+as core_model_loop does, and renames the file to queue/done. Workers take
+tasks until there are none left, so a node that gets the long cases solves
+fewer of them: start as many workers as the nodes have room for (with
+SOLVER_THREADS to share the cores of a node), at any time. Each worker takes
+the task with the longest predicted time first (see Scheduler.py).
+
+The lease of a claimed task is the time of its file, which the worker
+touches every QUEUE_LEASE_SECONDS / 4 while it solves. A task is taken back
+into the queue when its lease is older than QUEUE_LEASE_SECONDS (default
+1800), or at once when its worker ran on the same node and is gone. A task
+that was claimed QUEUE_MAX_ATTEMPTS times (default 3) without being done,
+e.g. because it kills its worker, goes to queue/failed.
+
+When all tasks are done or failed, the first worker that claims the file
+queue/summary writes the summary CSV files and the Quick_Look PDFs
+of all cases, as a run without a queue would; if tasks failed, it lists them
+and writes nothing. The others stop. To solve the cases again, delete the
+queue folder.
+
+Cases in the queue are solved one by one: PARAMETRIC_SWEEP and ADAPTIVE_SWEEP,
+which solve the cases of a sweep together, and WORKERS are not used.
+
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+from Core_Model import case_chains, solve_chain
+from Scheduler import longest_first
+
+poll_seconds = 10.      # time between looks at the queue while other workers solve the last tasks
+
+#%%
+def queue_folder(global_dic, state = ''):
+    # the folder of the tasks in <state> ('' = waiting, 'claimed', 'done', 'failed')
+    folder = global_dic['OUTPUT_PATH'] + '/' + global_dic['GLOBAL_NAME'] + '/queue'
+    if state:
+        folder += '/' + state
+    return folder
+
+def task_name(chain):
+    # the file name of the task of <chain> ([solve index, case index]), by its first case
+    return 'task_' + str(chain[0][1]).zfill(5)
+
+def write_file(file_name, data):
+    # written to a hidden file and renamed, so no worker reads half a file
+    folder, name = os.path.split(file_name)
+    temporary_file_name = folder + '/.' + name + '.' + socket.gethostname() + '_' + str(os.getpid())
+    with open(temporary_file_name, 'w') as task_file:
+        json.dump(data, task_file)
+    os.replace(temporary_file_name, file_name)
+
+def read_task(file_name):
+    with open(file_name) as task_file:
+        return json.load(task_file)
+
+#%%
+def write_queue(global_dic, case_dic_list):
+    # One task file per chain of cases and the summary file, unless the queue has them already
+    for state in ['claimed', 'done', 'failed']:
+        os.makedirs(queue_folder(global_dic, state), exist_ok = True)
+    num_tasks = 0
+    for chain in case_chains(global_dic, case_dic_list):
+        name = task_name(chain)
+        # in the order in which a task moves on, so that a task that moves while we look is seen
+        if os.path.exists(queue_folder(global_dic) + '/' + name) \
+                or any(file_name.split('@')[0] == name for file_name in claimed_tasks(global_dic)) \
+                or finished(global_dic, name):
+            continue
+        write_file(queue_folder(global_dic) + '/' + name,
+                   {'CHAIN':chain, 'CASE_NAMES':[case_dic_list[case_index]['CASE_NAME'] for solve_index, case_index in chain],
+                    'ATTEMPTS':0})
+        num_tasks += 1
+    if not (os.path.exists(queue_folder(global_dic) + '/summary') or os.path.exists(queue_folder(global_dic, 'done') + '/summary')):
+        write_file(queue_folder(global_dic) + '/summary', {})
+    if global_dic['VERBOSE']:
+        print ('Work_Queue.py: ',num_tasks,' new tasks in ',queue_folder(global_dic))
+
+def waiting_tasks(global_dic):
+    return sorted(file_name for file_name in os.listdir(queue_folder(global_dic)) if file_name.startswith('task_'))
+
+def claimed_tasks(global_dic):
+    # <task>@<host>@<process id>
+    return sorted(file_name for file_name in os.listdir(queue_folder(global_dic, 'claimed')) if file_name.startswith('task_'))
+
+def finished(global_dic, name):
+    # True if task <name> is done or failed
+    return any(os.path.exists(queue_folder(global_dic, state) + '/' + name) for state in ['done', 'failed'])
+
+#%%
+def claim_task(global_dic, name):
+    # the claimed file name of task <name>, or None if another worker was first
+    claimed_file_name = queue_folder(global_dic, 'claimed') + '/' + name + '@' + socket.gethostname() + '@' + str(os.getpid())
+    try:
+        os.rename(queue_folder(global_dic) + '/' + name, claimed_file_name)
+    except OSError:
+        return None
+    os.utime(claimed_file_name)     # the lease starts now
+    return claimed_file_name
+
+def worker_gone(host, pid):
+    # True if worker <pid> ran on this node and is gone
+    if host != socket.gethostname():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (OSError, ValueError):
+        return False
+    return False
+
+def recover_stale_tasks(global_dic):
+    # Put tasks whose lease ran out or whose worker is gone back into the queue
+    for file_name in claimed_tasks(global_dic):
+        name, host, pid = file_name.split('@')
+        claimed_file_name = queue_folder(global_dic, 'claimed') + '/' + file_name
+        try:
+            stale = time.time() - os.path.getmtime(claimed_file_name) > global_dic['QUEUE_LEASE_SECONDS']
+        except OSError:
+            continue    # done in the meantime
+        if not (stale or worker_gone(host, pid)):
+            continue
+        try:
+            os.rename(claimed_file_name, queue_folder(global_dic) + '/' + name)
+        except OSError:
+            continue
+        print ('Work_Queue.py: task ',name,' of ',host,' process ',pid,' is back in the queue')
+
+def heartbeat(claimed_file_name, interval, stop):
+    # Keep the lease of a claimed task while it is solved
+    while not stop.wait(interval):
+        try:
+            os.utime(claimed_file_name)
+        except OSError:
+            return      # taken back: the task will be solved again
+
+#%%
+def solve_task(global_dic, case_dic_list, name, claimed_file_name):
+    # Solve the cases of a claimed task and mark it done
+    task = read_task(claimed_file_name)
+    task['ATTEMPTS'] += 1
+    if task['ATTEMPTS'] > global_dic['QUEUE_MAX_ATTEMPTS']:
+        print ('Work_Queue.py: task ',name,' was claimed ',task['ATTEMPTS'] - 1,' times without being done, it failed')
+        os.replace(claimed_file_name, queue_folder(global_dic, 'failed') + '/' + name)
+        return
+    write_file(claimed_file_name, task)     # the attempt counts if this worker dies
+
+    for [solve_index, case_index], case_name in zip(task['CHAIN'], task['CASE_NAMES']):
+        if case_dic_list[case_index]['CASE_NAME'] != case_name:
+            raise ValueError('Work_Queue.py: case ' + str(case_index) + ' of the queue is ' + case_name +
+                             ', not ' + case_dic_list[case_index]['CASE_NAME'] + '; delete ' + queue_folder(global_dic))
+
+    stop = threading.Event()
+    lease = threading.Thread(target = heartbeat, args = (claimed_file_name, global_dic['QUEUE_LEASE_SECONDS'] / 4., stop),
+                             daemon = True)
+    lease.start()
+    try:
+        solve_chain(global_dic, [[solve_index, case_dic_list[case_index], None] for solve_index, case_index in task['CHAIN']])
+    finally:
+        stop.set()
+        lease.join()
+    try:
+        os.replace(claimed_file_name, queue_folder(global_dic, 'done') + '/' + name)
+    except OSError:
+        pass    # taken back while it was solved: it is solved again, with the same results
+
+def queue_worker(global_dic, case_dic_list):
+    # Solve tasks of the queue until there are none; returns True if this worker is to write the summary
+    verbose = global_dic['VERBOSE']
+    chains = case_chains(global_dic, case_dic_list)
+    names = [task_name(chain) for chain in chains]
+    # tasks are claimed longest first (see Scheduler.py)
+    rank = {task_name(chain): i for i, chain in enumerate(longest_first(global_dic, case_dic_list, chains))}
+    num_solved = 0
+    while True:
+        claimed_file_name = None
+        for name in sorted(waiting_tasks(global_dic), key = lambda name: rank.get(name, len(rank))):
+            claimed_file_name = claim_task(global_dic, name)
+            if claimed_file_name is not None:
+                solve_task(global_dic, case_dic_list, name, claimed_file_name)
+                num_solved += 1
+                break
+        if claimed_file_name is not None:
+            continue
+        if all(finished(global_dic, name) for name in names):
+            break
+        recover_stale_tasks(global_dic)
+        if len(waiting_tasks(global_dic)) == 0:
+            time.sleep(poll_seconds)     # other workers solve the last tasks
+
+    if verbose:
+        print ('Work_Queue.py: queue empty, ',num_solved,' tasks solved by this worker')
+    try:
+        os.rename(queue_folder(global_dic) + '/summary', queue_folder(global_dic, 'done') + '/summary')
+    except OSError:
+        return False
+    failed = sorted(os.listdir(queue_folder(global_dic, 'failed')))
+    if len(failed) > 0:
+        print ('Work_Queue.py: ',len(failed),' tasks failed, no summary: ',
+               [case_name for name in failed for case_name in read_task(queue_folder(global_dic, 'failed') + '/' + name)['CASE_NAMES']])
+        return False
+    return True